@@ -6,13 +6,17 @@ Generates educational podcasts from documents using OpenAI TTS.
 Converts chapters, summaries, or custom content into conversational audio.
 """
 
-from typing import Dict, Any, Optional, List, Literal
+from typing import Dict, Any, Optional, List, Literal, Tuple
+import asyncio
 import os
 import tempfile
+import uuid
 from pathlib import Path
 from datetime import datetime
 import logging
 
+import aiofiles
+
 from src.agents.base_agent import BaseAgent, AgentResponse
 from src.providers.base import LLMMessage
 
@@ -25,7 +29,7 @@ except ImportError:
 
 # OpenAI client for TTS
 try:
-    from openai import OpenAI
+    from openai import OpenAI, AsyncOpenAI
     TTS_AVAILABLE = True
 except ImportError:
     TTS_AVAILABLE = False
@@ -39,6 +43,14 @@ SUPPORTED_VOICES = ["alloy", "echo", "fable", "onyx", "nova", "shimmer"]
 SUPPORTED_FORMATS = ["mp3", "opus", "aac", "flac"]
 PODCAST_STYLES = ["conversational", "lecture", "summary", "storytelling"]
 
+# TTS accepts at most 4096 characters per request. Longer scripts are split
+# into chunks that are synthesized concurrently and joined; only formats made
+# of self-contained frames/pages can be joined by byte concatenation.
+TTS_MAX_CHARS = 4096
+CONCATENABLE_FORMATS = ("mp3", "aac", "opus")
+TTS_STREAM_CHUNK_SIZE = 64 * 1024
+SCRIPT_MODEL = "gpt-4o-mini"
+
 
 class PodcastAgent(BaseAgent):
     """
@@ -51,15 +63,23 @@ class PodcastAgent(BaseAgent):
     - Can generate podcasts from chapters or custom queries
     """
     
-    def __init__(self, *args, **kwargs):
-        """Initialize the Podcast Agent."""
+    def __init__(self, *args, async_client: Optional["AsyncOpenAI"] = None, **kwargs):
+        """
+        Initialize the Podcast Agent.
+        
+        Args:
+            async_client: Optional shared AsyncOpenAI client used by aprocess().
+                When omitted, one is created from OPENAI_API_KEY.
+        """
         super().__init__(*args, **kwargs)
         
-        # Initialize OpenAI client for TTS
+        # Initialize OpenAI clients for script generation and TTS
+        self.async_openai_client = None
         if TTS_AVAILABLE:
             api_key = os.getenv("OPENAI_API_KEY")
             if api_key:
                 self.openai_client = OpenAI(api_key=api_key)
+                self.async_openai_client = async_client or AsyncOpenAI(api_key=api_key)
             else:
                 logger.warning("OpenAI API key not found - TTS unavailable")
                 self.openai_client = None
@@ -84,22 +104,9 @@ class PodcastAgent(BaseAgent):
         Returns:
             AgentResponse with podcast script and audio file path
         """
-        # Extract context parameters
-        context = context or {}
-        document_id = context.get("document_id")
-        chapter_id = context.get("chapter_id")
-        style = context.get("style", "conversational")
-        voice = context.get("voice", "nova")
-        audio_format = context.get("format", "mp3")
-        duration_target = context.get("duration_target", 5)  # minutes
-        
-        # Validate parameters
-        if style not in PODCAST_STYLES:
-            style = "conversational"
-        if voice not in SUPPORTED_VOICES:
-            voice = "nova"
-        if audio_format not in SUPPORTED_FORMATS:
-            audio_format = "mp3"
+        options = self._parse_context(context)
+        document_id = options["document_id"]
+        chapter_id = options["chapter_id"]
         
         # Step 1: Gather content for podcast
         content = self._gather_podcast_content(query, document_id, chapter_id)
@@ -108,18 +115,90 @@ class PodcastAgent(BaseAgent):
         script = self._generate_podcast_script(
             query=query,
             content=content,
-            style=style,
-            duration_target=duration_target
+            style=options["style"],
+            duration_target=options["duration_target"]
         )
         
         # Step 3: Generate audio from script
         audio_file = self._generate_audio(
             script=script,
-            voice=voice,
-            format=audio_format
+            voice=options["voice"],
+            format=options["format"]
         )
         
         # Step 4: Build response
+        return self._build_response(query, options, content, script, audio_file)
+    
+    async def aprocess(self, query: str, context: Optional[Dict[str, Any]] = None) -> AgentResponse:
+        """
+        Async variant of process() built on AsyncOpenAI.
+        
+        Script generation and TTS run on the event loop instead of a worker
+        thread, and long scripts are synthesized as concurrent chunks.
+        
+        Args:
+            query: Podcast topic or chapter to convert
+            context: Optional context with the same settings as process()
+            
+        Returns:
+            AgentResponse with podcast script and audio file path
+        """
+        options = self._parse_context(context)
+        
+        content = await self._agather_podcast_content(
+            query,
+            options["document_id"],
+            options["chapter_id"]
+        )
+        
+        script = await self._agenerate_podcast_script(
+            query=query,
+            content=content,
+            style=options["style"],
+            duration_target=options["duration_target"]
+        )
+        
+        audio_file = await self._agenerate_audio(
+            script=script,
+            voice=options["voice"],
+            format=options["format"]
+        )
+        
+        return self._build_response(query, options, content, script, audio_file)
+    
+    def _parse_context(self, context: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Extract podcast settings from context, falling back to defaults.
+        
+        Args:
+            context: Optional context passed to process()/aprocess()
+            
+        Returns:
+            Dictionary of validated podcast settings
+        """
+        context = context or {}
+        style = context.get("style", "conversational")
+        voice = context.get("voice", "nova")
+        audio_format = context.get("format", "mp3")
+        
+        return {
+            "document_id": context.get("document_id"),
+            "chapter_id": context.get("chapter_id"),
+            "style": style if style in PODCAST_STYLES else "conversational",
+            "voice": voice if voice in SUPPORTED_VOICES else "nova",
+            "format": audio_format if audio_format in SUPPORTED_FORMATS else "mp3",
+            "duration_target": context.get("duration_target", 5)  # minutes
+        }
+    
+    def _build_response(
+        self,
+        query: str,
+        options: Dict[str, Any],
+        content: Dict[str, Any],
+        script: str,
+        audio_file: Optional[str]
+    ) -> AgentResponse:
+        """Build the AgentResponse for a generated podcast."""
         return AgentResponse(
             agent_name=self.config.name,
             agent_type=self.config.agent_type,
@@ -128,14 +207,14 @@ class PodcastAgent(BaseAgent):
             tokens_used=content.get("tokens_used", 0),
             metadata={
                 "podcast_query": query,
-                "style": style,
-                "voice": voice,
-                "format": audio_format,
+                "style": options["style"],
+                "voice": options["voice"],
+                "format": options["format"],
                 "audio_file": audio_file,
-                "duration_target": duration_target,
+                "duration_target": options["duration_target"],
                 "used_documents": content.get("used_documents", False),
-                "document_id": document_id,
-                "chapter_id": chapter_id
+                "document_id": options["document_id"],
+                "chapter_id": options["chapter_id"]
             }
         )
     
@@ -156,66 +235,132 @@ class PodcastAgent(BaseAgent):
         Returns:
             Dictionary with content, sources, and metadata
         """
+        doc_content = self._search_document_content(query, document_id)
+        
+        # Get supplementary web content if needed
+        web_content = None
+        if _needs_web_content(doc_content):
+            web_content = self._search_web_content(query)
+        
+        return _combine_content(doc_content, web_content)
+    
+    async def _agather_podcast_content(
+        self,
+        query: str,
+        document_id: Optional[str] = None,
+        chapter_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Gather podcast content with the document and web searches in parallel.
+        
+        The web search only supplements documents that return nothing, but
+        it is started alongside the document search so the two overlap
+        instead of running back to back; its result is dropped when unused.
+        
+        Args:
+            query: Podcast topic
+            document_id: Optional specific document
+            chapter_id: Optional specific chapter
+            
+        Returns:
+            Dictionary with content, sources, and metadata
+        """
+        if DOCUMENT_SEARCH_AVAILABLE and document_id:
+            doc_content, web_content = await asyncio.gather(
+                asyncio.to_thread(self._search_document_content, query, document_id),
+                asyncio.to_thread(self._search_web_content, query)
+            )
+        else:
+            doc_content = ([], [])
+            web_content = await asyncio.to_thread(self._search_web_content, query)
+        
+        if not _needs_web_content(doc_content):
+            web_content = None
+        
+        return _combine_content(doc_content, web_content)
+    
+    def _search_document_content(
+        self,
+        query: str,
+        document_id: Optional[str]
+    ) -> Tuple[List[str], List[Dict[str, Any]]]:
+        """
+        Search uploaded documents for podcast content.
+        
+        Args:
+            query: Podcast topic
+            document_id: Document to search; documents are skipped if None
+            
+        Returns:
+            Tuple of (content parts, sources); empty if nothing was found
+        """
         content_parts = []
         sources = []
-        used_documents = False
         
-        # Try to get content from documents
-        if DOCUMENT_SEARCH_AVAILABLE and document_id:
-            try:
-                doc_service = get_document_search_service()
-                
-                # Search specific document or all documents
-                doc_results = doc_service.search(
-                    query=query,
-                    max_results=10,
-                    document_ids=[document_id] if document_id else None
-                )
-                
-                if doc_results:
-                    used_documents = True
-                    content_parts.append("=== Content from Uploaded Documents ===\n")
-                    
-                    for result in doc_results:
-                        content_parts.append(f"\n[{result.document_title}]")
-                        if result.page_number:
-                            content_parts.append(f" - Page {result.page_number}")
-                        content_parts.append(f"\n{result.content}\n")
-                        
-                        sources.append({
-                            "type": "document",
-                            "title": result.document_title,
-                            "document_id": result.document_id,
-                            "page": result.page_number
-                        })
-                
-            except Exception as e:
-                logger.warning(f"Document search failed: {e}")
+        if not (DOCUMENT_SEARCH_AVAILABLE and document_id):
+            return content_parts, sources
         
-        # Get supplementary web content if needed
-        if not content_parts or len(content_parts) < 3:
-            try:
-                search_result = self._search(query)
-                
-                content_parts.append("\n=== Additional Context from Web ===\n")
-                content_parts.append(search_result.text)
+        try:
+            doc_service = get_document_search_service()
+            
+            # Search specific document or all documents
+            doc_results = doc_service.search(
+                query=query,
+                max_results=10,
+                document_ids=[document_id] if document_id else None
+            )
+            
+            if doc_results:
+                content_parts.append("=== Content from Uploaded Documents ===\n")
                 
-                for source in search_result.sources[:5]:
+                for result in doc_results:
+                    content_parts.append(f"\n[{result.document_title}]")
+                    if result.page_number:
+                        content_parts.append(f" - Page {result.page_number}")
+                    content_parts.append(f"\n{result.content}\n")
+                    
                     sources.append({
-                        "type": "web",
-                        "url": source.url,
-                        "title": source.url.split('/')[2] if source.url else "Web Source"
+                        "type": "document",
+                        "title": result.document_title,
+                        "document_id": result.document_id,
+                        "page": result.page_number
                     })
-                    
-            except Exception as e:
-                logger.warning(f"Web search failed: {e}")
+            
+        except Exception as e:
+            logger.warning(f"Document search failed: {e}")
         
-        return {
-            "content": "\n".join(content_parts),
-            "sources": sources,
-            "used_documents": used_documents,
-            "tokens_used": 0
-        }
+        return content_parts, sources
+    
+    def _search_web_content(self, query: str) -> Tuple[List[str], List[Dict[str, Any]]]:
+        """
+        Search the web for supplementary podcast content.
+        
+        Args:
+            query: Podcast topic
+            
+        Returns:
+            Tuple of (content parts, sources); empty if the search failed
+        """
+        try:
+            search_result = self._search(query)
+        except Exception as e:
+            logger.warning(f"Web search failed: {e}")
+            return [], []
+        
+        content_parts = [
+            "\n=== Additional Context from Web ===\n",
+            search_result.text
+        ]
+        sources = [
+            {
+                "type": "web",
+                "url": source.url,
+                "title": source.url.split('/')[2] if source.url else "Web Source"
+            }
+            for source in search_result.sources[:5]
+        ]
+        
+        return content_parts, sources
     
     def _generate_podcast_script(
         self,
@@ -236,6 +381,57 @@ class PodcastAgent(BaseAgent):
         Returns:
             Podcast script text
         """
+        messages = self._build_script_messages(query, content, style, duration_target)
+        
+        llm_response = self._generate_llm_response(messages)
+        
+        return llm_response.text
+    
+    async def _agenerate_podcast_script(
+        self,
+        query: str,
+        content: Dict[str, Any],
+        style: str,
+        duration_target: int
+    ) -> str:
+        """
+        Generate a podcast script with the AsyncOpenAI client.
+        
+        Falls back to the sync provider in a worker thread when no async
+        client is configured.
+        
+        Args:
+            query: Podcast topic
+            content: Content dictionary with text and sources
+            style: Podcast style
+            duration_target: Target duration in minutes
+            
+        Returns:
+            Podcast script text
+        """
+        messages = self._build_script_messages(query, content, style, duration_target)
+        
+        if not self.async_openai_client:
+            llm_response = await asyncio.to_thread(self._generate_llm_response, messages)
+            return llm_response.text
+        
+        completion = await self.async_openai_client.chat.completions.create(
+            model=getattr(self.provider, "default_model", SCRIPT_MODEL),
+            messages=[{"role": msg.role, "content": msg.content} for msg in messages],
+            temperature=self.config.temperature,
+            max_tokens=self.config.max_tokens
+        )
+        
+        return completion.choices[0].message.content or ""
+    
+    def _build_script_messages(
+        self,
+        query: str,
+        content: Dict[str, Any],
+        style: str,
+        duration_target: int
+    ) -> List[LLMMessage]:
+        """Build the LLM messages that ask for a podcast script."""
         # Calculate approximate word count target
         # Average speaking rate: 150 words per minute
         word_target = duration_target * 150
@@ -285,9 +481,7 @@ Create the podcast script now:"""
             )
         ]
         
-        llm_response = self._generate_llm_response(messages)
-        
-        return llm_response.text
+        return messages
     
     def _generate_audio(
         self,
@@ -314,15 +508,7 @@ Create the podcast script now:"""
             # Clean script for TTS (remove pause markers)
             clean_script = script.replace("[PAUSE]", ". ")
             
-            # Generate unique filename
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"podcast_{timestamp}.{format}"
-            
-            # Create podcasts directory if it doesn't exist
-            podcast_dir = Path("podcasts")
-            podcast_dir.mkdir(exist_ok=True)
-            
-            output_path = podcast_dir / filename
+            output_path = self._new_audio_path(format)
             
             # Generate audio using OpenAI TTS
             logger.info(f"Generating audio: {output_path}")
@@ -334,8 +520,75 @@ Create the podcast script now:"""
                 response_format=format
             )
             
-            # Stream to file
-            response.stream_to_file(str(output_path))
+            # Stream to a temp file and rename, so the finished file appears
+            # atomically (the podcast list cache keys on directory mtime)
+            partial_path = f"{output_path}.part"
+            response.stream_to_file(partial_path)
+            os.replace(partial_path, output_path)
+            
+            logger.info(f"Audio generated successfully: {output_path}")
+            
+            return str(output_path)
+            
+        except Exception as e:
+            logger.error(f"Audio generation failed: {e}")
+            return None
+    
+    async def _agenerate_audio(
+        self,
+        script: str,
+        voice: str,
+        format: str
+    ) -> Optional[str]:
+        """
+        Generate audio file from script using AsyncOpenAI streaming TTS.
+        
+        The script is split into chunks that are synthesized concurrently.
+        Audio is streamed to disk in script order as it arrives: the first
+        chunk is written while it is still being generated, and later
+        chunks are only buffered until their turn comes.
+        
+        Args:
+            script: Podcast script text
+            voice: Voice to use
+            format: Audio format
+            
+        Returns:
+            Path to generated audio file, or None if failed
+        """
+        if not self.async_openai_client or not TTS_AVAILABLE:
+            logger.warning("TTS not available - skipping audio generation")
+            return None
+        
+        clean_script = script.replace("[PAUSE]", ". ")
+        
+        if format in CONCATENABLE_FORMATS:
+            chunks = split_script(clean_script)
+        else:
+            chunks = [clean_script]
+        
+        output_path = self._new_audio_path(format)
+        partial_path = f"{output_path}.part"
+        logger.info(f"Generating audio: {output_path} ({len(chunks)} chunks)")
+        
+        queues = [asyncio.Queue() for _ in chunks]
+        tasks = [
+            asyncio.create_task(self._stream_tts_chunk(chunk, voice, format, queue))
+            for chunk, queue in zip(chunks, queues)
+        ]
+        
+        created = False
+        try:
+            # Exclusive create: never write into another generation's file
+            async with aiofiles.open(partial_path, "xb") as f:
+                created = True
+                for queue in queues:
+                    while (piece := await queue.get()) is not None:
+                        await f.write(piece)
+            
+            # Surface any chunk that failed part-way through
+            await asyncio.gather(*tasks)
+            os.replace(partial_path, output_path)
             
             logger.info(f"Audio generated successfully: {output_path}")
             
@@ -343,8 +596,58 @@ Create the podcast script now:"""
             
         except Exception as e:
             logger.error(f"Audio generation failed: {e}")
+            for task in tasks:
+                task.cancel()
+            if created:
+                try:
+                    os.remove(partial_path)
+                except FileNotFoundError:
+                    pass
             return None
     
+    async def _stream_tts_chunk(
+        self,
+        chunk: str,
+        voice: str,
+        format: str,
+        queue: asyncio.Queue
+    ):
+        """
+        Stream the TTS audio for one script chunk into a queue.
+        
+        A None sentinel is always queued last, even on failure, so the
+        writer moves on; the error itself is raised from the task.
+        
+        Args:
+            chunk: Script text to synthesize
+            voice: Voice to use
+            format: Audio format
+            queue: Queue receiving the audio bytes
+        """
+        try:
+            async with self.async_openai_client.audio.speech.with_streaming_response.create(
+                model="tts-1",
+                voice=voice,
+                input=chunk,
+                response_format=format
+            ) as response:
+                async for piece in response.iter_bytes(TTS_STREAM_CHUNK_SIZE):
+                    queue.put_nowait(piece)
+        finally:
+            queue.put_nowait(None)
+    
+    def _new_audio_path(self, format: str) -> Path:
+        """Return a unique, timestamped output path in the podcasts directory."""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        # Generations run concurrently and may finish in the same second
+        suffix = uuid.uuid4().hex[:8]
+        
+        # Create podcasts directory if it doesn't exist
+        podcast_dir = Path("podcasts")
+        podcast_dir.mkdir(exist_ok=True)
+        
+        return podcast_dir / f"podcast_{timestamp}_{suffix}.{format}"
+    
     def _build_system_message(self) -> LLMMessage:
         """Build system message for podcast generation."""
         return LLMMessage(
@@ -370,6 +673,84 @@ You excel at making learning enjoyable through audio!"""
         )
 
 
+def _needs_web_content(doc_content: Tuple[List[str], List[Dict[str, Any]]]) -> bool:
+    """Check whether document content is too thin to stand on its own."""
+    content_parts, _ = doc_content
+    return not content_parts or len(content_parts) < 3
+
+
+def _combine_content(
+    doc_content: Tuple[List[str], List[Dict[str, Any]]],
+    web_content: Optional[Tuple[List[str], List[Dict[str, Any]]]]
+) -> Dict[str, Any]:
+    """
+    Merge document and (optional) web content into the content dictionary.
+    
+    Args:
+        doc_content: (content parts, sources) from documents
+        web_content: (content parts, sources) from the web, or None if unused
+        
+    Returns:
+        Dictionary with content, sources, and metadata
+    """
+    content_parts, sources = doc_content
+    used_documents = bool(content_parts)
+    
+    if web_content:
+        content_parts = content_parts + web_content[0]
+        sources = sources + web_content[1]
+    
+    return {
+        "content": "\n".join(content_parts),
+        "sources": sources,
+        "used_documents": used_documents,
+        "tokens_used": 0
+    }
+
+
+def split_script(script: str, max_chars: int = TTS_MAX_CHARS) -> List[str]:
+    """
+    Split a script into TTS-sized chunks on paragraph boundaries.
+    
+    Paragraphs are packed greedily up to max_chars; a paragraph that is
+    longer on its own is cut at the last space before the limit.
+    
+    Args:
+        script: Cleaned podcast script
+        max_chars: Maximum characters per chunk
+        
+    Returns:
+        Non-empty list of chunks, in script order
+    """
+    chunks: List[str] = []
+    current = ""
+    
+    for paragraph in script.split("\n\n"):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        
+        if current and len(current) + 2 + len(paragraph) <= max_chars:
+            current = f"{current}\n\n{paragraph}"
+            continue
+        
+        if current:
+            chunks.append(current)
+        
+        while len(paragraph) > max_chars:
+            cut = paragraph.rfind(" ", 0, max_chars)
+            if cut <= 0:
+                cut = max_chars
+            chunks.append(paragraph[:cut])
+            paragraph = paragraph[cut:].lstrip()
+        current = paragraph
+    
+    if current:
+        chunks.append(current)
+    
+    return chunks or [script]
+
+
 def generate_podcast(
     query: str,
     document_id: Optional[str] = None,
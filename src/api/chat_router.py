@@ -4,10 +4,15 @@ Chat API Router
 Implements the chat endpoint that integrates LLM providers with web search capabilities.
 """
 
-import uuid
+import asyncio
+import functools
+import itertools
+import os
 import time
-from typing import List, Optional, Dict, Any
+from collections import OrderedDict
+from typing import List, Optional, Dict, Any, Tuple
 from fastapi import APIRouter, HTTPException, status, Request
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel, Field, field_validator
 
 from src.providers import create_provider
@@ -72,8 +77,43 @@ class ChatResponse(BaseModel):
 # Router
 chat_router = APIRouter(prefix="/v1", tags=["chat"])
 
+# Read once at import; checked at startup and on the search path
+_OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
-@chat_router.post("/chat", response_model=ChatResponse)
+# Process-unique trace IDs for requests that bypassed the middleware
+_TRACE_PREFIX = f"{os.getpid():x}-{int(time.time()):x}-"
+_trace_counter = itertools.count()
+
+
+def _gen_trace_id() -> str:
+    """Generate a trace ID that is unique within this process."""
+    return _TRACE_PREFIX + format(next(_trace_counter), "x")
+
+
+# Error type -> (HTTP status, detail prefix) for chat failures, checked in order
+_EXC_STATUS: Tuple[Tuple[type, int, str], ...] = (
+    (ValueError, status.HTTP_400_BAD_REQUEST, "Invalid input"),
+    (SearchError, status.HTTP_503_SERVICE_UNAVAILABLE, "Search service error"),
+    (ConnectionError, status.HTTP_502_BAD_GATEWAY, "Provider connection error"),
+    (RuntimeError, status.HTTP_500_INTERNAL_SERVER_ERROR, "Provider error"),
+)
+
+# Conversational filler that never benefits from a web search
+_TRIVIAL_QUERIES = frozenset({
+    "ok", "okay", "thanks", "thank you", "hi", "hello", "yes", "no"
+})
+
+# LRU of recent searches keyed on (normalized query, sorted domains); web
+# results go stale, so entries expire after SEARCH_CACHE_TTL_SECONDS
+SEARCH_CACHE_SIZE = 256
+SEARCH_CACHE_TTL_SECONDS = 300.0
+_search_cache: "OrderedDict[Tuple[str, Tuple[str, ...]], Tuple[float, str, List[ModelCitation]]]" = OrderedDict()
+
+# Searches currently running, shared by concurrent identical requests
+_inflight_searches: "Dict[Tuple[str, Tuple[str, ...]], asyncio.Future]" = {}
+
+
+@chat_router.post("/chat", response_model=ChatResponse, response_class=ORJSONResponse)
 async def chat(chat_request: ChatRequest, request: Request) -> ChatResponse:
     """
     Generate a chat response with optional web search augmentation.
@@ -88,7 +128,7 @@ async def chat(chat_request: ChatRequest, request: Request) -> ChatResponse:
     Raises:
         HTTPException: For various error conditions
     """
-    trace_id = getattr(request.state, 'request_id', str(uuid.uuid4()))
+    trace_id = getattr(request.state, 'request_id', None) or _gen_trace_id()
     start_time = time.time()
     
     try:
@@ -126,15 +166,16 @@ async def chat(chat_request: ChatRequest, request: Request) -> ChatResponse:
         # Convert citations if we performed search
         response_citations = None
         if citations:
+            # Citation fields are already typed by the parser; skip revalidation
             response_citations = [
-                CitationResponse(
-                    id=i + 1,
+                CitationResponse.model_construct(
+                    id=citation_id,
                     url=citation.url,
                     title=citation.title,
                     start_index=citation.start_index,
                     end_index=citation.end_index
                 )
-                for i, citation in enumerate(citations)
+                for citation_id, citation in enumerate(citations, 1)
             ]
         
         return ChatResponse(
@@ -147,27 +188,13 @@ async def chat(chat_request: ChatRequest, request: Request) -> ChatResponse:
             trace_id=trace_id
         )
         
-    except ValueError as e:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Invalid input: {str(e)}"
-        )
-    except SearchError as e:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail=f"Search service error: {e.message}"
-        )
-    except ConnectionError as e:
-        raise HTTPException(
-            status_code=status.HTTP_502_BAD_GATEWAY,
-            detail=f"Provider connection error: {str(e)}"
-        )
-    except RuntimeError as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Provider error: {str(e)}"
-        )
     except Exception as e:
+        for exc_type, status_code, prefix in _EXC_STATUS:
+            if isinstance(e, exc_type):
+                raise HTTPException(
+                    status_code=status_code,
+                    detail=f"{prefix}: {getattr(e, 'message', str(e))}"
+                )
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Unexpected error: {str(e)}"
@@ -191,43 +218,62 @@ async def _perform_web_search_augmentation(
         List of citations from search results
     """
     try:
-        # Get the last user message as search query
-        user_messages = [msg for msg in llm_messages if msg.role == "user"]
-        if not user_messages:
-            return []
-        
-        query = user_messages[-1].content
+        # Single pass: find the last user message (search query) and count
+        # system messages (insertion point for the search context)
+        query = None
+        system_count = 0
+        for msg in llm_messages:
+            if msg.role == "system":
+                system_count += 1
+            elif msg.role == "user":
+                query = msg.content
         
-        # Create search service (assumes API key available)
-        import os
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise SearchError(
-                code="MISSING_API_KEY",
-                message="OpenAI API key required for search"
-            )
+        if query is None:
+            return []
         
-        search_service = SearchService(api_key=api_key)
+        # Skip empty and conversational turns
+        query_norm = query.strip().lower()
+        if not query_norm or query_norm in _TRIVIAL_QUERIES:
+            return []
         
-        # Configure search options
-        search_options = SearchOptions()
-        if options.domains:
-            search_options.allowed_domains = options.domains
+        cache_key = (query_norm, tuple(sorted(options.domains or ())))
+        cached = _search_cache.get(cache_key)
+        if cached is not None and cached[0] <= time.monotonic():
+            del _search_cache[cache_key]
+            cached = None
         
-        # Perform search
-        search_result = search_service.search(query, search_options)
+        if cached is not None:
+            _search_cache.move_to_end(cache_key)
+            _, context_text, citations = cached
+        else:
+            # Concurrent identical requests share a single search
+            task = _inflight_searches.get(cache_key)
+            if task is None:
+                task = asyncio.ensure_future(
+                    asyncio.to_thread(_run_web_search, query, options.domains)
+                )
+                _inflight_searches[cache_key] = task
+                task.add_done_callback(lambda _: _inflight_searches.pop(cache_key, None))
+            
+            context_text, citations = await asyncio.shield(task)
+            
+            _search_cache[cache_key] = (
+                time.monotonic() + SEARCH_CACHE_TTL_SECONDS, context_text, citations
+            )
+            _search_cache.move_to_end(cache_key)
+            if len(_search_cache) > SEARCH_CACHE_SIZE:
+                _search_cache.popitem(last=False)
         
         # Inject search context as system message
-        if search_result.text and search_result.citations:
+        if context_text and citations:
             context_message = LLMMessage(
                 role="system",
-                content=f"Use the following web search information to help answer the user's question:\n\n{search_result.text}"
+                content=f"Use the following web search information to help answer the user's question:\n\n{context_text}"
             )
             # Insert at the beginning (after any existing system messages)
-            system_count = sum(1 for msg in llm_messages if msg.role == "system")
             llm_messages.insert(system_count, context_message)
             
-            return search_result.citations
+            return list(citations)
         
         return []
         
@@ -238,4 +284,47 @@ async def _perform_web_search_augmentation(
         raise SearchError(
             code="SEARCH_FAILED",
             message=f"Web search failed: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+
+def search_api_key_configured() -> bool:
+    """Check whether web search augmentation has an API key."""
+    return bool(_OPENAI_API_KEY)
+
+
+@functools.lru_cache(maxsize=1)
+def _get_search_service(api_key: str) -> SearchService:
+    """Get the shared search service for an API key."""
+    return SearchService(api_key=api_key)
+
+
+def _run_web_search(
+    query: str,
+    domains: Optional[List[str]]
+) -> Tuple[str, List[ModelCitation]]:
+    """
+    Run a blocking web search.
+    
+    Args:
+        query: Search query
+        domains: Optional allowed domains
+        
+    Returns:
+        Tuple of (search context text, citations)
+    """
+    if not _OPENAI_API_KEY:
+        raise SearchError(
+            code="MISSING_API_KEY",
+            message="OpenAI API key required for search"
+        )
+    
+    search_service = _get_search_service(_OPENAI_API_KEY)
+    
+    # Configure search options
+    search_options = SearchOptions()
+    if domains:
+        search_options.allowed_domains = domains
+    
+    # Perform search
+    search_result = search_service.search(query, search_options)
+    return search_result.text, search_result.citations
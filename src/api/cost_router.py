@@ -4,8 +4,10 @@ Cost tracking API router.
 Provides endpoints to access cost and usage metrics.
 """
 
+from datetime import datetime
 from typing import Optional
 from fastapi import APIRouter, HTTPException, Request, Depends
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel, Field
 
 from src.infra.middleware import CostTrackingMiddleware, get_middleware_instance as _get_middleware_instance
@@ -44,7 +46,7 @@ class RequestMetricsResponse(BaseModel):
     tokens_in: int = 0
     tokens_out: int = 0
     cost_usd: float = 0.0
-    timestamp: str
+    timestamp: datetime
 
 
 # Router
@@ -54,7 +56,7 @@ cost_router = APIRouter(prefix="/v1/costs", tags=["costs"])
 
 
 
-@cost_router.get("/latest", response_model=CostSummaryResponse)
+@cost_router.get("/latest", response_model=CostSummaryResponse, response_class=ORJSONResponse)
 async def get_latest_costs(
     limit: int = 100,
     middleware: CostTrackingMiddleware = Depends(get_middleware_instance)
@@ -85,7 +87,7 @@ async def get_latest_costs(
         )
 
 
-@cost_router.get("/requests", response_model=list[RequestMetricsResponse])
+@cost_router.get("/requests", response_model=list[RequestMetricsResponse], response_class=ORJSONResponse)
 async def get_recent_requests(
     limit: int = 50,
     middleware: CostTrackingMiddleware = Depends(get_middleware_instance)
@@ -120,7 +122,7 @@ async def get_recent_requests(
                 tokens_in=req.get("tokens_in", 0),
                 tokens_out=req.get("tokens_out", 0),
                 cost_usd=req.get("cost_usd", 0.0),
-                timestamp=req["timestamp"].isoformat() if hasattr(req["timestamp"], 'isoformat') else str(req["timestamp"])
+                timestamp=req["timestamp"]
             )
             for req in recent_requests
         ]
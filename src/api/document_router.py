@@ -5,11 +5,13 @@ Document Upload API Router
 FastAPI endpoints for document management in the student assistant.
 """
 
+import heapq
 import os
 import uuid
+from operator import attrgetter
 from typing import List, Optional, Dict, Any
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form, status, Depends
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, ORJSONResponse
 from pydantic import BaseModel, Field
 from datetime import datetime
 
@@ -71,6 +73,26 @@ class ProcessingStatusResponse(BaseModel):
     estimated_completion: Optional[datetime] = None
 
 
+def _to_response(doc: Document) -> DocumentResponse:
+    """Build a DocumentResponse from a Document (fields are already typed)."""
+    return DocumentResponse.model_construct(
+        id=doc.id,
+        title=doc.title,
+        file_type=doc.file_type.value,
+        file_size=doc.file_size,
+        upload_date=doc.upload_date,
+        author=doc.author,
+        description=doc.description,
+        subject=doc.subject,
+        processing_status=doc.processing_status.value,
+        total_pages=doc.total_pages,
+        total_chunks=doc.total_chunks,
+        chapters_count=len(doc.chapters),
+        tags=doc.tags,
+        size_mb=doc.size_mb
+    )
+
+
 # Router
 document_router = APIRouter(prefix="/v1/documents", tags=["documents"])
 
@@ -147,7 +169,7 @@ async def upload_document(
         # Parse tags
         tag_list = [tag.strip() for tag in tags.split(",") if tag.strip()] if tags else []
         
-        # Upload document
+        # Stream upload to disk (validates type and size as it goes)
         document = await document_processor.upload_document(file, user_id, metadata)
         
         # Add tags
@@ -165,30 +187,17 @@ async def upload_document(
             document.processing_status = ProcessingStatus.ERROR
             document.error_message = str(e)
         
-        return DocumentResponse(
-            id=document.id,
-            title=document.title,
-            file_type=document.file_type.value,
-            file_size=document.file_size,
-            upload_date=document.upload_date,
-            author=document.author,
-            description=document.description,
-            subject=document.subject,
-            processing_status=document.processing_status.value,
-            total_pages=document.total_pages,
-            total_chunks=document.total_chunks,
-            chapters_count=len(document.chapters),
-            tags=document.tags,
-            size_mb=document.size_mb
-        )
+        return _to_response(document)
         
     except UnsupportedFileTypeError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
 
-@document_router.get("/", response_model=List[DocumentResponse])
+@document_router.get("/", response_model=List[DocumentResponse], response_class=ORJSONResponse)
 async def list_documents(
     user_id: str = "default_user",  # TODO: Get from auth
     subject: Optional[str] = None,
@@ -211,41 +220,21 @@ async def list_documents(
     Returns:
         List of documents
     """
-    documents = list(document_library.values())
+    documents = document_library.values()
     
-    # Apply filters
+    # Apply filters lazily (single pass over the library)
     if subject:
-        documents = [d for d in documents if d.subject == subject]
+        documents = (d for d in documents if d.subject == subject)
     if author:
-        documents = [d for d in documents if d.author and author.lower() in d.author.lower()]
+        author_lower = author.lower()
+        documents = (d for d in documents if d.author and author_lower in d.author.lower())
     if processing_status:
-        documents = [d for d in documents if d.processing_status.value == processing_status]
+        documents = (d for d in documents if d.processing_status.value == processing_status)
     
-    # Sort by upload date (newest first)
-    documents.sort(key=lambda d: d.upload_date, reverse=True)
+    # Newest first; only the first offset + limit documents need ordering
+    documents = heapq.nlargest(offset + limit, documents, key=attrgetter("upload_date"))[offset:]
     
-    # Apply pagination
-    documents = documents[offset:offset + limit]
-    
-    return [
-        DocumentResponse(
-            id=doc.id,
-            title=doc.title,
-            file_type=doc.file_type.value,
-            file_size=doc.file_size,
-            upload_date=doc.upload_date,
-            author=doc.author,
-            description=doc.description,
-            subject=doc.subject,
-            processing_status=doc.processing_status.value,
-            total_pages=doc.total_pages,
-            total_chunks=doc.total_chunks,
-            chapters_count=len(doc.chapters),
-            tags=doc.tags,
-            size_mb=doc.size_mb
-        )
-        for doc in documents
-    ]
+    return [_to_response(doc) for doc in documents]
 
 
 @document_router.get("/{document_id}", response_model=DocumentResponse)
@@ -267,22 +256,7 @@ async def get_document(document_id: str):
     
     document = document_library[document_id]
     
-    return DocumentResponse(
-        id=document.id,
-        title=document.title,
-        file_type=document.file_type.value,
-        file_size=document.file_size,
-        upload_date=document.upload_date,
-        author=document.author,
-        description=document.description,
-        subject=document.subject,
-        processing_status=document.processing_status.value,
-        total_pages=document.total_pages,
-        total_chunks=document.total_chunks,
-        chapters_count=len(document.chapters),
-        tags=document.tags,
-        size_mb=document.size_mb
-    )
+    return _to_response(document)
 
 
 @document_router.get("/{document_id}/status", response_model=ProcessingStatusResponse)
@@ -381,7 +355,7 @@ async def delete_document(document_id: str):
     }
 
 
-@document_router.get("/library/overview", response_model=LibraryResponse)
+@document_router.get("/library/overview", response_model=LibraryResponse, response_class=ORJSONResponse)
 async def get_library_overview(user_id: str = "default_user"):
     """
     Get overview of user's document library.
@@ -406,25 +380,7 @@ async def get_library_overview(user_id: str = "default_user"):
         total_size_mb=total_size_bytes / (1024 * 1024),
         processing_count=processing_count,
         completed_count=completed_count,
-        recent_uploads=[
-            DocumentResponse(
-                id=doc.id,
-                title=doc.title,
-                file_type=doc.file_type.value,
-                file_size=doc.file_size,
-                upload_date=doc.upload_date,
-                author=doc.author,
-                description=doc.description,
-                subject=doc.subject,
-                processing_status=doc.processing_status.value,
-                total_pages=doc.total_pages,
-                total_chunks=doc.total_chunks,
-                chapters_count=len(doc.chapters),
-                tags=doc.tags,
-                size_mb=doc.size_mb
-            )
-            for doc in recent
-        ]
+        recent_uploads=[_to_response(doc) for doc in recent]
     )
 
 
@@ -445,10 +401,11 @@ async def process_document_background(document_id: str):
         document.processing_status = ProcessingStatus.PROCESSING
         
         # Extract text
-        extraction_result = text_extractor.extract_text(document)
+        extraction_result = await text_extractor.extract_text_async(document)
         
         # Update document with extracted data
         document.chapters = extraction_result["chapters"]
+        document.rebuild_chapter_index()
         document.total_pages = extraction_result["page_count"]
         
         # Update metadata if available
@@ -5,10 +5,14 @@ Learning Features API Router
 Provides REST API endpoints for study guides, quizzes, notes, and progress tracking.
 """
 
-from fastapi import APIRouter, HTTPException, Query
-from pydantic import BaseModel, Field
-from typing import Optional, List, Dict, Any, Literal
+import asyncio
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, Field, field_validator
+from typing import Optional, List, Dict, Any, Literal, Tuple
 import logging
+import operator
+import re
 from datetime import datetime
 
 from src.agents.study_guide_agent import generate_study_guide
@@ -54,7 +58,8 @@ async def create_study_guide(request: StudyGuideRequest):
     try:
         logger.info(f"Generating study guide: {request.topic}")
         
-        result = generate_study_guide(
+        result = await asyncio.to_thread(
+            generate_study_guide,
             topic=request.topic,
             document_id=request.document_id,
             difficulty=request.difficulty,
@@ -124,7 +129,8 @@ async def create_quiz(request: QuizRequest):
     try:
         logger.info(f"Generating quiz: {request.topic}")
         
-        result = generate_quiz(
+        result = await asyncio.to_thread(
+            generate_quiz,
             topic=request.topic,
             num_questions=request.num_questions,
             question_types=request.question_types,
@@ -143,8 +149,47 @@ async def create_quiz(request: QuizRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/quizzes/submit", response_model=QuizResultResponse)
-async def submit_quiz(submission: QuizSubmission):
+def _grade_short_answer(answer: str, correct: str) -> bool:
+    """For short answer, do basic comparison (would need AI in production)."""
+    return answer in correct
+
+
+# Graders by question type. Each takes the user answer and the correct
+# answer, both casefolded and stripped; unknown types are short answer.
+_GRADERS = {
+    'multiple_choice': operator.eq,
+    'true_false': operator.eq,
+}
+
+
+def _index_answers(
+    questions: List[Dict[str, Any]],
+    answers: List[Dict[str, Any]]
+) -> Tuple[Dict[Any, Any], bool]:
+    """
+    Map question ID to the submitted answer.
+    
+    Generated quizzes number their questions with ints; for those, answers
+    are keyed by int so each question's own id can be looked up directly.
+    Any other id scheme falls back to comparing ids as strings.
+    
+    Args:
+        questions: Quiz questions
+        answers: Submitted {question_id, answer} entries
+        
+    Returns:
+        Tuple of (answers by question ID, whether the IDs are ints)
+    """
+    if questions and all(type(q.get('id')) is int for q in questions):
+        try:
+            return {int(ans['question_id']): ans['answer'] for ans in answers}, True
+        except (TypeError, ValueError):
+            pass
+    return {str(ans['question_id']): ans['answer'] for ans in answers}, False
+
+
+@router.post("/quizzes/submit", response_model=QuizResultResponse, response_class=ORJSONResponse)
+async def submit_quiz(submission: QuizSubmission, background_tasks: BackgroundTasks):
     """
     Submit quiz answers and get results.
     
@@ -153,59 +198,51 @@ async def submit_quiz(submission: QuizSubmission):
     try:
         quiz = submission.quiz
         questions = quiz.get('questions', [])
-        user_answers = {str(ans['question_id']): ans['answer'] for ans in submission.answers}
+        user_answers, numeric_ids = _index_answers(questions, submission.answers)
+        folded_answers = {q_id: answer.casefold().strip() for q_id, answer in user_answers.items()}
         
         # Grade each question
-        correct_count = 0
-        details = []
-        
-        for question in questions:
-            q_id = str(question.get('id', question.get('question_id', '')))
-            correct_answer = question.get('correct_answer', '')
-            user_answer = user_answers.get(q_id, '')
-            
-            # Check if answer is correct
-            is_correct = False
-            if question.get('type') == 'multiple_choice':
-                # For multiple choice, compare the letter (A, B, C, D)
-                is_correct = user_answer.upper() == correct_answer.upper()
-            elif question.get('type') == 'true_false':
-                is_correct = user_answer.lower() == correct_answer.lower()
-            else:
-                # For short answer, do basic comparison (would need AI in production)
-                is_correct = user_answer.lower().strip() in correct_answer.lower().strip()
-            
-            if is_correct:
-                correct_count += 1
-            
-            details.append({
-                'question_id': q_id,
+        details = [
+            {
+                'question_id': str(q_key),
                 'question': question.get('question', ''),
-                'user_answer': user_answer,
-                'correct_answer': correct_answer,
-                'is_correct': is_correct,
+                'user_answer': user_answers.get(q_key, ''),
+                'correct_answer': question.get('correct_answer', ''),
+                'is_correct': _GRADERS.get(question.get('type'), _grade_short_answer)(
+                    folded_answers.get(q_key, ''),
+                    question.get('correct_answer', '').casefold().strip()
+                ),
                 'explanation': question.get('explanation', '')
-            })
+            }
+            for question in questions
+            for q_key in (
+                question['id'] if numeric_ids
+                else str(question.get('id', question.get('question_id', ''))),
+            )
+        ]
+        correct_count = sum(1 for detail in details if detail['is_correct'])
         
         total_questions = len(questions)
         score = correct_count
         
-        # Record in progress tracker
+        # Record in progress tracker once the response is sent
         tracker = get_progress_tracker()
-        tracker.record_quiz_result(
-            quiz_id=quiz.get('id', 'quiz_' + str(datetime.now().timestamp())),
+        background_tasks.add_task(
+            tracker.record_quiz_result,
+            quiz_id=quiz.get('id') or f"quiz_{datetime.now().timestamp()}",
             topic=quiz.get('topic', submission.quiz.get('metadata', {}).get('topic', 'Unknown')),
             correct=correct_count,
             total=total_questions,
             time_spent=submission.time_taken
         )
         
-        return QuizResultResponse(
-            score=score,
-            correct=correct_count,
-            total=total_questions,
-            details=details
-        )
+        # Built from plain values that already match QuizResultResponse
+        return ORJSONResponse({
+            'score': float(score),
+            'correct': correct_count,
+            'total': total_questions,
+            'details': details
+        })
         
     except Exception as e:
         logger.error(f"Quiz submission failed: {e}")
@@ -216,6 +253,19 @@ async def submit_quiz(submission: QuizSubmission):
 # NOTES
 # ============================================================================
 
+# Note colors are "#rrggbb" hex strings; compiled once and shared by the
+# note models. The pattern is still published in the OpenAPI schema.
+COLOR_PATTERN = "^#[0-9A-Fa-f]{6}$"
+_COLOR_RE = re.compile(COLOR_PATTERN)
+
+
+def _validate_color(v: Optional[str]) -> Optional[str]:
+    """Validate a "#rrggbb" note color."""
+    if v is not None and not _COLOR_RE.fullmatch(v):
+        raise ValueError(f"Invalid color '{v}' (expected #rrggbb)")
+    return v
+
+
 class NoteCreate(BaseModel):
     """Request model for note creation."""
     title: str = Field(..., min_length=1, max_length=200)
@@ -223,7 +273,13 @@ class NoteCreate(BaseModel):
     tags: Optional[List[str]] = Field(default_factory=list)
     document_id: Optional[str] = None
     podcast_id: Optional[str] = None
-    color: str = Field("#667eea", pattern="^#[0-9A-Fa-f]{6}$")
+    color: str = Field("#667eea", json_schema_extra={"pattern": COLOR_PATTERN})
+    
+    @field_validator('color')
+    @classmethod
+    def validate_color(cls, v):
+        """Validate note color."""
+        return _validate_color(v)
 
 
 class NoteUpdate(BaseModel):
@@ -231,12 +287,23 @@ class NoteUpdate(BaseModel):
     title: Optional[str] = Field(None, min_length=1, max_length=200)
     content: Optional[str] = Field(None, min_length=1)
     tags: Optional[List[str]] = None
-    color: Optional[str] = Field(None, pattern="^#[0-9A-Fa-f]{6}$")
+    color: Optional[str] = Field(None, json_schema_extra={"pattern": COLOR_PATTERN})
     pinned: Optional[bool] = None
+    
+    @field_validator('color')
+    @classmethod
+    def validate_color(cls, v):
+        """Validate note color."""
+        return _validate_color(v)
 
 
 class NoteResponse(BaseModel):
-    """Response model for note."""
+    """
+    Response model for note.
+    
+    Used for the OpenAPI schema; endpoints return Note.to_dict() directly
+    through ORJSONResponse since it already has exactly these fields.
+    """
     note_id: str
     title: str
     content: str
@@ -249,8 +316,8 @@ class NoteResponse(BaseModel):
     pinned: bool
 
 
-@router.post("/notes", response_model=NoteResponse)
-async def create_note(note: NoteCreate):
+@router.post("/notes", response_model=NoteResponse, response_class=ORJSONResponse)
+async def create_note(note: NoteCreate, background_tasks: BackgroundTasks):
     """Create a new note."""
     try:
         manager = get_note_manager()
@@ -263,18 +330,18 @@ async def create_note(note: NoteCreate):
             color=note.color
         )
         
-        # Record in progress
+        # Record in progress once the response is sent
         tracker = get_progress_tracker()
-        tracker.record_note_created()
+        background_tasks.add_task(tracker.record_note_created)
         
-        return NoteResponse(**created_note.to_dict())
+        return ORJSONResponse(created_note.to_dict())
         
     except Exception as e:
         logger.error(f"Note creation failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/notes", response_model=List[NoteResponse])
+@router.get("/notes", response_model=List[NoteResponse], response_class=ORJSONResponse)
 async def list_notes(
     tag: Optional[str] = Query(None),
     document_id: Optional[str] = Query(None),
@@ -291,14 +358,14 @@ async def list_notes(
             pinned_only=pinned_only
         )
         
-        return [NoteResponse(**note.to_dict()) for note in notes]
+        return ORJSONResponse([note.to_dict() for note in notes])
         
     except Exception as e:
         logger.error(f"Failed to list notes: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/notes/{note_id}", response_model=NoteResponse)
+@router.get("/notes/{note_id}", response_model=NoteResponse, response_class=ORJSONResponse)
 async def get_note(note_id: str):
     """Get a specific note by ID."""
     try:
@@ -308,7 +375,7 @@ async def get_note(note_id: str):
         if not note:
             raise HTTPException(status_code=404, detail="Note not found")
         
-        return NoteResponse(**note.to_dict())
+        return ORJSONResponse(note.to_dict())
         
     except HTTPException:
         raise
@@ -317,7 +384,7 @@ async def get_note(note_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.patch("/notes/{note_id}", response_model=NoteResponse)
+@router.patch("/notes/{note_id}", response_model=NoteResponse, response_class=ORJSONResponse)
 async def update_note(note_id: str, update: NoteUpdate):
     """Update an existing note."""
     try:
@@ -331,7 +398,7 @@ async def update_note(note_id: str, update: NoteUpdate):
             pinned=update.pinned
         )
         
-        return NoteResponse(**updated_note.to_dict())
+        return ORJSONResponse(updated_note.to_dict())
         
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
@@ -359,14 +426,14 @@ async def delete_note(note_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/notes/search/{query}", response_model=List[NoteResponse])
+@router.get("/notes/search/{query}", response_model=List[NoteResponse], response_class=ORJSONResponse)
 async def search_notes(query: str):
     """Search notes by content or title."""
     try:
         manager = get_note_manager()
         notes = manager.search_notes(query)
         
-        return [NoteResponse(**note.to_dict()) for note in notes]
+        return ORJSONResponse([note.to_dict() for note in notes])
         
     except Exception as e:
         logger.error(f"Note search failed: {e}")
@@ -429,7 +496,6 @@ async def get_achievements():
     """Get all earned achievements."""
     try:
         tracker = get_progress_tracker()
-        achievements = tracker.progress.achievements
         
         return [
             AchievementResponse(
@@ -440,7 +506,7 @@ async def get_achievements():
                 earned_at=a.earned_at,
                 category=a.category
             )
-            for a in sorted(achievements, key=lambda x: x.earned_at, reverse=True)
+            for a in tracker.get_recent_achievements()
         ]
         
     except Exception as e:
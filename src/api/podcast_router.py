@@ -5,7 +5,9 @@ Podcast Generation API Router
 Provides REST API endpoints for podcast generation from documents.
 """
 
-from fastapi import APIRouter, HTTPException, Query, BackgroundTasks
+import asyncio
+import os
+from fastapi import APIRouter, HTTPException, Query, BackgroundTasks, Request, Response
 from fastapi.responses import FileResponse
 from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any, Literal
@@ -13,13 +15,36 @@ from pathlib import Path
 import logging
 
 from src.agents import AgentConfig, AgentType
-from src.agents.podcast_agent import PodcastAgent, SUPPORTED_VOICES, SUPPORTED_FORMATS, PODCAST_STYLES
+from src.agents.podcast_agent import (
+    PodcastAgent,
+    SUPPORTED_VOICES,
+    SUPPORTED_FORMATS,
+    PODCAST_STYLES,
+    TTS_AVAILABLE,
+    DOCUMENT_SEARCH_AVAILABLE
+)
 from src.providers.openai_provider import OpenAIProvider
 
+try:
+    import httpx
+    from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+except ImportError:
+    AsyncOpenAI = None
+
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/v1/podcasts", tags=["podcasts"])
 
+_PODCAST_DIR = Path("podcasts")
+
+# Audio media type by podcast file suffix
+_MEDIA_TYPES = {
+    ".mp3": "audio/mpeg",
+    ".opus": "audio/opus",
+    ".aac": "audio/aac",
+    ".flac": "audio/flac"
+}
+
 
 # Request/Response Models
 class PodcastGenerationRequest(BaseModel):
@@ -129,9 +154,22 @@ agent_config = AgentConfig(
     temperature=0.7
 )
 
-# Initialize LLM provider
+# Initialize LLM provider (sync fallback for agents without an async client)
 llm_provider = OpenAIProvider()
 
+# Shared async client for script generation and TTS; keeps one keep-alive
+# connection pool for all podcast requests. Each podcast fans out one TTS
+# call per script chunk, so allow more connections than the default.
+async_client = AsyncOpenAI(
+    api_key=llm_provider.api_key,
+    http_client=DefaultAsyncHttpxClient(
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=50)
+    )
+) if AsyncOpenAI else None
+
+# The agent holds no per-request state, so one instance serves every request
+podcast_agent = PodcastAgent(agent_config, llm_provider, async_client=async_client)
+
 
 @router.post("/generate", response_model=PodcastResponse)
 async def generate_podcast(request: PodcastGenerationRequest):
@@ -148,9 +186,6 @@ async def generate_podcast(request: PodcastGenerationRequest):
     4. Return script and audio file path
     """
     try:
-        # Create podcast agent
-        agent = PodcastAgent(agent_config, llm_provider)
-        
         # Build context
         context = {
             "document_id": request.document_id,
@@ -163,17 +198,13 @@ async def generate_podcast(request: PodcastGenerationRequest):
         
         # Generate podcast
         logger.info(f"Generating podcast: {request.query}")
-        result = agent.process(request.query, context)
+        result = await podcast_agent.aprocess(request.query, context)
         
-        # Extract metadata
+        # Extract metadata and build audio URL from a single parsed path
         audio_file = result.metadata.get("audio_file")
-        podcast_id = Path(audio_file).stem if audio_file else f"podcast_{request.query[:20]}"
-        
-        # Build audio URL
-        audio_url = None
-        if audio_file:
-            filename = Path(audio_file).name
-            audio_url = f"/v1/podcasts/download/{filename}"
+        audio_path = Path(audio_file) if audio_file else None
+        podcast_id = audio_path.stem if audio_path else f"podcast_{request.query[:20]}"
+        audio_url = f"/v1/podcasts/download/{audio_path.name}" if audio_path else None
         
         # Format sources
         sources = [
@@ -206,35 +237,64 @@ async def generate_podcast(request: PodcastGenerationRequest):
         raise HTTPException(status_code=500, detail=f"Podcast generation failed: {str(e)}")
 
 
+class PodcastFileResponse(FileResponse):
+    """
+    FileResponse for podcast audio.
+    
+    Reads 1 MiB per chunk instead of Starlette's 64 KiB, so a multi-megabyte
+    episode takes far fewer event loop round trips. Range requests (seeking)
+    are handled by FileResponse itself.
+    """
+    chunk_size = 1024 * 1024
+
+
+# Podcast files are never rewritten in place, so clients may cache them
+PODCAST_CACHE_CONTROL = "public, max-age=3600"
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Check an If-None-Match header value against a strong ETag."""
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
 @router.get("/download/{filename}")
-async def download_podcast(filename: str):
+async def download_podcast(filename: str, request: Request):
     """
     Download a generated podcast audio file.
     
-    Returns the audio file for playback or download.
+    Returns the audio file for playback or download, or 304 Not Modified
+    when the client's cached copy (If-None-Match) is still current.
     """
     try:
         # Construct file path
-        file_path = Path("podcasts") / filename
+        file_path = _PODCAST_DIR / filename
         
-        # Validate file exists
-        if not file_path.exists():
+        # Validate file exists; the stat result is reused for the response headers
+        try:
+            stat_result = file_path.stat()
+        except FileNotFoundError:
             raise HTTPException(status_code=404, detail="Podcast not found")
         
-        # Determine media type
-        ext = file_path.suffix.lower()
-        media_types = {
-            ".mp3": "audio/mpeg",
-            ".opus": "audio/opus",
-            ".aac": "audio/aac",
-            ".flac": "audio/flac"
-        }
-        media_type = media_types.get(ext, "audio/mpeg")
+        etag = f'"{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"'
+        cache_headers = {"ETag": etag, "Cache-Control": PODCAST_CACHE_CONTROL}
         
-        return FileResponse(
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and _etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=cache_headers)
+        
+        # Determine media type (generated filenames use lowercase suffixes)
+        media_type = _MEDIA_TYPES.get(file_path.suffix, "audio/mpeg")
+        
+        return PodcastFileResponse(
             path=str(file_path),
             media_type=media_type,
-            filename=filename
+            filename=filename,
+            stat_result=stat_result,
+            headers=cache_headers
         )
         
     except HTTPException:
@@ -244,6 +304,48 @@ async def download_podcast(filename: str):
         raise HTTPException(status_code=500, detail=f"Download failed: {str(e)}")
 
 
+# Cached /list payload, keyed on the podcasts directory mtime. Adding or
+# removing a file bumps the mtime, so a rescan only happens after a change.
+PODCAST_SUFFIXES = frozenset(_MEDIA_TYPES)
+_podcast_list_cache: Dict[str, Any] = {"mtime": -1, "payload": []}
+_podcast_list_lock = asyncio.Lock()
+
+
+def _scan_podcasts(podcast_dir: Path) -> List[PodcastMetadata]:
+    """
+    Build podcast metadata for every audio file in the directory.
+    
+    Args:
+        podcast_dir: Directory holding generated podcasts
+        
+    Returns:
+        Podcast metadata, newest first
+    """
+    podcasts = []
+    with os.scandir(podcast_dir) as entries:
+        for entry in entries:
+            stem, suffix = os.path.splitext(entry.name)
+            if suffix not in PODCAST_SUFFIXES or not entry.is_file():
+                continue
+            
+            stat = entry.stat()
+            podcasts.append(
+                PodcastMetadata(
+                    podcast_id=stem,
+                    query="[Unknown]",  # Could store this in metadata file
+                    style="conversational",
+                    voice="nova",
+                    format=suffix[1:],
+                    duration_target=5,
+                    file_path=entry.path,
+                    file_size=stat.st_size,
+                    created_at=str(stat.st_mtime)
+                )
+            )
+    
+    return sorted(podcasts, key=lambda x: x.created_at, reverse=True)
+
+
 @router.get("/list", response_model=List[PodcastMetadata])
 async def list_podcasts():
     """
@@ -252,34 +354,23 @@ async def list_podcasts():
     Returns metadata for all podcasts in the podcasts directory.
     """
     try:
-        podcast_dir = Path("podcasts")
+        podcast_dir = _PODCAST_DIR
         
-        if not podcast_dir.exists():
+        try:
+            dir_mtime = podcast_dir.stat().st_mtime_ns
+        except FileNotFoundError:
             return []
         
-        podcasts = []
-        for file_path in podcast_dir.glob("*"):
-            if file_path.is_file() and file_path.suffix in [".mp3", ".opus", ".aac", ".flac"]:
-                stat = file_path.stat()
-                
-                # Parse filename for metadata
-                podcast_id = file_path.stem
-                
-                podcasts.append(
-                    PodcastMetadata(
-                        podcast_id=podcast_id,
-                        query="[Unknown]",  # Could store this in metadata file
-                        style="conversational",
-                        voice="nova",
-                        format=file_path.suffix[1:],
-                        duration_target=5,
-                        file_path=str(file_path),
-                        file_size=stat.st_size,
-                        created_at=str(stat.st_mtime)
-                    )
-                )
+        if dir_mtime == _podcast_list_cache["mtime"]:
+            return _podcast_list_cache["payload"]
+        
+        # Only one request rebuilds; the rest wait and reuse its result
+        async with _podcast_list_lock:
+            if dir_mtime != _podcast_list_cache["mtime"]:
+                _podcast_list_cache["payload"] = _scan_podcasts(podcast_dir)
+                _podcast_list_cache["mtime"] = dir_mtime
         
-        return sorted(podcasts, key=lambda x: x.created_at, reverse=True)
+        return _podcast_list_cache["payload"]
         
     except Exception as e:
         logger.error(f"Failed to list podcasts: {e}", exc_info=True)
@@ -295,14 +386,19 @@ async def delete_podcast(podcast_id: str):
     """
     try:
         # Find matching file
-        podcast_dir = Path("podcasts")
+        podcast_dir = _PODCAST_DIR
         
+        # Podcasts can only have one of the supported suffixes, so try each
+        # directly instead of listing the directory
         deleted = False
-        for file_path in podcast_dir.glob(f"{podcast_id}.*"):
-            if file_path.is_file():
+        for ext in SUPPORTED_FORMATS:
+            file_path = podcast_dir / f"{podcast_id}.{ext}"
+            try:
                 file_path.unlink()
-                deleted = True
-                logger.info(f"Deleted podcast: {file_path}")
+            except FileNotFoundError:
+                continue
+            deleted = True
+            logger.info(f"Deleted podcast: {file_path}")
         
         if not deleted:
             raise HTTPException(status_code=404, detail="Podcast not found")
@@ -326,44 +422,58 @@ async def get_podcast_options():
     return AvailableOptions()
 
 
-@router.get("/health")
-async def podcast_health():
+# /health is polled by load balancers, so its probes run at import and are
+# refreshed periodically by refresh_health() instead of on every request
+HEALTH_REFRESH_SECONDS = 30
+
+
+def _probe_health() -> Dict[str, Any]:
     """
-    Check podcast service health.
+    Probe TTS, the podcast directory and document search.
     
-    Verifies TTS availability and podcast directory.
+    Returns:
+        Health payload served by /health
     """
-    # Check OpenAI availability
-    tts_available = False
-    try:
-        from openai import OpenAI
-        import os
-        if os.getenv("OPENAI_API_KEY"):
-            tts_available = True
-    except ImportError:
-        pass
-    
-    # Check podcast directory
-    podcast_dir = Path("podcasts")
-    podcast_dir_exists = podcast_dir.exists()
-    
-    # Check document search
-    doc_search_available = False
-    try:
-        from src.documents import get_document_search_service
-        doc_search_available = True
-    except ImportError:
-        pass
-    
-    status = "healthy" if tts_available else "degraded"
+    tts_available = TTS_AVAILABLE and bool(os.getenv("OPENAI_API_KEY"))
     
     return {
-        "status": status,
+        "status": "healthy" if tts_available else "degraded",
         "tts_available": tts_available,
-        "podcast_directory": str(podcast_dir),
-        "podcast_directory_exists": podcast_dir_exists,
-        "document_search_available": doc_search_available,
+        "podcast_directory": str(_PODCAST_DIR),
+        "podcast_directory_exists": _PODCAST_DIR.exists(),
+        "document_search_available": DOCUMENT_SEARCH_AVAILABLE,
         "supported_voices": SUPPORTED_VOICES,
         "supported_formats": SUPPORTED_FORMATS,
         "supported_styles": PODCAST_STYLES
     }
+
+
+_health = _probe_health()
+
+
+async def refresh_health(interval: float = HEALTH_REFRESH_SECONDS):
+    """
+    Re-probe podcast health every interval seconds.
+    
+    Runs until cancelled; started from the app lifespan.
+    
+    Args:
+        interval: Seconds between probes
+    """
+    global _health
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            _health = _probe_health()
+        except Exception as e:
+            logger.error(f"Podcast health probe failed: {e}")
+
+
+@router.get("/health")
+async def podcast_health():
+    """
+    Check podcast service health.
+    
+    Reports TTS availability and podcast directory, as of the last probe.
+    """
+    return _health
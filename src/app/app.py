@@ -4,24 +4,35 @@ FastAPI Application
 Main application that includes all API routes and middleware.
 """
 
+import asyncio
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, ORJSONResponse
 from fastapi.staticfiles import StaticFiles
+import itertools
+import secrets
+import orjson
 import time
-import uuid
 import os
 
-from src.api.chat_router import chat_router
+from src.api.chat_router import chat_router, search_api_key_configured
 from src.api.cost_router import cost_router
 from src.api.agent_router import agent_router  # NEW MULTI-AGENT FEATURE
 from src.api.document_router import document_router  # STUDENT ASSISTANT FEATURE
-from src.api.podcast_router import router as podcast_router  # STUDENT ASSISTANT FEATURE - PHASE 5
+from src.api.podcast_router import router as podcast_router, refresh_health as refresh_podcast_health  # STUDENT ASSISTANT FEATURE - PHASE 5
 from src.api.learning_router import router as learning_router  # STUDENT ASSISTANT FEATURE - PHASE 8
-from src.infra.middleware import CostTrackingMiddleware
-from src.logging_config import setup_logging
+from src.documents.processor import shutdown_extractor_pool  # STUDENT ASSISTANT FEATURE
+from src.infra.middleware import CostTrackingMiddleware, UNTRACKED_PATHS, get_middleware_instance
+from src.logging_config import setup_logging, trace_id_var
+
+logger = logging.getLogger(__name__)
+
+
+# Worker threads for blocking provider calls (see lifespan)
+LLM_THREAD_POOL_SIZE = 32
 
 
 @asynccontextmanager
@@ -31,13 +42,32 @@ async def lifespan(app: FastAPI):
     setup_logging()
     logging.info("AI Chatbot application starting up")
     
-    # Store middleware instance in app state for cost router access
-    cost_middleware = CostTrackingMiddleware(app, buffer_size=1000)
-    app.state.cost_middleware = cost_middleware
+    if not search_api_key_configured():
+        logging.warning(
+            "OPENAI_API_KEY is not set - chat requests with use_search will fail"
+        )
+    
+    # Expose the installed middleware (it registers itself when the
+    # middleware stack is built, before lifespan runs) for cost router access
+    app.state.cost_middleware = get_middleware_instance()
+    
+    # Blocking LLM/TTS calls run in the default executor; size it so many
+    # provider round-trips can be in flight at once
+    executor = ThreadPoolExecutor(max_workers=LLM_THREAD_POOL_SIZE)
+    asyncio.get_running_loop().set_default_executor(executor)
+    
+    # Build the OpenAPI schema now so the first /docs hit doesn't pay for it
+    app.openapi()
+    
+    # Keep the podcast /health payload fresh in the background
+    podcast_health_task = asyncio.create_task(refresh_podcast_health())
     
     yield
     # Shutdown
     logging.info("AI Chatbot application shutting down")
+    podcast_health_task.cancel()
+    shutdown_extractor_pool()
+    executor.shutdown(wait=False)
 
 
 # Create FastAPI application
@@ -47,6 +77,7 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -63,35 +94,63 @@ app.add_middleware(
 )
 
 
+# Trace IDs: random per-process seed + low 32 bits of the clock + counter.
+# Unique across processes without paying for uuid4() on every request.
+_PROC_SEED = secrets.token_bytes(8).hex()
+_trace_counter = itertools.count()
+
+
+def _make_trace_id() -> str:
+    """Generate a 32-hex-char trace ID for a request."""
+    return (
+        _PROC_SEED
+        + format(time.time_ns() & 0xFFFFFFFF, "08x")
+        + format(next(_trace_counter) & 0xFFFFFFFF, "08x")
+    )
+
+
 @app.middleware("http")
 async def request_logging_middleware(request: Request, call_next):
     """Log all HTTP requests with timing and trace ID."""
-    trace_id = str(uuid.uuid4())
-    start_time = time.time()
+    # Health probes skip trace IDs, logging and header writes entirely
+    if request.url.path in UNTRACKED_PATHS:
+        return await call_next(request)
+    
+    trace_id = _make_trace_id()
+    start_time = time.perf_counter()
     
-    # Add trace ID to request state
+    # Add trace ID to request state; the context var carries it into logs
     request.state.trace_id = trace_id
+    token = trace_id_var.set(trace_id)
     
-    # Log request
-    logger = logging.getLogger(__name__)
-    logger.info(
-        f"Request started - {request.method} {request.url.path} "
-        f"(trace_id: {trace_id})"
-    )
+    # Only pay for log formatting when INFO is actually emitted
+    log_info = logger.isEnabledFor(logging.INFO)
     
     try:
+        # Log request (one JSON object per line for log aggregation)
+        if log_info:
+            logger.info(orjson.dumps({
+                "evt": "req_start",
+                "method": request.method,
+                "path": request.url.path,
+                "trace_id": trace_id,
+            }).decode())
+        
         response = await call_next(request)
         
         # Calculate processing time
-        process_time = time.time() - start_time
+        process_time = time.perf_counter() - start_time
         
         # Log response
-        logger.info(
-            f"Request completed - {request.method} {request.url.path} "
-            f"Status: {response.status_code} "
-            f"Time: {process_time:.3f}s "
-            f"(trace_id: {trace_id})"
-        )
+        if log_info:
+            logger.info(orjson.dumps({
+                "evt": "req_end",
+                "method": request.method,
+                "path": request.url.path,
+                "status": response.status_code,
+                "ms": round(process_time * 1000, 3),
+                "trace_id": trace_id,
+            }).decode())
         
         # Add headers
         response.headers["X-Trace-ID"] = trace_id
@@ -101,14 +160,18 @@ async def request_logging_middleware(request: Request, call_next):
         
     except Exception as e:
         # Calculate processing time
-        process_time = time.time() - start_time
+        process_time = time.perf_counter() - start_time
         
         # Log error
         logger.error(
-            f"Request failed - {request.method} {request.url.path} "
-            f"Error: {str(e)} "
-            f"Time: {process_time:.3f}s "
-            f"(trace_id: {trace_id})",
+            orjson.dumps({
+                "evt": "req_error",
+                "method": request.method,
+                "path": request.url.path,
+                "error": str(e),
+                "ms": round(process_time * 1000, 3),
+                "trace_id": trace_id,
+            }).decode(),
             exc_info=True
         )
         
@@ -124,11 +187,50 @@ async def request_logging_middleware(request: Request, call_next):
                 "X-Process-Time": str(process_time)
             }
         )
+    finally:
+        trace_id_var.reset(token)
+
+
+# Static assets are resolved once at import; the UI endpoints then avoid
+# rebuilding paths and stat-ing the files on every request
+_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+static_dir = os.path.join(_ROOT, "static")
+_INDEX = os.path.join(static_dir, "index.html")
+_INDEX_EXISTS = os.path.isfile(_INDEX)
+_STUDENT = os.path.join(static_dir, "student.html")
+_STUDENT_EXISTS = os.path.isfile(_STUDENT)
+
+UI_CACHE_CONTROL = "public, max-age=300"
+
+
+def _file_etag(path: str, exists: bool) -> str:
+    """Build a strong ETag from a file's mtime and size (empty if missing)."""
+    if not exists:
+        return ""
+    stat_result = os.stat(path)
+    return f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+
+_INDEX_ETAG = _file_etag(_INDEX, _INDEX_EXISTS)
+_STUDENT_ETAG = _file_etag(_STUDENT, _STUDENT_EXISTS)
+
+
+def _ui_response(request: Request, path: str, etag: str) -> Response:
+    """Serve a UI page, answering 304 when the client's copy is current."""
+    cache_headers = {"ETag": etag, "Cache-Control": UI_CACHE_CONTROL}
+    
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and any(
+        candidate.strip().removeprefix("W/") in (etag, "*")
+        for candidate in if_none_match.split(",")
+    ):
+        return Response(status_code=304, headers=cache_headers)
+    
+    return FileResponse(path, headers=cache_headers)
 
 
 # Mount static files
-static_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "static")
-if os.path.exists(static_dir):
+if os.path.isdir(static_dir):
     app.mount("/static", StaticFiles(directory=static_dir), name="static")
 
 # Include routers
@@ -147,11 +249,10 @@ async def health_check():
 
 
 @app.get("/")
-async def root():
+async def root(request: Request):
     """Serve the chatbot UI."""
-    static_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "static", "index.html")
-    if os.path.exists(static_path):
-        return FileResponse(static_path)
+    if _INDEX_EXISTS:
+        return _ui_response(request, _INDEX, _INDEX_ETAG)
     else:
         return {
             "service": "AI Chatbot",
@@ -163,11 +264,10 @@ async def root():
 
 
 @app.get("/student")
-async def student_ui():
+async def student_ui(request: Request):
     """Serve the Student Assistant UI."""
-    static_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "static", "student.html")
-    if os.path.exists(static_path):
-        return FileResponse(static_path)
+    if _STUDENT_EXISTS:
+        return _ui_response(request, _STUDENT, _STUDENT_ETAG)
     else:
         return {
             "error": "Student UI not found",
@@ -177,4 +277,15 @@ async def student_ui():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("src.app.app:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    # The request logging middleware already records every request, so
+    # uvicorn's access log is off unless DEV_ACCESS_LOG is set
+    dev_access_log = os.getenv("DEV_ACCESS_LOG", "").lower() in ("1", "true", "yes")
+    uvicorn.run(
+        "src.app.app:app",
+        host="0.0.0.0",
+        port=8000,
+        reload=True,
+        access_log=dev_access_log,
+        proxy_headers=False,
+        log_level="info" if dev_access_log else "warning"
+    )
\ No newline at end of file
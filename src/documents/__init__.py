@@ -43,6 +43,9 @@ from .search_service import (
     search_documents
 )
 
+from .embedding_cache import EmbeddingCache
+from .query_cache import QueryCache, SemanticQueryCache
+
 
 def check_dependencies() -> dict:
     """
@@ -121,6 +124,9 @@ __all__ = [
     'DocumentSearchService',
     'get_document_search_service',
     'search_documents',
+    'EmbeddingCache',
+    'QueryCache',
+    'SemanticQueryCache',
     
     # Utilities
     'check_dependencies'
@@ -0,0 +1,151 @@
+# STUDENT ASSISTANT FEATURE
+"""
+Embedding Cache
+
+Persistent cache of chunk embeddings keyed on a hash of the embedding model
+name and the chunk text, so content that was embedded before (re-uploaded
+documents, front and back matter shared between textbooks) is not encoded
+again. Embeddings are stored as float16 in a SQLite file.
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+
+# Hashes looked up per SELECT, well below SQLite's bound-parameter limit
+LOOKUP_BATCH_SIZE = 500
+
+
+class EmbeddingCache:
+    """
+    Thread-safe SQLite cache of text embeddings.
+    
+    A cache that cannot open its file logs a warning and behaves as if it
+    were always empty.
+    """
+    
+    def __init__(self, path: str, model_name: str):
+        """
+        Initialize the cache.
+        
+        Args:
+            path: SQLite file to store embeddings in (":memory:" for a
+                non-persistent cache)
+            model_name: Embedding model; embeddings of other models stored
+                in the same file are never returned
+        """
+        self.path = path
+        self.model_name = model_name
+        
+        self.hits = 0
+        self.misses = 0
+        
+        self._lock = threading.Lock()
+        self._model_hash = hashlib.blake2b(model_name.encode("utf-8") + b"\0", digest_size=16)
+        self._db: Optional[sqlite3.Connection] = None
+        self._open_db()
+    
+    def _open_db(self) -> None:
+        """Open the SQLite file, creating the table on first use."""
+        try:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            # Only used under self._lock, so sharing it across threads is safe;
+            # writes commit through the connection's context manager
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS emb_cache (hash BLOB PRIMARY KEY, vec BLOB)"
+            )
+        except (sqlite3.Error, OSError) as e:
+            logger.warning("Embedding cache disabled (%s): %s", self.path, e)
+            self._db = None
+    
+    def _hash(self, text: str) -> bytes:
+        """Hash a text together with the model name."""
+        hasher = self._model_hash.copy()
+        hasher.update(text.encode("utf-8"))
+        return hasher.digest()
+    
+    def get_many(self, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """
+        Look up cached embeddings.
+        
+        Args:
+            texts: Texts to look up
+        
+        Returns:
+            Float16 embedding for each cached text, None for the rest
+        """
+        hashes = [self._hash(text) for text in texts]
+        found = {}
+        
+        with self._lock:
+            if self._db is not None:
+                try:
+                    for start in range(0, len(hashes), LOOKUP_BATCH_SIZE):
+                        batch = hashes[start:start + LOOKUP_BATCH_SIZE]
+                        rows = self._db.execute(
+                            "SELECT hash, vec FROM emb_cache WHERE hash IN "
+                            f"({','.join('?' * len(batch))})",
+                            batch
+                        ).fetchall()
+                        found.update(rows)
+                except sqlite3.Error as e:
+                    logger.warning("Embedding cache lookup failed: %s", e)
+            
+            embeddings = [
+                np.frombuffer(found[h], dtype=np.float16) if h in found else None
+                for h in hashes
+            ]
+            hits = sum(embedding is not None for embedding in embeddings)
+            self.hits += hits
+            self.misses += len(embeddings) - hits
+        
+        return embeddings
+    
+    def put_many(self, texts: Sequence[str], embeddings: np.ndarray) -> None:
+        """
+        Store embeddings.
+        
+        Args:
+            texts: Embedded texts
+            embeddings: Their embeddings, one row per text
+        """
+        rows = [
+            (self._hash(text), vector.tobytes())
+            for text, vector in zip(texts, np.asarray(embeddings, dtype=np.float16))
+        ]
+        
+        with self._lock:
+            if self._db is None:
+                return
+            try:
+                with self._db:
+                    self._db.executemany(
+                        "INSERT OR REPLACE INTO emb_cache (hash, vec) VALUES (?, ?)", rows
+                    )
+            except sqlite3.Error as e:
+                logger.warning("Failed to store embeddings in cache: %s", e)
+    
+    def clear(self) -> None:
+        """Drop all cached embeddings."""
+        with self._lock:
+            if self._db is not None:
+                with self._db:
+                    self._db.execute("DELETE FROM emb_cache")
+    
+    def close(self) -> None:
+        """Close the SQLite file."""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
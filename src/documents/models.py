@@ -5,11 +5,21 @@ Document Models
 Data models for the student assistant document processing system.
 """
 
+import heapq
+import time
+from collections import defaultdict
 from dataclasses import dataclass, field
+from operator import attrgetter
 from datetime import datetime
 from typing import Optional, List, Dict, Any
 from enum import Enum
 
+import numpy as np
+
+
+# Sort key for newest-first document listings
+_UPLOAD_DATE = attrgetter("upload_date")
+
 
 class DocumentType(Enum):
     """Supported document types."""
@@ -27,7 +37,7 @@ class ProcessingStatus(Enum):
     ERROR = "error"
 
 
-@dataclass
+@dataclass(slots=True)
 class Chapter:
     """Represents a chapter or section within a document."""
     id: str
@@ -39,7 +49,7 @@ class Chapter:
     content_preview: Optional[str] = None  # First 200 chars
     
     
-@dataclass
+@dataclass(slots=True)
 class Document:
     """Represents an uploaded document in the student library."""
     id: str
@@ -74,6 +84,24 @@ class Document:
     notes: Optional[str] = None
     reading_progress: float = 0.0  # 0.0 to 1.0
     
+    # Integrity
+    content_hash: Optional[str] = None  # hex digest of the file bytes
+    
+    # Chapter lookup by ID; call rebuild_chapter_index after replacing chapters
+    _chapters_by_id: Dict[str, Chapter] = field(default_factory=dict, init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        """Index the chapters the document was created with."""
+        self.rebuild_chapter_index()
+    
+    def rebuild_chapter_index(self) -> None:
+        """Rebuild the chapter-by-ID index from ``chapters``."""
+        self._chapters_by_id = {chapter.id: chapter for chapter in self.chapters}
+    
+    def get_chapter(self, chapter_id: str) -> Optional[Chapter]:
+        """Get a chapter by ID."""
+        return self._chapters_by_id.get(chapter_id)
+    
     @property
     def file_extension(self) -> str:
         """Get file extension from type."""
@@ -90,7 +118,7 @@ class Document:
         return self.file_size / (1024 * 1024)
 
 
-@dataclass
+@dataclass(slots=True)
 class DocumentChunk:
     """Represents a chunk of text from a document for vector search."""
     id: str
@@ -104,16 +132,27 @@ class DocumentChunk:
     start_char: Optional[int] = None
     end_char: Optional[int] = None
     
-    # Vector embedding
-    embedding: Optional[List[float]] = None
+    # Vector embedding (contiguous float32, not a list of boxed floats);
+    # excluded from __eq__, which cannot compare arrays
+    embedding: Optional[np.ndarray] = field(default=None, compare=False)
     embedding_model: Optional[str] = None
     
     # Content metadata
     word_count: int = 0
     language: str = "en"
     
-    # Processing metadata
-    created_date: datetime = field(default_factory=datetime.now)
+    # Processing metadata (epoch seconds; see created_date)
+    created_ts: float = field(default_factory=time.time)
+    
+    def __post_init__(self):
+        """Store embeddings as float32 arrays whatever form they arrive in."""
+        if self.embedding is not None:
+            self.embedding = np.asarray(self.embedding, dtype=np.float32)
+    
+    @property
+    def created_date(self) -> datetime:
+        """Get creation time as a datetime."""
+        return datetime.fromtimestamp(self.created_ts)
     
     @property
     def preview(self) -> str:
@@ -121,7 +160,7 @@ class DocumentChunk:
         return self.text[:100] + "..." if len(self.text) > 100 else self.text
 
 
-@dataclass
+@dataclass(slots=True)
 class SearchResult:
     """Result from document search."""
     chunk: DocumentChunk
@@ -140,7 +179,7 @@ class SearchResult:
             parts.append(f"by {self.document.author}")
         
         if self.chunk.chapter_id:
-            chapter = next((c for c in self.document.chapters if c.id == self.chunk.chapter_id), None)
+            chapter = self.document.get_chapter(self.chunk.chapter_id)
             if chapter:
                 parts.append(f"Chapter: {chapter.title}")
         
@@ -150,7 +189,7 @@ class SearchResult:
         return ", ".join(parts)
 
 
-@dataclass
+@dataclass(slots=True)
 class DocumentLibrary:
     """Represents a user's document library."""
     user_id: str
@@ -167,16 +206,33 @@ class DocumentLibrary:
     collections: Dict[str, List[str]] = field(default_factory=dict)  # collection_name -> doc_ids
     favorites: List[str] = field(default_factory=list)  # doc_ids
     
+    # Lookup indexes over documents, maintained by add_document
+    _by_id: Dict[str, Document] = field(default_factory=dict, init=False, repr=False, compare=False)
+    _by_subject: Dict[Optional[str], List[Document]] = field(
+        default_factory=lambda: defaultdict(list), init=False, repr=False, compare=False
+    )
+    
+    def __post_init__(self):
+        """Index any documents the library was created with."""
+        for document in self.documents:
+            self._index_document(document)
+    
+    def _index_document(self, document: Document) -> None:
+        """Add a document to the lookup indexes."""
+        self._by_id[document.id] = document
+        self._by_subject[document.subject].append(document)
+    
     def add_document(self, document: Document) -> None:
         """Add document to library."""
         self.documents.append(document)
+        self._index_document(document)
         self.total_documents += 1
         self.total_size_bytes += document.file_size
         self.last_accessed = datetime.now()
     
     def get_document(self, doc_id: str) -> Optional[Document]:
         """Get document by ID."""
-        return next((doc for doc in self.documents if doc.id == doc_id), None)
+        return self._by_id.get(doc_id)
     
     def search_by_title(self, query: str) -> List[Document]:
         """Search documents by title."""
@@ -185,11 +241,11 @@ class DocumentLibrary:
     
     def get_by_subject(self, subject: str) -> List[Document]:
         """Get documents by subject."""
-        return [doc for doc in self.documents if doc.subject == subject]
+        return list(self._by_subject.get(subject, ()))
     
     def get_recent(self, limit: int = 10) -> List[Document]:
         """Get recently uploaded documents."""
-        return sorted(self.documents, key=lambda d: d.upload_date, reverse=True)[:limit]
+        return heapq.nlargest(limit, self.documents, key=_UPLOAD_DATE)
 
 
 @dataclass
@@ -5,9 +5,16 @@ Document Processing Module
 Handles file upload, parsing, and text extraction for various document types.
 """
 
+import asyncio
+import hashlib
+import io
+import multiprocessing
 import os
+import re
 import uuid
 import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
 from pathlib import Path
 from typing import Optional, List, BinaryIO, Dict, Any
@@ -21,6 +28,19 @@ from .models import (
 )
 
 
+# Uploads are written to disk in chunks of this size
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1 MiB
+
+# Digest stored on each Document to detect corrupted or replaced files
+CONTENT_HASH_ALGORITHM = "blake2b"
+
+
+def file_content_hash(file_path: Path) -> str:
+    """Compute the content hash of a file on disk."""
+    with open(file_path, 'rb') as f:
+        return hashlib.file_digest(f, CONTENT_HASH_ALGORITHM).hexdigest()
+
+
 class DocumentProcessor:
     """Handles document upload and processing."""
     
@@ -38,39 +58,23 @@ class DocumentProcessor:
         
         self.max_file_size = 100 * 1024 * 1024  # 100MB
     
-    async def upload_document(
-        self, 
-        file: UploadFile, 
-        user_id: str,
-        metadata: Optional[Dict[str, Any]] = None
-    ) -> Document:
+    def get_document_type(self, content_type: Optional[str]) -> DocumentType:
         """
-        Upload and process a document file.
+        Resolve an upload's MIME type to a supported document type.
         
-        Args:
-            file: Uploaded file
-            user_id: ID of the user uploading
-            metadata: Optional metadata (title, author, etc.)
-            
-        Returns:
-            Document object with basic info (processing happens async)
-            
         Raises:
             UnsupportedFileTypeError: If file type not supported
-            HTTPException: If file too large or other validation fails
         """
-        # Validate file type
-        if file.content_type not in self.supported_types:
+        document_type = self.supported_types.get(content_type)
+        if document_type is None:
             raise UnsupportedFileTypeError(
-                f"File type {file.content_type} not supported. "
-                f"Supported types: {list(self.supported_types.keys())}"
+                f"File type {content_type} not supported. "
+                f"Supported types: {list(self.supported_types)}"
             )
-        
-        # Validate file size
-        file_size = 0
-        content = await file.read()
-        file_size = len(content)
-        
+        return document_type
+    
+    def _validate_file_size(self, file_size: int) -> None:
+        """Reject empty uploads and uploads above the size limit."""
         if file_size > self.max_file_size:
             raise HTTPException(
                 status_code=413,
@@ -79,39 +83,88 @@ class DocumentProcessor:
         
         if file_size == 0:
             raise HTTPException(status_code=400, detail="Empty file uploaded")
-        
-        # Generate document ID and file path
-        doc_id = str(uuid.uuid4())
-        file_extension = self.supported_types[file.content_type].value
-        filename = f"{doc_id}.{file_extension}"
-        file_path = self.upload_dir / filename
-        
-        # Save file
-        async with aiofiles.open(file_path, 'wb') as f:
-            await f.write(content)
-        
+    
+    def _create_document(
+        self,
+        doc_id: str,
+        file_path: Path,
+        file_size: int,
+        document_type: DocumentType,
+        filename: Optional[str],
+        metadata: Optional[Dict[str, Any]],
+        content_hash: Optional[str] = None
+    ) -> Document:
+        """Build the Document record for a saved upload."""
         # Extract basic metadata
         title = metadata.get("title") if metadata else None
         if not title:
-            title = file.filename or f"Document_{doc_id[:8]}"
+            title = filename or f"Document_{doc_id[:8]}"
             # Remove file extension from title
             title = Path(title).stem
         
-        # Create document object
-        document = Document(
+        return Document(
             id=doc_id,
             title=title,
-            file_type=self.supported_types[file.content_type],
+            file_type=document_type,
             file_path=str(file_path),
             file_size=file_size,
             upload_date=datetime.now(),
+            content_hash=content_hash,
             author=metadata.get("author") if metadata else None,
             description=metadata.get("description") if metadata else None,
             subject=metadata.get("subject") if metadata else None,
             processing_status=ProcessingStatus.PENDING
         )
+    
+    async def upload_document(
+        self, 
+        file: UploadFile, 
+        user_id: str,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> Document:
+        """
+        Upload and process a document file.
+        
+        Args:
+            file: Uploaded file
+            user_id: ID of the user uploading
+            metadata: Optional metadata (title, author, etc.)
+            
+        Returns:
+            Document object with basic info (processing happens async)
+            
+        Raises:
+            UnsupportedFileTypeError: If file type not supported
+            HTTPException: If file too large or other validation fails
+        """
+        # Validate file type
+        document_type = self.get_document_type(file.content_type)
+        
+        # Generate document ID and file path
+        doc_id = str(uuid.uuid4())
+        file_path = self.upload_dir / f"{doc_id}.{document_type.value}"
+        
+        # Stream to disk in bounded chunks, validating size as we go, so
+        # memory use per upload stays constant regardless of file size
+        # (hashing each chunk on the way through saves a second read)
+        file_size = 0
+        hasher = hashlib.new(CONTENT_HASH_ALGORITHM)
+        try:
+            async with aiofiles.open(file_path, 'wb') as f:
+                while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                    file_size += len(chunk)
+                    self._validate_file_size(file_size)
+                    hasher.update(chunk)
+                    await f.write(chunk)
+            self._validate_file_size(file_size)
+        except Exception:
+            file_path.unlink(missing_ok=True)
+            raise
         
-        return document
+        return self._create_document(
+            doc_id, file_path, file_size, document_type, file.filename, metadata,
+            content_hash=hasher.hexdigest()
+        )
     
     def get_file_info(self, file_path: str) -> Dict[str, Any]:
         """Get basic file information."""
@@ -148,9 +201,15 @@ class DocumentProcessor:
             if not file_path.exists():
                 return False
             
-            # Check file size matches
+            # Check file size matches (cheap, catches truncation)
             actual_size = file_path.stat().st_size
-            return actual_size == document.file_size
+            if actual_size != document.file_size:
+                return False
+            
+            # Check the bytes themselves when a digest was recorded
+            if document.content_hash is None:
+                return True
+            return file_content_hash(file_path) == document.content_hash
             
         except Exception:
             return False
@@ -176,10 +235,50 @@ try:
 except ImportError:
     EPUB_AVAILABLE = False
 
+# HTML-to-text for EPUB chapters: selectolax (fastest) if installed,
+# otherwise lxml, which ebooklib already depends on
+try:
+    from selectolax.parser import HTMLParser
+    SELECTOLAX_AVAILABLE = True
+except ImportError:
+    SELECTOLAX_AVAILABLE = False
+
+try:
+    import lxml.html
+    import lxml.etree
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
 
 class TextExtractor:
     """Extracts text content from various document types."""
     
+    # Every whitespace character except newline (what [^\S\n] matches),
+    # spelled out so it can share a character class with letters
+    _INLINE_SPACE = r'\t\x0b\x0c\r\x1c-\x1f \x85\xa0\u1680\u2000-\u200a\u2028\u2029\u202f\u205f\u3000'
+    
+    # Chapter headings, matched per line (surrounding whitespace ignored):
+    # "Chapter N: Title", "N. Title", or an ALL CAPS heading
+    _CHAPTER_RE = re.compile(
+        r'^[^\S\n]*(?:'
+        r'chapter[^\S\n]+(\d+)[:' + _INLINE_SPACE + r']*(.*)'
+        r'|\d+\.[^\S\n]+(\S.*)'
+        r'|([A-Z][A-Z' + _INLINE_SPACE + r']{9,}[A-Z])'
+        r')[^\S\n]*$',
+        re.IGNORECASE | re.MULTILINE
+    )
+    
+    # A non-blank line, starting at its first non-whitespace character
+    _CONTENT_LINE_RE = re.compile(r'\S[^\n]*')
+    
+    # Fallback HTML tag stripping and whitespace collapsing for EPUB chapters
+    _HTML_TAG_RE = re.compile(r'<[^>]+>')
+    _WHITESPACE_RE = re.compile(r'\s+')
+    
+    # Elements whose text is never part of the readable chapter
+    _NON_TEXT_TAGS = ("script", "style")
+    
     def __init__(self):
         self.extractors = {
             DocumentType.PDF: self._extract_pdf,
@@ -207,6 +306,35 @@ class TextExtractor:
         except Exception as e:
             raise DocumentParsingError(f"Failed to extract text: {str(e)}")
     
+    async def extract_text_async(self, document: Document) -> Dict[str, Any]:
+        """
+        Extract text content from document in a worker process.
+        
+        Parsing is CPU-bound, so it runs in the extractor process pool
+        instead of blocking the event loop or contending for the GIL.
+        Returns the same dict as ``extract_text``.
+        """
+        if document.file_type not in self.extractors:
+            raise UnsupportedFileTypeError(f"No extractor for {document.file_type}")
+        
+        loop = asyncio.get_running_loop()
+        for _ in range(EXTRACTION_ATTEMPTS):
+            pool = get_extractor_pool()
+            try:
+                return await loop.run_in_executor(
+                    pool, _extract_in_worker,
+                    document.file_type, document.file_path
+                )
+            except BrokenProcessPool as e:
+                # A worker died (e.g. killed for running out of memory), which
+                # breaks the whole pool; replace it so later uploads still work
+                _discard_extractor_pool(pool)
+                error = e
+            except Exception as e:
+                raise DocumentParsingError(f"Failed to extract text: {str(e)}")
+        
+        raise DocumentParsingError(f"Failed to extract text: extraction worker died ({error})")
+    
     def _extract_txt(self, file_path: str) -> Dict[str, Any]:
         """Extract text from plain text file."""
         with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
@@ -227,7 +355,9 @@ class TextExtractor:
         if not PDF_AVAILABLE:
             raise DocumentParsingError("PyPDF2 not installed. Cannot process PDF files.")
         
-        text_content = []
+        # Pages are written into one growing buffer rather than collected
+        # as per-page strings and joined (which holds the text twice)
+        buf = io.StringIO()
         page_count = 0
         
         with open(file_path, 'rb') as file:
@@ -238,12 +368,16 @@ class TextExtractor:
                 try:
                     page_text = page.extract_text()
                     if page_text.strip():
-                        text_content.append(f"[Page {page_num}]\n{page_text}\n")
+                        if buf.tell():
+                            buf.write('\n')
+                        buf.write(f"[Page {page_num}]\n")
+                        buf.write(page_text)
+                        buf.write('\n')
                 except Exception:
                     # Skip pages that can't be processed
                     continue
         
-        full_text = "\n".join(text_content)
+        full_text = buf.getvalue()
         chapters = self._detect_chapters_in_text(full_text)
         
         # Try to extract PDF metadata
@@ -314,12 +448,7 @@ class TextExtractor:
         for item in book.get_items():
             if item.get_type() == ebooklib.ITEM_DOCUMENT:
                 # Parse HTML content
-                content = item.get_content().decode('utf-8')
-                
-                # Simple HTML tag removal (basic)
-                import re
-                text = re.sub(r'<[^>]+>', '', content)
-                text = re.sub(r'\s+', ' ', text).strip()
+                text = self._html_to_text(item.get_content())
                 
                 if text:
                     chapter_title = item.get_name() or f"Chapter {len(chapters) + 1}"
@@ -348,66 +477,139 @@ class TextExtractor:
             "page_count": None
         }
     
+    def _html_to_text(self, content: bytes) -> str:
+        """Extract the readable body text of an (X)HTML document."""
+        if SELECTOLAX_AVAILABLE:
+            tree = HTMLParser(content.decode('utf-8'))
+            tree.strip_tags(list(self._NON_TEXT_TAGS))
+            text = tree.body.text() if tree.body else ''
+        elif LXML_AVAILABLE:
+            try:
+                root = lxml.html.document_fromstring(
+                    content, parser=lxml.html.HTMLParser(encoding='utf-8')
+                )
+            except (lxml.etree.ParserError, ValueError):
+                return ''
+            for element in list(root.iter(*self._NON_TEXT_TAGS)):
+                element.drop_tree()
+            body = root.find('body')
+            text = ''.join((body if body is not None else root).itertext())
+        else:
+            # Simple HTML tag removal (basic)
+            text = self._HTML_TAG_RE.sub('', content.decode('utf-8'))
+        
+        return self._WHITESPACE_RE.sub(' ', text).strip()
+    
     def _detect_chapters_in_text(self, text: str) -> List[Chapter]:
         """Detect chapter boundaries in text using common patterns."""
-        import re
-        
         chapters = []
-        
-        # Common chapter patterns
-        patterns = [
-            r'^Chapter\s+(\d+)[:\s]*(.*)$',
-            r'^CHAPTER\s+(\d+)[:\s]*(.*)$',
-            r'^\d+\.\s+(.+)$',
-            r'^([A-Z][A-Z\s]{10,})$',  # ALL CAPS headings
-        ]
-        
-        lines = text.split('\n')
         current_chapter = None
-        chapter_text = []
-        
-        for i, line in enumerate(lines):
-            line = line.strip()
-            if not line:
-                continue
-            
-            # Check if line matches chapter pattern
-            is_chapter = False
-            chapter_title = None
-            
-            for pattern in patterns:
-                match = re.match(pattern, line, re.IGNORECASE)
-                if match:
-                    if len(match.groups()) >= 2:
-                        chapter_title = f"Chapter {match.group(1)}: {match.group(2)}"
-                    else:
-                        chapter_title = match.group(1) if match.groups() else line
-                    is_chapter = True
-                    break
-            
-            if is_chapter and chapter_title:
-                # Save previous chapter
-                if current_chapter and chapter_text:
-                    current_chapter.content_preview = ' '.join(chapter_text)[:200]
+        section_start = 0
+        
+        # One C-level scan over the whole text finds every heading line
+        for match in self._CHAPTER_RE.finditer(text):
+            if current_chapter:
+                preview = self._section_preview(text, section_start, match.start())
+                if preview:
+                    current_chapter.content_preview = preview
                     chapters.append(current_chapter)
-                
-                # Start new chapter
-                current_chapter = Chapter(
-                    id=str(uuid.uuid4()),
-                    title=chapter_title.strip()
-                )
-                chapter_text = []
+            
+            number, title, numbered_title, caps_title = match.groups()
+            if number is not None:
+                chapter_title = f"Chapter {number}: {title}"
             else:
-                # Add to current chapter content
-                if current_chapter:
-                    chapter_text.append(line)
+                chapter_title = numbered_title if numbered_title is not None else caps_title
+            
+            current_chapter = Chapter(
+                id=str(uuid.uuid4()),
+                title=chapter_title.strip()
+            )
+            section_start = match.end()
         
         # Add final chapter
-        if current_chapter and chapter_text:
-            current_chapter.content_preview = ' '.join(chapter_text)[:200]
-            chapters.append(current_chapter)
+        if current_chapter:
+            preview = self._section_preview(text, section_start, len(text))
+            if preview:
+                current_chapter.content_preview = preview
+                chapters.append(current_chapter)
         
         return chapters
+    
+    def _section_preview(self, text: str, start: int, end: int) -> str:
+        """Join the non-blank lines of ``text[start:end]``, capped at 200 chars."""
+        parts = []
+        length = -1
+        for line in self._CONTENT_LINE_RE.finditer(text, start, end):
+            part = line.group().rstrip()
+            parts.append(part)
+            length += len(part) + 1
+            if length >= 200:
+                break
+        return ' '.join(parts)[:200]
+
+
+# Process pool for CPU-bound text extraction (created on first use)
+_extractor_pool: Optional[ProcessPoolExecutor] = None
+
+# Tries per document when its worker dies; the pool is replaced each time,
+# so documents that were in flight on a pool another document broke are
+# retried, while one that keeps killing its worker fails on its own
+EXTRACTION_ATTEMPTS = 2
+
+# Per-worker-process extractor used by _extract_in_worker
+_worker_extractor: Optional[TextExtractor] = None
+
+
+def _extract_in_worker(file_type: DocumentType, file_path: str) -> Dict[str, Any]:
+    """Run the extractor for ``file_type`` inside a pool worker process."""
+    global _worker_extractor
+    
+    if _worker_extractor is None:
+        _worker_extractor = TextExtractor()
+    return _worker_extractor.extractors[file_type](file_path)
+
+
+def get_extractor_pool() -> ProcessPoolExecutor:
+    """
+    Get or create the process pool used for text extraction.
+    
+    Workers are not forked from this process: by the time the pool starts,
+    the embedding model and thread pools have started threads, and forking
+    a multi-threaded process can deadlock the child.
+    
+    Returns:
+        ProcessPoolExecutor with one worker per CPU
+    """
+    global _extractor_pool
+    
+    if _extractor_pool is None:
+        start_method = (
+            "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        )
+        _extractor_pool = ProcessPoolExecutor(
+            max_workers=os.cpu_count(),
+            mp_context=multiprocessing.get_context(start_method)
+        )
+    return _extractor_pool
+
+
+def _discard_extractor_pool(pool: ProcessPoolExecutor) -> None:
+    """Drop a broken pool so the next extraction starts a new one."""
+    global _extractor_pool
+    
+    # Concurrent extractions may all see the same pool break
+    if _extractor_pool is pool:
+        _extractor_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_extractor_pool() -> None:
+    """Shut down the extraction process pool if it was started."""
+    global _extractor_pool
+    
+    if _extractor_pool is not None:
+        _extractor_pool.shutdown(wait=False, cancel_futures=True)
+        _extractor_pool = None
 
 
 # Availability check
@@ -0,0 +1,235 @@
+# STUDENT ASSISTANT FEATURE
+"""
+Embedding Quantization
+
+int8 and binary (1 bit per dimension) quantization of chunk embeddings,
+and the on-disk binary index used by VectorDatabaseService.
+"""
+
+import os
+import json
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+
+
+# Binary index exported under db_path; its Hamming ranking proposes this
+# many candidates per result for exact re-ranking
+BINARY_INDEX_DIRNAME = "binary_index"
+BINARY_RERANK_MULTIPLIER = 10
+BINARY_EXPORT_BATCH_SIZE = 1024
+
+# Without its manifest, a (possibly partly written) index is never loaded
+_MANIFEST_FILENAME = "ids.json"
+_CODES_FILENAME = "codes.bin"
+
+# Set bits in each byte value
+_POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+
+def _normalize_rows(matrix: Any) -> np.ndarray:
+    """
+    L2-normalize embeddings row by row.
+    
+    Args:
+        matrix: Embeddings, shape (n, d)
+        
+    Returns:
+        Float32 matrix whose non-zero rows have unit length
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms > 0, norms, 1.0)
+
+
+def quantize_int8(embeddings: Any) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Quantize embeddings to int8 with a symmetric per-row scale.
+    
+    Rows are L2-normalized first, then each row is scaled so its largest
+    component maps to 127.
+    
+    Args:
+        embeddings: Embeddings, shape (n, d)
+        
+    Returns:
+        int8 matrix of shape (n, d) and float32 scales of shape (n,), such
+        that ``quantized * scales[:, None]`` approximates the normalized rows
+    """
+    normalized = _normalize_rows(embeddings)
+    scales = np.abs(normalized).max(axis=1) / 127.0
+    scales = np.where(scales > 0, scales, 1.0).astype(np.float32)
+    quantized = np.clip(np.round(normalized / scales[:, None]), -127, 127).astype(np.int8)
+    return quantized, scales
+
+
+def dequantize_int8(quantized: np.ndarray, scales: np.ndarray) -> np.ndarray:
+    """
+    Expand int8 embeddings back to float32 (inverse of quantize_int8).
+    
+    Args:
+        quantized: int8 matrix, shape (n, d)
+        scales: Per-row scales, shape (n,)
+        
+    Returns:
+        Float32 matrix, shape (n, d)
+    """
+    return quantized.astype(np.float32) * scales[:, None]
+
+
+def embedding_scales(metadatas: List[dict]) -> Optional[np.ndarray]:
+    """
+    Collect the int8 scales recorded for stored chunks.
+    
+    Returns:
+        Float32 scales, one per chunk, or None when any chunk was stored
+        without one (e.g. added before quantization was enabled)
+    """
+    scales = [metadata.get("embedding_scale") for metadata in metadatas]
+    if not scales or any(scale is None for scale in scales):
+        return None
+    return np.asarray(scales, dtype=np.float32)
+
+
+def dot_int8(query: np.ndarray, candidates: np.ndarray) -> np.ndarray:
+    """
+    Dot products of int8 vectors, accumulated in int32.
+    
+    Args:
+        query: int8 query codes, shape (d,)
+        candidates: int8 candidate codes, shape (n, d)
+        
+    Returns:
+        int32 dot products, shape (n,)
+    """
+    return np.einsum("nd,d->n", candidates, query, dtype=np.int32)
+
+
+def score_int8(
+    query: np.ndarray,
+    candidates: Any,
+    candidate_scales: np.ndarray
+) -> np.ndarray:
+    """
+    Score stored int8 embeddings against a query in the int8 domain.
+    
+    ChromaDB returns the dequantized candidates; their int8 codes are
+    recovered with the recorded scales, the query is quantized the same
+    way, and the integer dot product is scaled back to cosine similarity.
+    
+    Args:
+        query: Query embedding, shape (d,)
+        candidates: Dequantized candidate embeddings, shape (n, d)
+        candidate_scales: Per-candidate scales from quantize_int8, shape (n,)
+        
+    Returns:
+        Float32 similarity scores, shape (n,)
+    """
+    query_codes, query_scales = quantize_int8(np.asarray(query, dtype=np.float32).reshape(1, -1))
+    candidate_codes = np.clip(
+        np.round(np.asarray(candidates, dtype=np.float32) / candidate_scales[:, None]), -127, 127
+    ).astype(np.int8)
+    return dot_int8(query_codes[0], candidate_codes).astype(np.float32) * (candidate_scales * query_scales[0])
+
+
+def write_binary_index(collection: Any, index_dir: str, dimension: int) -> int:
+    """
+    Write the sign bits of every embedding in a collection to ``index_dir``.
+    
+    Codes go to a memory-mapped file, 32x smaller than float32; the
+    manifest of chunk IDs is written last.
+    
+    Args:
+        collection: ChromaDB collection to export
+        index_dir: Directory for the index files
+        dimension: Embedding dimension
+        
+    Returns:
+        Number of chunks in the exported index
+    """
+    os.makedirs(index_dir, exist_ok=True)
+    remove_binary_index(index_dir)
+    
+    total = collection.count()
+    codes = np.memmap(
+        os.path.join(index_dir, _CODES_FILENAME),
+        dtype=np.uint8,
+        mode="w+",
+        shape=(max(total, 1), (dimension + 7) // 8)
+    )
+    chunk_ids: List[str] = []
+    
+    for offset in range(0, total, BINARY_EXPORT_BATCH_SIZE):
+        batch = collection.get(
+            include=["embeddings"],
+            limit=BINARY_EXPORT_BATCH_SIZE,
+            offset=offset
+        )
+        if not len(batch["ids"]):
+            break
+        embeddings = np.asarray(batch["embeddings"], dtype=np.float32)
+        codes[len(chunk_ids):len(chunk_ids) + len(batch["ids"])] = np.packbits(embeddings > 0, axis=1)
+        chunk_ids.extend(batch["ids"])
+    
+    codes.flush()
+    del codes
+    
+    with open(os.path.join(index_dir, _MANIFEST_FILENAME), "w") as f:
+        json.dump({"dimension": dimension, "ids": chunk_ids}, f)
+    
+    return len(chunk_ids)
+
+
+def load_binary_index(index_dir: str, dimension: int) -> Optional[Tuple[List[str], np.ndarray]]:
+    """
+    Memory-map a binary index written by write_binary_index.
+    
+    Args:
+        index_dir: Directory of the index files
+        dimension: Expected embedding dimension
+        
+    Returns:
+        Chunk IDs and their codes, or None when there is no complete,
+        non-empty index of that dimension
+    """
+    manifest_path = os.path.join(index_dir, _MANIFEST_FILENAME)
+    if not os.path.exists(manifest_path):
+        return None
+    
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    if manifest["dimension"] != dimension or not manifest["ids"]:
+        return None
+    
+    codes = np.memmap(
+        os.path.join(index_dir, _CODES_FILENAME),
+        dtype=np.uint8,
+        mode="r",
+        shape=(len(manifest["ids"]), (dimension + 7) // 8)
+    )
+    return manifest["ids"], codes
+
+
+def remove_binary_index(index_dir: str) -> None:
+    """Remove the manifest of a binary index so it is no longer loaded."""
+    manifest_path = os.path.join(index_dir, _MANIFEST_FILENAME)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+
+
+def hamming_candidates(codes: np.ndarray, query_embedding: np.ndarray, k: int) -> np.ndarray:
+    """
+    Find the codes nearest to a query by Hamming distance between sign bits.
+    
+    Args:
+        codes: Packed sign bits, shape (n, ceil(d / 8))
+        query_embedding: Query embedding, shape (d,)
+        k: Number of candidates, at most n
+        
+    Returns:
+        Row indices of the ``k`` nearest codes, unordered
+    """
+    # Set bits of the XOR, via a byte lookup table
+    query_code = np.packbits(query_embedding > 0)
+    distances = _POPCOUNT[np.bitwise_xor(codes, query_code)].sum(axis=1, dtype=np.int32)
+    return np.argpartition(distances, k - 1)[:k]
@@ -0,0 +1,426 @@
+# STUDENT ASSISTANT FEATURE
+"""
+Semantic Query Cache
+
+Bounded LRU + TTL caches of document search results: QueryCache keys on
+the exact query and filters; SemanticQueryCache keys on the query embedding
+so near-duplicate questions reuse earlier results, and can optionally be
+written through to a SQLite file so it survives restarts.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+
+# Defaults for DocumentSearchService's cache
+DEFAULT_MAX_ENTRIES = 512
+DEFAULT_TTL_SECONDS = 300.0
+DEFAULT_SIMILARITY = 0.85
+
+# Larger caches store embeddings as int8: unit-vector components lie in
+# [-1, 1], so a fixed scale needs no training and similarity error stays
+# around 1e-2, well inside the hit threshold's margin
+QUANTIZE_ABOVE_ENTRIES = 1024
+INT8_SCALE = 127
+
+# Defaults for VectorDatabaseService's exact-match cache
+DEFAULT_EXACT_MAX_ENTRIES = 2000
+DEFAULT_EXACT_TTL_SECONDS = 600.0
+
+
+class QueryCache:
+    """
+    Thread-safe LRU + TTL cache of search results keyed on the exact query.
+    
+    Keys are any hashable tuple of the query and its filters; values are
+    returned as shallow copies so callers cannot mutate cached lists.
+    """
+    
+    def __init__(
+        self,
+        max_size: int = DEFAULT_EXACT_MAX_ENTRIES,
+        ttl_seconds: float = DEFAULT_EXACT_TTL_SECONDS
+    ):
+        """
+        Initialize the cache.
+        
+        Args:
+            max_size: Maximum number of cached queries
+            ttl_seconds: Lifetime of a cached entry
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        
+        self.hits = 0
+        self.misses = 0
+        
+        self._lock = threading.RLock()
+        self._entries: "OrderedDict[Hashable, Tuple[float, List[Any]]]" = OrderedDict()
+    
+    def __len__(self) -> int:
+        """Number of cached entries (including any not yet found expired)."""
+        return len(self._entries)
+    
+    def get(self, key: Hashable) -> Optional[List[Any]]:
+        """
+        Look up results for a query.
+        
+        Args:
+            key: Query and filter key
+        
+        Returns:
+            Copy of the cached results, or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(entry[1])
+    
+    def put(self, key: Hashable, results: List[Any]) -> None:
+        """
+        Cache results for a query, evicting the least recently used entry when full.
+        
+        Args:
+            key: Query and filter key
+            results: Search results to cache
+        """
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, list(results))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def clear(self) -> None:
+        """Drop all cached entries (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters, hit rate and current size."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class SemanticQueryCache:
+    """
+    Cache of search results looked up by cosine similarity of query embeddings.
+    
+    Embeddings are L2-normalized into a fixed-size float32 matrix, so a lookup
+    is one matrix-vector product. Entries only match queries with the same
+    filter key (result count, threshold, document filter), expire after
+    ``ttl_seconds``, and the least recently used entry is evicted when full.
+    
+    Caches larger than QUANTIZE_ABOVE_ENTRIES keep embeddings as int8,
+    cutting the matrix to a quarter of its float32 size.
+    
+    With ``persist_path`` set, every insert and eviction is written through
+    to SQLite as JSON, and unexpired entries are loaded back on construction.
+    Persisted filter keys must be tuples of JSON values; results are
+    converted with ``result_encoder``/``result_decoder``.
+    """
+    
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        similarity: float = DEFAULT_SIMILARITY,
+        persist_path: Optional[str] = None,
+        quantize: Optional[bool] = None,
+        result_encoder: Optional[Callable[[Any], Any]] = None,
+        result_decoder: Optional[Callable[[Any], Any]] = None
+    ):
+        """
+        Initialize the cache.
+        
+        Args:
+            max_entries: Maximum number of cached queries
+            ttl_seconds: Lifetime of a cached entry
+            similarity: Minimum cosine similarity for a cache hit
+            persist_path: SQLite file to persist entries in (optional)
+            quantize: Store embeddings as int8 (defaults to True above
+                QUANTIZE_ABOVE_ENTRIES entries)
+            result_encoder: Converts a result to a JSON value for persistence
+                (defaults to storing results as they are)
+            result_decoder: Rebuilds a result from its persisted JSON value
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity = similarity
+        self.persist_path = persist_path
+        self.quantize = max_entries > QUANTIZE_ABOVE_ENTRIES if quantize is None else quantize
+        self._result_encoder = result_encoder or _identity
+        self._result_decoder = result_decoder or _identity
+        
+        self.hits = 0
+        self.misses = 0
+        
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._reset()
+        
+        if persist_path:
+            self._open_db(persist_path)
+    
+    def _reset(self) -> None:
+        """Allocate empty per-slot storage."""
+        # Allocated on first insert, once the embedding dimension is known
+        self._vectors: Optional[np.ndarray] = None
+        self._key_ids = np.full(self.max_entries, -1, dtype=np.int64)
+        self._expires = np.zeros(self.max_entries, dtype=np.float64)
+        self._last_used = np.zeros(self.max_entries, dtype=np.float64)
+        self._keys: List[Optional[Hashable]] = [None] * self.max_entries
+        self._results: List[Optional[List[Any]]] = [None] * self.max_entries
+        self._row_ids = np.full(self.max_entries, -1, dtype=np.int64)
+        self._key_index: Dict[Hashable, int] = {}
+    
+    def _open_db(self, path: str) -> None:
+        """Open the SQLite file and load its unexpired entries."""
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            # Only used under self._lock, so sharing it across threads is safe
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "id INTEGER PRIMARY KEY, cache_key BLOB, query_vec BLOB, "
+                "results BLOB, expiry REAL, last_access REAL)"
+            )
+            self._load()
+        except (sqlite3.Error, OSError) as e:
+            logger.warning("Query cache persistence disabled (%s): %s", path, e)
+            self._db = None
+    
+    def _load(self) -> None:
+        """Fill the in-memory slots from the most recently used persisted entries."""
+        wall_now = time.time()
+        now = time.monotonic()
+        self._db.execute("DELETE FROM entries WHERE expiry <= ?", (wall_now,))
+        rows = self._db.execute(
+            "SELECT id, cache_key, query_vec, results, expiry, last_access FROM entries "
+            "ORDER BY last_access DESC LIMIT ?",
+            (self.max_entries,)
+        ).fetchall()
+        
+        stale = []
+        for slot, (row_id, cache_key, query_vec, results, expiry, last_access) in enumerate(rows):
+            try:
+                key = _as_hashable(json.loads(cache_key))
+                vector = np.frombuffer(query_vec, dtype=np.float32)
+                entries = [self._result_decoder(item) for item in json.loads(results)]
+            except Exception:
+                # Written by an incompatible version of the code
+                stale.append((row_id,))
+                continue
+            
+            if self._vectors is None:
+                self._allocate(vector.shape[0])
+            elif vector.shape[0] != self._vectors.shape[1]:
+                stale.append((row_id,))
+                continue
+            
+            self._vectors[slot] = self._encode(vector)
+            self._key_ids[slot] = self._key_index.setdefault(key, len(self._key_index))
+            self._keys[slot] = key
+            self._results[slot] = entries
+            self._row_ids[slot] = row_id
+            # Wall-clock timestamps become offsets from the monotonic clock
+            self._expires[slot] = now + (expiry - wall_now)
+            self._last_used[slot] = now + (last_access - wall_now)
+        
+        self._db.executemany("DELETE FROM entries WHERE id = ?", stale)
+        self._db.execute(
+            "DELETE FROM entries WHERE id NOT IN (SELECT id FROM entries "
+            "ORDER BY last_access DESC LIMIT ?)",
+            (self.max_entries,)
+        )
+    
+    def clear(self) -> None:
+        """Drop all cached entries (counters are kept)."""
+        with self._lock:
+            self._reset()
+            if self._db is not None:
+                self._db.execute("DELETE FROM entries")
+    
+    def __len__(self) -> int:
+        """Number of live (unexpired) entries."""
+        now = time.monotonic()
+        return int(np.count_nonzero((self._key_ids >= 0) & (self._expires > now)))
+    
+    def get(self, embedding: np.ndarray, key: Hashable) -> Optional[List[Any]]:
+        """
+        Look up results for a query similar to ``embedding``.
+        
+        Args:
+            embedding: Query embedding
+            key: Filter key the cached query must share
+        
+        Returns:
+            Copy of the cached results, or None on a miss
+        """
+        vector = _normalize(embedding)
+        now = time.monotonic()
+        
+        with self._lock:
+            key_id = self._key_index.get(key)
+            if key_id is None or self._vectors is None:
+                self.misses += 1
+                return None
+            
+            if self.quantize:
+                scores = np.einsum(
+                    "ij,j->i", self._vectors, self._encode(vector), dtype=np.int32
+                ) / float(INT8_SCALE * INT8_SCALE)
+            else:
+                scores = self._vectors @ vector
+            candidates = (self._key_ids == key_id) & (self._expires > now)
+            scores[~candidates] = -np.inf
+            
+            slot = int(np.argmax(scores))
+            if scores[slot] < self.similarity:
+                self.misses += 1
+                return None
+            
+            self._last_used[slot] = now
+            self.hits += 1
+            return list(self._results[slot])
+    
+    def put(self, embedding: np.ndarray, key: Hashable, results: List[Any]) -> None:
+        """
+        Cache results for a query.
+        
+        Args:
+            embedding: Query embedding
+            key: Filter key the query was run with
+            results: Search results to cache
+        """
+        vector = _normalize(embedding)
+        now = time.monotonic()
+        
+        with self._lock:
+            if self._vectors is not None and self._vectors.shape[1] != vector.shape[0]:
+                # The embedding model changed; nothing cached can match
+                self._reset()
+                if self._db is not None:
+                    self._db.execute("DELETE FROM entries")
+            if self._vectors is None:
+                self._allocate(vector.shape[0])
+            
+            # Reuse an empty or expired slot, otherwise evict the LRU entry
+            free = np.flatnonzero((self._key_ids < 0) | (self._expires <= now))
+            slot = int(free[0]) if free.size else int(np.argmin(self._last_used))
+            self._key_ids[slot] = -1
+            self._keys[slot] = None
+            evicted_row = int(self._row_ids[slot])
+            self._row_ids[slot] = -1
+            
+            if key not in self._key_index and len(self._key_index) >= self.max_entries:
+                self._compact_keys()
+            key_id = self._key_index.setdefault(key, len(self._key_index))
+            
+            self._vectors[slot] = self._encode(vector)
+            self._key_ids[slot] = key_id
+            self._keys[slot] = key
+            self._expires[slot] = now + self.ttl_seconds
+            self._last_used[slot] = now
+            self._results[slot] = list(results)
+            
+            if self._db is not None:
+                self._write_through(slot, evicted_row, key, vector, results)
+    
+    def _write_through(
+        self,
+        slot: int,
+        evicted_row: int,
+        key: Hashable,
+        vector: np.ndarray,
+        results: List[Any]
+    ) -> None:
+        """Persist a new entry and drop the one it replaced."""
+        try:
+            if evicted_row >= 0:
+                self._db.execute("DELETE FROM entries WHERE id = ?", (evicted_row,))
+            wall_now = time.time()
+            cursor = self._db.execute(
+                "INSERT INTO entries (cache_key, query_vec, results, expiry, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (
+                    json.dumps(key),
+                    vector.tobytes(),
+                    json.dumps([self._result_encoder(result) for result in results]),
+                    wall_now + self.ttl_seconds,
+                    wall_now,
+                )
+            )
+            self._row_ids[slot] = cursor.lastrowid
+        except Exception as e:
+            logger.warning("Failed to persist query cache entry: %s", e)
+    
+    def _allocate(self, dimension: int) -> None:
+        """Allocate the embedding matrix once the dimension is known."""
+        dtype = np.int8 if self.quantize else np.float32
+        self._vectors = np.zeros((self.max_entries, dimension), dtype=dtype)
+    
+    def _encode(self, vector: np.ndarray) -> np.ndarray:
+        """Convert a normalized embedding to the matrix's storage type."""
+        if not self.quantize:
+            return vector
+        return np.round(vector * INT8_SCALE).astype(np.int8)
+    
+    def _compact_keys(self) -> None:
+        """Renumber filter keys so only keys of occupied slots stay indexed."""
+        self._key_index = {}
+        for slot in np.flatnonzero(self._key_ids >= 0):
+            self._key_ids[slot] = self._key_index.setdefault(
+                self._keys[slot], len(self._key_index)
+            )
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and current size."""
+        return {
+            "entries": len(self),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+def _identity(value: Any) -> Any:
+    """Default result encoder and decoder."""
+    return value
+
+
+def _as_hashable(value: Any) -> Any:
+    """Turn JSON arrays back into tuples, so decoded keys match the originals."""
+    if isinstance(value, list):
+        return tuple(_as_hashable(item) for item in value)
+    return value
+
+
+def _normalize(embedding: np.ndarray) -> np.ndarray:
+    """Return ``embedding`` as an L2-normalized float32 vector."""
+    vector = np.asarray(embedding, dtype=np.float32).ravel()
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
@@ -7,16 +7,149 @@ Integrates with the vector database for semantic search.
 """
 
 import os
+import asyncio
+import io
 import logging
-from typing import List, Dict, Any, Optional
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Hashable, Iterable, Iterator, List, Dict, Any, Optional, Tuple
 from datetime import datetime
 
+import numpy as np
+
 from .vector_service import VectorDatabaseService
 from .models import SearchResult
+from .query_cache import QueryCache, SemanticQueryCache
 
 
 logger = logging.getLogger(__name__)
 
+# Concurrent search() calls arriving within this window share one ANN query
+SEARCH_BATCH_WINDOW_SECONDS = 0.005
+SEARCH_BATCH_MAX_SIZE = 32
+
+# Byte-identical queries answered before any embedding work
+EXACT_CACHE_SIZE = 256
+
+# Candidates fetched per requested result, so results dropped by the
+# similarity threshold are replaced by the next-best chunks
+DEFAULT_OVERSAMPLE_FACTOR = 4
+
+# Semantic query cache file, kept next to the ChromaDB data
+QUERY_CACHE_FILENAME = "semantic_query_cache.sqlite"
+
+# How long collection stats are reused before asking ChromaDB again
+STATS_CACHE_TTL_SECONDS = 2.0
+
+# (max_results, similarity_threshold, document_ids) shared by a batch
+SearchKey = Tuple[int, float, Tuple[str, ...]]
+
+# SearchResult fields persisted by the semantic query cache, as set by
+# VectorDatabaseService
+_PERSISTED_RESULT_FIELDS = (
+    "chunk_id", "document_id", "document_title", "content", "similarity_score",
+    "page_number", "chapter_id", "chunk_type", "metadata"
+)
+
+
+class _SearchBatcher:
+    """
+    Coalesces concurrent searches into batched vector database queries.
+    
+    The first caller to arrive becomes the leader. While other searches are
+    in flight, it waits up to ``window_seconds`` (or until ``max_size``
+    queries are pending) for more queries to join; a search with nothing
+    else in flight runs straight away. The leader then runs every pending
+    query, grouped by search key, and completes each caller's future.
+    Other callers just wait on their own future.
+    """
+    
+    def __init__(
+        self,
+        run_batch: Callable[[SearchKey, List[str], List[np.ndarray]], List[List[SearchResult]]],
+        window_seconds: float = SEARCH_BATCH_WINDOW_SECONDS,
+        max_size: int = SEARCH_BATCH_MAX_SIZE
+    ):
+        """
+        Initialize the batcher.
+        
+        Args:
+            run_batch: Runs queries sharing a search key, returning results per query
+            window_seconds: How long the leader collects queries
+            max_size: Pending queries that flush the batch early
+        """
+        self.run_batch = run_batch
+        self.window_seconds = window_seconds
+        self.max_size = max_size
+        
+        self._cond = threading.Condition()
+        self._pending: List[Tuple[SearchKey, str, np.ndarray, Future]] = []
+        self._leader_active = False
+        # Callers inside submit(), pending or waiting on a running batch
+        self._in_flight = 0
+    
+    def submit(self, key: SearchKey, query: str, embedding: np.ndarray) -> List[SearchResult]:
+        """
+        Search for one query, batched with any concurrent callers.
+        
+        Args:
+            key: Search key (result count, threshold, document filter)
+            query: Search query
+            embedding: Query embedding
+            
+        Returns:
+            Search results for ``query``
+        """
+        future: Future = Future()
+        
+        with self._cond:
+            self._pending.append((key, query, embedding, future))
+            self._in_flight += 1
+            is_leader = not self._leader_active
+            if is_leader:
+                self._leader_active = True
+            elif len(self._pending) >= self.max_size:
+                self._cond.notify_all()
+        
+        try:
+            if is_leader:
+                with self._cond:
+                    # Alone, there is nothing to batch with: skip the window
+                    if self._in_flight > 1:
+                        self._cond.wait_for(
+                            lambda: len(self._pending) >= self.max_size,
+                            timeout=self.window_seconds
+                        )
+                    batch, self._pending = self._pending, []
+                    self._leader_active = False
+                self._flush(batch)
+            
+            return future.result()
+        finally:
+            with self._cond:
+                self._in_flight -= 1
+    
+    def _flush(self, batch: List[Tuple[SearchKey, str, np.ndarray, Future]]) -> None:
+        """Run a collected batch and complete each caller's future."""
+        groups: Dict[Hashable, List[Tuple[str, np.ndarray, Future]]] = {}
+        for key, query, embedding, future in batch:
+            groups.setdefault(key, []).append((query, embedding, future))
+        
+        for key, items in groups.items():
+            try:
+                results = self.run_batch(
+                    key,
+                    [query for query, _, _ in items],
+                    [embedding for _, embedding, _ in items]
+                )
+                for (_, _, future), query_results in zip(items, results):
+                    future.set_result(query_results)
+            except Exception as e:
+                for _, _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+
 
 class DocumentSearchService:
     """
@@ -29,7 +162,10 @@ class DocumentSearchService:
         self,
         vector_service: Optional[VectorDatabaseService] = None,
         db_path: str = "./data/chroma_db",
-        collection_name: str = "documents"
+        collection_name: str = "documents",
+        query_cache: Optional[SemanticQueryCache] = None,
+        batch_window_seconds: float = SEARCH_BATCH_WINDOW_SECONDS,
+        oversample_factor: int = DEFAULT_OVERSAMPLE_FACTOR
     ):
         """
         Initialize the document search service.
@@ -38,19 +174,59 @@ class DocumentSearchService:
             vector_service: Existing VectorDatabaseService instance (optional)
             db_path: Path to ChromaDB storage
             collection_name: ChromaDB collection name
+            query_cache: Cache for near-duplicate queries (optional; a default
+                SemanticQueryCache is created)
+            batch_window_seconds: How long concurrent searches are collected
+                into one database query (0 disables batching)
+            oversample_factor: Candidates fetched per requested result
+                before the similarity threshold is applied
         """
-        if vector_service:
-            self.vector_service = vector_service
-        else:
-            try:
-                self.vector_service = VectorDatabaseService(
-                    db_path=db_path,
-                    collection_name=collection_name
-                )
-                logger.info("Document search service initialized")
-            except Exception as e:
-                logger.error(f"Failed to initialize vector service: {e}")
-                self.vector_service = None
+        self.query_cache = query_cache if query_cache is not None else SemanticQueryCache()
+        self._oversample_factor = max(1, oversample_factor)
+        # Keyed on (query,) + _search_key(...)
+        self._exact_cache = QueryCache(max_size=EXACT_CACHE_SIZE, ttl_seconds=self.query_cache.ttl_seconds)
+        self._batcher = (
+            _SearchBatcher(self._run_batch, window_seconds=batch_window_seconds)
+            if batch_window_seconds > 0 else None
+        )
+        self._stats_cache: Optional[Tuple[Dict[str, Any], float]] = None
+        
+        # Without an injected service, ChromaDB and the embedding model are
+        # only loaded by the first call that needs them
+        self.db_path = db_path
+        self.collection_name = collection_name
+        self.vector_service = vector_service
+        self._vector_service_pending = vector_service is None
+        self._vector_service_lock = threading.Lock()
+        if vector_service is not None:
+            vector_service.add_invalidation_callback(self._on_collection_changed)
+    
+    def _ensure_vector_service(self) -> Optional[VectorDatabaseService]:
+        """
+        Create the vector database service on first use.
+        
+        A failed initialization is not retried; the service then stays
+        unavailable.
+        
+        Returns:
+            The vector database service, or None if it could not be created
+        """
+        if self._vector_service_pending:
+            with self._vector_service_lock:
+                if self._vector_service_pending:
+                    try:
+                        self.vector_service = VectorDatabaseService(
+                            db_path=self.db_path,
+                            collection_name=self.collection_name
+                        )
+                        self.vector_service.add_invalidation_callback(self._on_collection_changed)
+                        logger.info("Document search service initialized")
+                    except Exception as e:
+                        logger.error("Failed to initialize vector service: %s", e)
+                        self.vector_service = None
+                    self._vector_service_pending = False
+        
+        return self.vector_service
     
     def is_available(self) -> bool:
         """
@@ -59,7 +235,7 @@ class DocumentSearchService:
         Returns:
             True if the service is ready to search documents
         """
-        return self.vector_service is not None
+        return self._ensure_vector_service() is not None
     
     def has_documents(self) -> bool:
         """
@@ -72,12 +248,37 @@ class DocumentSearchService:
             return False
         
         try:
-            stats = self.vector_service.get_collection_stats()
+            stats = self._get_stats_cached()
             return stats.get("total_chunks", 0) > 0
         except Exception as e:
-            logger.error(f"Failed to check document availability: {e}")
+            logger.error("Failed to check document availability: %s", e)
             return False
     
+    def _get_stats_cached(self) -> Dict[str, Any]:
+        """
+        Get collection stats, reusing a result younger than STATS_CACHE_TTL_SECONDS.
+        
+        Returns:
+            Collection statistics from the vector service
+        """
+        now = time.monotonic()
+        cached = self._stats_cache
+        if cached is not None and now - cached[1] < STATS_CACHE_TTL_SECONDS:
+            return cached[0]
+        
+        stats = self.vector_service.get_collection_stats()
+        self._stats_cache = (stats, now)
+        return stats
+    
+    def _on_collection_changed(self) -> None:
+        """Drop cached search results and stats after documents are added or deleted."""
+        self.clear_cache()
+        self.invalidate_stats()
+    
+    def invalidate_stats(self) -> None:
+        """Forget cached collection stats (call after adding or deleting documents)."""
+        self._stats_cache = None
+    
     def search(
         self,
         query: str,
@@ -101,25 +302,210 @@ class DocumentSearchService:
             logger.warning("Document search not available")
             return []
         
+        # An empty library cannot match; skip embedding the query
+        if not self.has_documents():
+            return []
+        
+        cache_key = _search_key(max_results, similarity_threshold, document_ids)
+        exact_key = (query,) + cache_key
+        cached = self._exact_cache.get(exact_key)
+        if cached is not None:
+            logger.info("Document search for '%s' served from exact cache", query)
+            return cached
+        
         try:
-            results = self.vector_service.search_documents(
-                query=query,
-                n_results=max_results,
-                document_ids=document_ids,
-                similarity_threshold=similarity_threshold
-            )
+            # Embed once: the vector is both the cache key and the ANN query
+            query_embedding = self.vector_service.embed_query(query)
+            
+            cached = self.query_cache.get(query_embedding, cache_key)
+            if cached is not None:
+                logger.info("Document search for '%s' served from cache", query)
+                self._exact_cache.put(exact_key, cached)
+                return cached
+            
+            if self._batcher is not None:
+                results = self._batcher.submit(cache_key, query, query_embedding)
+            else:
+                results = self._run_batch(cache_key, [query], [query_embedding])[0]
+            
+            # Empty results are not cached: they are also what a failed
+            # lookup returns, and would hide documents uploaded meanwhile
+            if results:
+                self.query_cache.put(query_embedding, cache_key, results)
+                self._exact_cache.put(exact_key, results)
             
             logger.info(
-                f"Document search for '{query}' returned {len(results)} results "
-                f"(threshold: {similarity_threshold})"
+                "Document search for '%s' returned %d results (threshold: %s)",
+                query, len(results), similarity_threshold
             )
             
             return results
             
         except Exception as e:
-            logger.error(f"Document search failed: {e}")
+            logger.error("Document search failed: %s", e)
             return []
     
+    def iter_search(
+        self,
+        query: str,
+        max_results: int = 5,
+        similarity_threshold: float = 0.5,
+        document_ids: Optional[List[str]] = None
+    ) -> Iterator[SearchResult]:
+        """
+        Search uploaded documents, yielding results one at a time.
+        
+        Cached results are served as in search(); otherwise results are
+        streamed from the vector database without building a list, and
+        are not added to the cache.
+        
+        Args:
+            query: Search query
+            max_results: Maximum number of results to return
+            similarity_threshold: Minimum similarity score (0.0 to 1.0)
+            document_ids: Optional list of document IDs to search within
+            
+        Yields:
+            Search results, sorted by relevance
+        """
+        if not self.is_available() or not self.has_documents():
+            return
+        
+        cache_key = _search_key(max_results, similarity_threshold, document_ids)
+        cached = self._exact_cache.get((query,) + cache_key)
+        
+        if cached is None:
+            try:
+                query_embedding = self.vector_service.embed_query(query)
+                cached = self.query_cache.get(query_embedding, cache_key)
+            except Exception as e:
+                logger.error("Document search failed: %s", e)
+                return
+        
+        if cached is not None:
+            yield from cached
+            return
+        
+        yield from self.vector_service.iter_search_documents(
+            query=query,
+            n_results=max_results,
+            document_ids=document_ids,
+            similarity_threshold=similarity_threshold,
+            query_embedding=query_embedding,
+            fetch_k=max_results * self._oversample_factor
+        )
+    
+    async def search_batch(
+        self,
+        queries: List[str],
+        max_results: int = 5,
+        similarity_threshold: float = 0.5,
+        document_ids: Optional[List[str]] = None
+    ) -> List[List[SearchResult]]:
+        """
+        Search for several queries at once.
+        
+        All queries are embedded in one model call, and those not answered
+        by the query cache are sent to the vector database as one query.
+        
+        Args:
+            queries: Search queries
+            max_results: Maximum number of results per query
+            similarity_threshold: Minimum similarity score (0.0 to 1.0)
+            document_ids: Optional list of document IDs to search within
+            
+        Returns:
+            List of search results for each query, in query order
+        """
+        if not self.is_available():
+            logger.warning("Document search not available")
+            return [[] for _ in queries]
+        
+        if not self.has_documents():
+            return [[] for _ in queries]
+        
+        return await asyncio.to_thread(
+            self._search_many, queries, max_results, similarity_threshold, document_ids
+        )
+    
+    def _search_many(
+        self,
+        queries: List[str],
+        max_results: int,
+        similarity_threshold: float,
+        document_ids: Optional[List[str]]
+    ) -> List[List[SearchResult]]:
+        """Blocking body of search_batch."""
+        if not queries:
+            return []
+        
+        try:
+            embeddings = self.vector_service.embed_queries(queries)
+            cache_key = _search_key(max_results, similarity_threshold, document_ids)
+            
+            batch_results: List[Optional[List[SearchResult]]] = [
+                self.query_cache.get(embedding, cache_key) for embedding in embeddings
+            ]
+            misses = [i for i, results in enumerate(batch_results) if results is None]
+            
+            if misses:
+                fresh = self._run_batch(
+                    cache_key,
+                    [queries[i] for i in misses],
+                    [embeddings[i] for i in misses]
+                )
+                for i, results in zip(misses, fresh):
+                    batch_results[i] = results
+                    if results:
+                        self.query_cache.put(embeddings[i], cache_key, results)
+            
+            logger.info(
+                "Batched document search for %d queries (%d from cache)",
+                len(queries), len(queries) - len(misses)
+            )
+            
+            return batch_results
+            
+        except Exception as e:
+            logger.error("Batched document search failed: %s", e)
+            return [[] for _ in queries]
+    
+    def _run_batch(
+        self,
+        key: SearchKey,
+        queries: List[str],
+        embeddings: List[np.ndarray]
+    ) -> List[List[SearchResult]]:
+        """Query the vector database for queries sharing one search key."""
+        max_results, similarity_threshold, document_ids = key
+        return self.vector_service.search_documents_batch(
+            queries=queries,
+            n_results=max_results,
+            document_ids=list(document_ids) or None,
+            similarity_threshold=similarity_threshold,
+            query_embeddings=embeddings,
+            fetch_k=max_results * self._oversample_factor,
+            # Results are cached here, in front of the embedding step
+            use_cache=False
+        )
+    
+    def clear_cache(self) -> None:
+        """Drop cached search results (e.g. after documents change)."""
+        self.query_cache.clear()
+        self._exact_cache.clear()
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """
+        Get query cache statistics.
+        
+        Returns:
+            Cache size and hit/miss counters
+        """
+        stats = self.query_cache.stats()
+        stats["exact_entries"] = len(self._exact_cache)
+        stats["exact_hits"] = self._exact_cache.hits
+        return stats
+    
     def search_by_document(
         self,
         query: str,
@@ -159,7 +545,7 @@ class DocumentSearchService:
         try:
             return self.vector_service.get_document_stats(document_id)
         except Exception as e:
-            logger.error(f"Failed to get document summary: {e}")
+            logger.error("Failed to get document summary: %s", e)
             return {"error": str(e)}
     
     def list_available_documents(self) -> List[Dict[str, Any]]:
@@ -173,55 +559,59 @@ class DocumentSearchService:
             return []
         
         try:
-            stats = self.vector_service.get_collection_stats()
+            stats = self._get_stats_cached()
             return [{
                 "total_documents": stats.get("unique_documents", 0),
                 "total_chunks": stats.get("total_chunks", 0),
                 "embedding_model": stats.get("embedding_model", "unknown")
             }]
         except Exception as e:
-            logger.error(f"Failed to list documents: {e}")
+            logger.error("Failed to list documents: %s", e)
             return []
     
     def format_search_results_for_agent(
         self,
-        results: List[SearchResult],
+        results: Iterable[SearchResult],
         include_metadata: bool = False
     ) -> str:
         """
         Format search results in a way that's easy for agents to consume.
         
         Args:
-            results: List of search results
+            results: Search results (a list, or the iterator from iter_search)
             include_metadata: Whether to include detailed metadata
             
         Returns:
             Formatted string with search results
         """
-        if not results:
-            return "No relevant information found in uploaded documents."
-        
-        formatted_parts = []
-        formatted_parts.append(f"Found {len(results)} relevant passages from uploaded documents:\n")
+        buf = io.StringIO()
+        count = 0
         
-        for i, result in enumerate(results, 1):
-            formatted_parts.append(f"\n[Source {i}: {result.document_title}]")
+        for count, result in enumerate(results, 1):
+            buf.write(f"\n\n[Source {count}: {result.document_title}]")
             
-            if result.page_number:
-                formatted_parts.append(f"(Page {result.page_number})")
+            page_number = result.page_number
+            if page_number:
+                buf.write(f"\n(Page {page_number})")
             
-            formatted_parts.append(f"\n{result.content}\n")
+            buf.write(f"\n\n{result.content}\n")
             
             if include_metadata:
-                formatted_parts.append(f"Relevance Score: {result.similarity_score:.2f}")
-                if result.chapter_id:
-                    formatted_parts.append(f"Chapter ID: {result.chapter_id}")
+                buf.write(f"\nRelevance Score: {result.similarity_score:.2f}")
+                chapter_id = result.chapter_id
+                if chapter_id:
+                    buf.write(f"\nChapter ID: {chapter_id}")
         
-        return "\n".join(formatted_parts)
+        if not count:
+            return "No relevant information found in uploaded documents."
+        
+        # The count is only known once an iterator is exhausted
+        return f"Found {count} relevant passages from uploaded documents:\n" + buf.getvalue()
 
 
 # Global instance for easy access
 _global_search_service: Optional[DocumentSearchService] = None
+_global_search_service_lock = threading.Lock()
 
 
 def get_document_search_service(
@@ -240,19 +630,49 @@ def get_document_search_service(
     """
     global _global_search_service
     
-    if _global_search_service is None:
-        try:
-            _global_search_service = DocumentSearchService(
-                db_path=db_path,
-                collection_name=collection_name
-            )
-            logger.info("Global document search service initialized")
-        except Exception as e:
-            logger.error(f"Failed to initialize global search service: {e}")
-            # Create a dummy instance that returns empty results
-            _global_search_service = DocumentSearchService(vector_service=None)
+    # Fast path: no locking once the service exists
+    service = _global_search_service
+    if service is not None:
+        return service
     
-    return _global_search_service
+    with _global_search_service_lock:
+        if _global_search_service is None:
+            try:
+                _global_search_service = DocumentSearchService(
+                    db_path=db_path,
+                    collection_name=collection_name,
+                    query_cache=SemanticQueryCache(
+                        persist_path=os.path.join(db_path, QUERY_CACHE_FILENAME),
+                        result_encoder=_result_to_json,
+                        result_decoder=_result_from_json
+                    )
+                )
+                logger.info("Global document search service initialized")
+            except Exception as e:
+                logger.error("Failed to initialize global search service: %s", e)
+                # Create a dummy instance that returns empty results
+                _global_search_service = DocumentSearchService(vector_service=None)
+        
+        return _global_search_service
+
+
+def _search_key(
+    max_results: int,
+    similarity_threshold: float,
+    document_ids: Optional[List[str]]
+) -> SearchKey:
+    """Build the key of a search, independent of the order of document_ids."""
+    return (max_results, similarity_threshold, tuple(sorted(document_ids or ())))
+
+
+def _result_to_json(result: SearchResult) -> Dict[str, Any]:
+    """Convert a search result to JSON for the persisted query cache."""
+    return {name: getattr(result, name) for name in _PERSISTED_RESULT_FIELDS}
+
+
+def _result_from_json(data: Dict[str, Any]) -> SearchResult:
+    """Rebuild a search result persisted by _result_to_json."""
+    return SearchResult(**data)
 
 
 def search_documents(
@@ -7,8 +7,12 @@ ChromaDB integration for semantic search within uploaded documents.
 
 import os
 import json
+import re
 import uuid
-from typing import List, Dict, Any, Optional, Tuple
+import functools
+import threading
+from collections import OrderedDict
+from typing import Callable, List, Dict, Any, Iterator, Optional, Sequence, Tuple
 from datetime import datetime
 import logging
 
@@ -18,10 +22,75 @@ from sentence_transformers import SentenceTransformer
 import numpy as np
 
 from .models import Document, DocumentChunk, SearchResult
+from .embedding_cache import EmbeddingCache
+from .query_cache import QueryCache
+from .quantization import (
+    BINARY_INDEX_DIRNAME,
+    BINARY_RERANK_MULTIPLIER,
+    dequantize_int8,
+    embedding_scales,
+    hamming_candidates,
+    load_binary_index,
+    quantize_int8,
+    remove_binary_index,
+    score_int8,
+    write_binary_index,
+)
 
 
 logger = logging.getLogger(__name__)
 
+# Dynamically quantized ONNX export used by the "onnx" embedding backend
+ONNX_QUANTIZATION = "avx512_vnni"
+ONNX_QUANTIZED_FILE = os.path.join("onnx", f"model_qint8_{ONNX_QUANTIZATION}.onnx")
+
+# Chunks encoded per forward pass on CPU and on an accelerator
+CPU_ENCODE_BATCH_SIZE = 32
+GPU_ENCODE_BATCH_SIZE = 128
+
+# Token length every chunk is padded or truncated to by the compiled
+# encoder, so each forward pass has the same shape
+STATIC_SEQ_LENGTH = 256
+
+# Queries are short, so a batched search encodes them in larger batches
+QUERY_ENCODE_BATCH_SIZE = 64
+
+# Embeddings of recent single queries kept per loaded model
+QUERY_EMBEDDING_CACHE_SIZE = 1024
+
+# Documents with fewer chunks are encoded in-process even when worker
+# processes are configured; below this, start-up and IPC cost more than
+# they save
+PARALLEL_ENCODE_MIN_CHUNKS = 512
+
+# With int8 embeddings, ChromaDB's coarse ranking is re-scored over this
+# many candidates per requested result unless rerank_multiplier is given
+INT8_RERANK_OVERSAMPLE = 4
+
+# Chunk embeddings are cached under db_path in this file
+EMBEDDING_CACHE_FILENAME = "embedding_cache.sqlite"
+
+# Embeddings and metadata of recently added or looked-up chunks kept in
+# process for search_similar_chunks (10,000 x 384 float16 is ~7.5 MB)
+CHUNK_VECTOR_CACHE_SIZE = 10000
+
+# Chunks written to ChromaDB per add() call, bounding the size of the
+# Python lists built for each call
+ADD_BATCH_SIZE = 512
+
+# Embeddings are stored L2-normalized, so inner product is cosine similarity
+# and ChromaDB's "ip" distance is 1 - cosine. The HNSW parameters trade
+# slower inserts for recall: ChromaDB's defaults (M=16, construction_ef=100,
+# search_ef=10) miss many true neighbours at textbook scale. Only new
+# collections pick these up
+COLLECTION_METADATA = {
+    "description": "Student Assistant Document Chunks",
+    "hnsw:space": "ip",
+    "hnsw:M": 32,
+    "hnsw:construction_ef": 200,
+    "hnsw:search_ef": 128
+}
+
 
 class VectorDatabaseService:
     """
@@ -34,7 +103,12 @@ class VectorDatabaseService:
         self,
         db_path: str = "./data/chroma_db",
         embedding_model: str = "all-MiniLM-L6-v2",
-        collection_name: str = "documents"
+        collection_name: str = "documents",
+        quantize_embeddings: bool = False,
+        embedding_backend: Optional[str] = None,
+        encode_workers: Optional[int] = None,
+        rerank_multiplier: Optional[int] = None,
+        compile_encoder: Optional[bool] = None
     ):
         """
         Initialize the vector database service.
@@ -43,14 +117,52 @@ class VectorDatabaseService:
             db_path: Path to store ChromaDB data
             embedding_model: HuggingFace model for embeddings
             collection_name: ChromaDB collection name
+            quantize_embeddings: Snap chunk and query embeddings to int8
+                precision (see quantize_int8)
+            embedding_backend: "torch" or "onnx" (int8 ONNX Runtime);
+                defaults to the EMBEDDING_BACKEND environment variable
+            encode_workers: Worker processes for encoding large documents;
+                defaults to the EMBEDDING_WORKERS environment variable, or 1
+            rerank_multiplier: Candidates fetched from the HNSW index per
+                requested result and re-ranked by exact dot product;
+                defaults to INT8_RERANK_OVERSAMPLE with int8 embeddings, or 1
+            compile_encoder: Encode chunks with a torch.compile'd model over
+                fixed-shape batches; defaults to the EMBEDDING_COMPILE
+                environment variable
         """
         self.db_path = db_path
         self.embedding_model_name = embedding_model
         self.collection_name = collection_name
+        self.quantize_embeddings = quantize_embeddings
+        self.embedding_backend = (
+            embedding_backend or os.getenv("EMBEDDING_BACKEND", "torch")
+        ).lower()
+        self.encode_workers = encode_workers or int(os.getenv("EMBEDDING_WORKERS", "1"))
+        self._encode_pool: Optional[Dict[str, Any]] = None
+        self.rerank_multiplier = rerank_multiplier
+        self.compile_encoder = (
+            compile_encoder if compile_encoder is not None
+            else os.getenv("EMBEDDING_COMPILE", "false").lower() == "true"
+        )
+        self._binary_index: Optional[Tuple[List[str], np.ndarray]] = None
+        self._chunk_vectors: "OrderedDict[str, Tuple[np.ndarray, Dict[str, Any]]]" = OrderedDict()
+        self._chunk_vectors_lock = threading.Lock()
+        
+        # Results of repeated queries; cleared whenever the collection changes
+        self.query_cache = QueryCache()
+        # Called whenever the collection changes, so callers can drop caches
+        # of their own (see add_invalidation_callback)
+        self._invalidation_callbacks: List[Callable[[], None]] = []
         
         # Initialize ChromaDB client
         self._init_chroma_client()
         
+        # Embeddings of previously ingested chunk texts
+        self.embedding_cache = EmbeddingCache(
+            os.path.join(self.db_path, EMBEDDING_CACHE_FILENAME),
+            self.embedding_model_name
+        )
+        
         # Initialize embedding model
         self._init_embedding_model()
         
@@ -60,18 +172,37 @@ class VectorDatabaseService:
         logger.info(f"VectorDatabaseService initialized with {embedding_model}")
     
     def _init_chroma_client(self):
-        """Initialize ChromaDB client."""
+        """
+        Initialize ChromaDB client.
+        
+        Connects to a ChromaDB server when CHROMA_SERVER_HOST is set, so the
+        HNSW index lives in the server rather than in this process;
+        otherwise stores the collection under ``db_path``.
+        """
         try:
-            # Ensure db directory exists
+            # Ensure db directory exists (also holds the embedding caches)
             os.makedirs(self.db_path, exist_ok=True)
             
+            settings = Settings(
+                anonymized_telemetry=False,
+                allow_reset=True
+            )
+            server_host = os.getenv("CHROMA_SERVER_HOST")
+            
+            if server_host:
+                server_port = int(os.getenv("CHROMA_SERVER_PORT", "8000"))
+                self.client = chromadb.HttpClient(
+                    host=server_host,
+                    port=server_port,
+                    settings=settings
+                )
+                logger.info(f"ChromaDB client connected to {server_host}:{server_port}")
+                return
+            
             # Create ChromaDB client with persistent storage
             self.client = chromadb.PersistentClient(
                 path=self.db_path,
-                settings=Settings(
-                    anonymized_telemetry=False,
-                    allow_reset=True
-                )
+                settings=settings
             )
             
             logger.info(f"ChromaDB client initialized at {self.db_path}")
@@ -83,22 +214,152 @@ class VectorDatabaseService:
     def _init_embedding_model(self):
         """Initialize sentence transformer model."""
         try:
-            self.embedding_model = SentenceTransformer(self.embedding_model_name)
+            self.embedding_model = None
+            self.embedding_device = "cpu"
+            self._static_encoder = None
+            if self.embedding_backend == "onnx":
+                try:
+                    self.embedding_model = self._load_onnx_model()
+                except Exception as e:
+                    logger.warning(
+                        f"ONNX embedding backend unavailable, using PyTorch: {e}"
+                    )
+            
+            if self.embedding_model is None:
+                self.embedding_device = _select_device()
+                self.embedding_model = SentenceTransformer(
+                    self.embedding_model_name, device=self.embedding_device
+                )
+                if self.embedding_device != "cpu":
+                    # Half precision doubles accelerator throughput
+                    self.embedding_model.half()
+                if self.compile_encoder:
+                    self._static_encoder = self._build_static_encoder()
+            
+            self.encode_batch_size = (
+                CPU_ENCODE_BATCH_SIZE if self.embedding_device == "cpu" else GPU_ENCODE_BATCH_SIZE
+            )
             
             # Test embedding generation
             test_text = "Test embedding generation"
             test_embedding = self.embedding_model.encode([test_text])
             self.embedding_dimension = len(test_embedding[0])
             
+            # A fresh cache per loaded model, so a reload never serves stale
+            # embeddings
+            self._embed_query_cached = functools.lru_cache(
+                maxsize=QUERY_EMBEDDING_CACHE_SIZE
+            )(self._embed_query_uncached)
+            
             logger.info(
-                f"Embedding model {self.embedding_model_name} loaded "
-                f"(dimension: {self.embedding_dimension})"
+                f"Embedding model {self.embedding_model_name} loaded on "
+                f"{self.embedding_device} (dimension: {self.embedding_dimension})"
             )
             
         except Exception as e:
             logger.error(f"Failed to load embedding model: {e}")
             raise
     
+    def _build_static_encoder(self) -> Optional[Any]:
+        """
+        Compile the model's transformer for fixed-shape chunk batches.
+        
+        Returns:
+            The torch.compile'd transformer, or None when the model is not a
+            mean-pooled transformer (the pooling _encode_static implements)
+        """
+        import torch
+        
+        modules = list(self.embedding_model)
+        transformer = modules[0]
+        pooling = modules[1] if len(modules) > 1 else None
+        # pooling_mode_mean_tokens in sentence-transformers 3.x, pooling_mode later
+        mean_pooled = (
+            getattr(pooling, "pooling_mode_mean_tokens", False) is True
+            or getattr(pooling, "pooling_mode", None) == "mean"
+        )
+        if not hasattr(transformer, "auto_model") or not mean_pooled:
+            logger.warning(
+                f"Compiled encoder needs a mean-pooled transformer; "
+                f"{self.embedding_model_name} will use encode()"
+            )
+            return None
+        
+        return torch.compile(transformer.auto_model, dynamic=False)
+    
+    def _encode_static(self, texts: List[str]) -> np.ndarray:
+        """
+        Encode texts with the compiled transformer over fixed-shape batches.
+        
+        Every batch is padded to ``encode_batch_size`` texts of
+        STATIC_SEQ_LENGTH tokens, so the compiled graph is traced once and
+        reused; token embeddings are mean-pooled and L2-normalized like
+        the model's own pipeline.
+        
+        Args:
+            texts: Chunk texts
+            
+        Returns:
+            L2-normalized embeddings, one row per text
+        """
+        import torch
+        
+        tokenizer = self.embedding_model.tokenizer
+        batch_size = self.encode_batch_size
+        pooled_batches = []
+        
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            # Pad the last batch with empty texts to keep the shape fixed
+            padded = batch + [""] * (batch_size - len(batch))
+            encoded = tokenizer(
+                padded,
+                padding="max_length",
+                truncation=True,
+                max_length=STATIC_SEQ_LENGTH,
+                return_tensors="pt"
+            )
+            encoded = {name: tensor.to(self.embedding_device) for name, tensor in encoded.items()}
+            
+            with torch.inference_mode():
+                token_embeddings = self._static_encoder(**encoded).last_hidden_state
+                mask = encoded["attention_mask"].unsqueeze(-1).to(token_embeddings.dtype)
+                pooled = (token_embeddings * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+                pooled = torch.nn.functional.normalize(pooled.float(), dim=1)
+            
+            pooled_batches.append(pooled[:len(batch)].cpu().numpy())
+        
+        return np.concatenate(pooled_batches)
+    
+    def _load_onnx_model(self) -> SentenceTransformer:
+        """
+        Load the embedding model as a dynamically quantized int8 ONNX model.
+        
+        The quantized export is written once under ``db_path/onnx_cache``
+        and reused on later starts. Needs sentence-transformers >= 3.2 with
+        the ``onnx`` extra (optimum and onnxruntime).
+        
+        Returns:
+            SentenceTransformer running on ONNX Runtime
+        """
+        from sentence_transformers import export_dynamic_quantized_onnx_model
+        
+        cache_dir = os.path.join(
+            self.db_path, "onnx_cache", self.embedding_model_name.replace("/", "--")
+        )
+        
+        if not os.path.exists(os.path.join(cache_dir, ONNX_QUANTIZED_FILE)):
+            logger.info(f"Exporting int8 ONNX model to {cache_dir}")
+            model = SentenceTransformer(self.embedding_model_name, backend="onnx")
+            model.save(cache_dir)
+            export_dynamic_quantized_onnx_model(model, ONNX_QUANTIZATION, cache_dir)
+        
+        return SentenceTransformer(
+            cache_dir,
+            backend="onnx",
+            model_kwargs={"file_name": ONNX_QUANTIZED_FILE}
+        )
+    
     def _get_or_create_collection(self):
         """Get or create ChromaDB collection."""
         try:
@@ -106,11 +367,19 @@ class VectorDatabaseService:
             collection = self.client.get_collection(name=self.collection_name)
             logger.info(f"Using existing collection: {self.collection_name}")
             
+            space = (collection.metadata or {}).get("hnsw:space", "l2")
+            if space != COLLECTION_METADATA["hnsw:space"]:
+                logger.warning(
+                    f"Collection {self.collection_name} uses '{space}' distance; "
+                    f"similarity scores assume 'ip' over normalized embeddings. "
+                    f"Reset the collection to rebuild it."
+                )
+            
         except ValueError:
             # Collection doesn't exist, create it
             collection = self.client.create_collection(
                 name=self.collection_name,
-                metadata={"description": "Student Assistant Document Chunks"}
+                metadata=COLLECTION_METADATA
             )
             logger.info(f"Created new collection: {self.collection_name}")
         
@@ -135,46 +404,61 @@ class VectorDatabaseService:
             # Prepare data for ChromaDB
             chunk_ids = []
             chunk_texts = []
-            chunk_embeddings = []
             chunk_metadatas = []
             
+            # Metadata shared by every chunk of the document, built once
+            document_metadata = {
+                "document_id": document.id,
+                "document_title": document.title,
+                "upload_date": document.upload_date.isoformat(),
+                "file_type": document.file_type.value,
+                "author": document.author or "",
+                "subject": document.subject or ""
+            }
+            
             for chunk in chunks:
                 chunk_ids.append(chunk.id)
                 chunk_texts.append(chunk.content)
                 
                 # Add metadata
-                metadata = {
-                    "document_id": document.id,
-                    "document_title": document.title,
+                chunk_metadatas.append({
+                    **document_metadata,
                     "chunk_index": chunk.chunk_index,
                     "page_number": chunk.page_number,
                     "chapter_id": chunk.chapter_id or "",
-                    "chunk_type": chunk.chunk_type,
-                    "upload_date": document.upload_date.isoformat(),
-                    "file_type": document.file_type.value,
-                    "author": document.author or "",
-                    "subject": document.subject or ""
-                }
-                chunk_metadatas.append(metadata)
+                    "chunk_type": chunk.chunk_type
+                })
             
             # Generate embeddings
             logger.info(f"Generating embeddings for {len(chunks)} chunks...")
-            embeddings = self.embedding_model.encode(
-                chunk_texts,
-                show_progress_bar=True,
-                batch_size=32
-            )
+            embeddings = self._embed_texts_cached(chunk_texts)
             
-            # Convert to list for ChromaDB
-            chunk_embeddings = embeddings.tolist()
+            # Embeddings come back normalized, so search is a bare dot product
+            if self.quantize_embeddings:
+                quantized, scales = quantize_int8(embeddings)
+                embeddings = dequantize_int8(quantized, scales)
+                for metadata, scale in zip(chunk_metadatas, scales.tolist()):
+                    metadata["embedding_scale"] = scale
             
-            # Add to ChromaDB
-            self.collection.add(
-                ids=chunk_ids,
-                documents=chunk_texts,
-                embeddings=chunk_embeddings,
-                metadatas=chunk_metadatas
-            )
+            # Add to ChromaDB in batches; embeddings stay a NumPy array and
+            # only the current slice is converted to lists
+            for start in range(0, len(chunks), ADD_BATCH_SIZE):
+                end = start + ADD_BATCH_SIZE
+                self.collection.add(
+                    ids=chunk_ids[start:end],
+                    documents=chunk_texts[start:end],
+                    embeddings=embeddings[start:end].astype(np.float32).tolist(),
+                    metadatas=chunk_metadatas[start:end]
+                )
+                # Invalidated per batch so a later failure cannot leave stale results
+                self._invalidate_caches()
+                self._remember_chunk_vectors(
+                    chunk_ids[start:end], embeddings[start:end], chunk_metadatas[start:end]
+                )
+                logger.info(
+                    f"Added {min(end, len(chunks))}/{len(chunks)} chunks "
+                    f"for document {document.id}"
+                )
             
             logger.info(
                 f"Successfully added {len(chunks)} chunks for document "
@@ -187,13 +471,138 @@ class VectorDatabaseService:
             logger.error(f"Failed to add document chunks: {e}")
             return False
     
+    def _embed_texts_cached(self, texts: List[str]) -> np.ndarray:
+        """
+        Encode document chunks, reusing cached embeddings of identical texts.
+        
+        Args:
+            texts: Chunk texts
+            
+        Returns:
+            L2-normalized float16 embeddings, one row per text (ChromaDB
+            only sees float32 at the add() boundary)
+        """
+        cached = self.embedding_cache.get_many(texts)
+        misses = [i for i, embedding in enumerate(cached) if embedding is None]
+        
+        if misses:
+            miss_texts = [texts[i] for i in misses]
+            encoded = np.asarray(self._embed_texts_parallel(miss_texts), dtype=np.float16)
+            self.embedding_cache.put_many(miss_texts, encoded)
+            for i, embedding in zip(misses, encoded):
+                cached[i] = embedding
+        
+        if len(misses) < len(texts):
+            logger.info(f"Reused cached embeddings for {len(texts) - len(misses)} chunks")
+        
+        return np.stack(cached)
+    
+    def _embed_texts_parallel(self, texts: List[str]) -> np.ndarray:
+        """
+        Encode document chunks, across worker processes for large documents.
+        
+        With ``encode_workers`` > 1 and at least PARALLEL_ENCODE_MIN_CHUNKS
+        texts, the texts are sharded over a sentence-transformers
+        multi-process pool (one worker per GPU, or per CPU process);
+        otherwise they are encoded in this process.
+        
+        Args:
+            texts: Chunk texts
+            
+        Returns:
+            L2-normalized embeddings, one row per text
+        """
+        if self.encode_workers > 1 and len(texts) >= PARALLEL_ENCODE_MIN_CHUNKS:
+            try:
+                return self.embedding_model.encode_multi_process(
+                    texts,
+                    self._get_encode_pool(),
+                    batch_size=self.encode_batch_size,
+                    normalize_embeddings=True
+                )
+            except Exception as e:
+                logger.warning(f"Parallel encoding failed, encoding in-process: {e}")
+        
+        if self._static_encoder is not None:
+            try:
+                return self._encode_static(texts)
+            except Exception as e:
+                # Typically no compiler toolchain; don't retry on every document
+                logger.warning(f"Compiled encoder failed, using encode(): {e}")
+                self._static_encoder = None
+        
+        return self.embedding_model.encode(
+            texts,
+            show_progress_bar=True,
+            batch_size=self.encode_batch_size,
+            normalize_embeddings=True
+        )
+    
+    def _get_encode_pool(self) -> Dict[str, Any]:
+        """Start the encoding worker pool on first use."""
+        if self._encode_pool is None:
+            if self.embedding_device == "cuda":
+                devices = [f"cuda:{i}" for i in range(self.encode_workers)]
+            else:
+                devices = [self.embedding_device] * self.encode_workers
+            self._encode_pool = self.embedding_model.start_multi_process_pool(
+                target_devices=devices
+            )
+            logger.info(f"Started {len(devices)} embedding workers on {devices}")
+        return self._encode_pool
+    
+    def stop_encode_pool(self) -> None:
+        """Stop the encoding worker processes, if any were started."""
+        if self._encode_pool is not None:
+            self.embedding_model.stop_multi_process_pool(self._encode_pool)
+            self._encode_pool = None
+    
+    def embed_queries(self, queries: List[str]) -> np.ndarray:
+        """
+        Generate embeddings for several search queries in one model call.
+        
+        Args:
+            queries: Search queries
+            
+        Returns:
+            L2-normalized query embeddings as a float32 matrix, one row per query
+        """
+        embeddings = self.embedding_model.encode(
+            queries,
+            batch_size=QUERY_ENCODE_BATCH_SIZE,
+            normalize_embeddings=True
+        )
+        if self.quantize_embeddings:
+            return dequantize_int8(*quantize_int8(embeddings))
+        return np.asarray(embeddings, dtype=np.float32)
+    
+    def embed_query(self, query: str) -> np.ndarray:
+        """
+        Generate the embedding for a search query.
+        
+        Args:
+            query: Search query
+            
+        Returns:
+            L2-normalized query embedding as a read-only float32 vector
+        """
+        return self._embed_query_cached(query)
+    
+    def _embed_query_uncached(self, query: str) -> np.ndarray:
+        """Embed one query (cached through embed_query)."""
+        embedding = self.embed_queries([query])[0]
+        embedding.setflags(write=False)
+        return embedding
+    
     def search_documents(
         self,
         query: str,
         n_results: int = 10,
         document_ids: Optional[List[str]] = None,
         document_types: Optional[List[str]] = None,
-        similarity_threshold: float = 0.0
+        similarity_threshold: float = 0.0,
+        query_embedding: Optional[np.ndarray] = None,
+        fetch_k: Optional[int] = None
     ) -> List[SearchResult]:
         """
         Search for relevant document chunks.
@@ -204,70 +613,273 @@ class VectorDatabaseService:
             document_ids: Filter by specific document IDs
             document_types: Filter by document types
             similarity_threshold: Minimum similarity score
+            query_embedding: Precomputed embedding of ``query`` (see
+                embed_query); computed here when omitted
+            fetch_k: Candidates to fetch before thresholding (defaults to
+                ``n_results``)
             
         Returns:
             List of search results
         """
-        try:
-            # Generate query embedding
-            query_embedding = self.embedding_model.encode([query]).tolist()[0]
-            
-            # Build where clause for filtering
-            where_clause = {}
-            
-            if document_ids:
-                where_clause["document_id"] = {"$in": document_ids}
-            
-            if document_types:
-                where_clause["file_type"] = {"$in": document_types}
-            
-            # Search ChromaDB
-            search_kwargs = {
-                "query_embeddings": [query_embedding],
-                "n_results": n_results
-            }
+        search_results = self.search_documents_batch(
+            queries=[query],
+            n_results=n_results,
+            document_ids=document_ids,
+            document_types=document_types,
+            similarity_threshold=similarity_threshold,
+            query_embeddings=None if query_embedding is None else [query_embedding],
+            fetch_k=fetch_k
+        )[0]
+        
+        logger.info(
+            f"Search for '{query}' returned {len(search_results)} results "
+            f"(threshold: {similarity_threshold})"
+        )
+        
+        return search_results
+    
+    def search_documents_batch(
+        self,
+        queries: List[str],
+        n_results: int = 10,
+        document_ids: Optional[List[str]] = None,
+        document_types: Optional[List[str]] = None,
+        similarity_threshold: float = 0.0,
+        query_embeddings: Optional[Sequence[np.ndarray]] = None,
+        fetch_k: Optional[int] = None,
+        use_cache: bool = True
+    ) -> List[List[SearchResult]]:
+        """
+        Search for several queries with a single embedding call and a
+        single ChromaDB query.
+        
+        Args:
+            queries: Search queries
+            n_results: Maximum number of results per query
+            document_ids: Filter by specific document IDs
+            document_types: Filter by document types
+            similarity_threshold: Minimum similarity score
+            query_embeddings: Precomputed embeddings, one per query;
+                computed here when omitted
+            fetch_k: Candidates to fetch per query before thresholding
+                (defaults to ``n_results``). Oversampling lets results
+                below the threshold be replaced by the next candidates.
+            use_cache: Look up and store results in the query cache
+                (callers that cache results themselves pass False)
             
-            if where_clause:
-                search_kwargs["where"] = where_clause
+        Returns:
+            List of search results for each query, in query order
+        """
+        if not queries:
+            return []
+        
+        if not use_cache:
+            return self._search_documents_batch_uncached(
+                queries, n_results, document_ids, document_types,
+                similarity_threshold, query_embeddings, fetch_k
+            )
+        
+        cache_keys = [
+            _search_cache_key(query, n_results, document_ids, document_types, similarity_threshold, fetch_k)
+            for query in queries
+        ]
+        batch_results = [self.query_cache.get(key) for key in cache_keys]
+        
+        # Only cache misses are embedded and sent to ChromaDB
+        misses = [row for row, results in enumerate(batch_results) if results is None]
+        if not misses:
+            return batch_results
+        
+        miss_results = self._search_documents_batch_uncached(
+            [queries[row] for row in misses],
+            n_results,
+            document_ids,
+            document_types,
+            similarity_threshold,
+            None if query_embeddings is None else [query_embeddings[row] for row in misses],
+            fetch_k
+        )
+        for row, results in zip(misses, miss_results):
+            batch_results[row] = results
+            # Failed searches also return [], so only non-empty results are cached
+            if results:
+                self.query_cache.put(cache_keys[row], results)
+        
+        return batch_results
+    
+    def _search_documents_batch_uncached(
+        self,
+        queries: List[str],
+        n_results: int,
+        document_ids: Optional[List[str]],
+        document_types: Optional[List[str]],
+        similarity_threshold: float,
+        query_embeddings: Optional[Sequence[np.ndarray]],
+        fetch_k: Optional[int]
+    ) -> List[List[SearchResult]]:
+        """Body of search_documents_batch, without the query cache."""
+        try:
+            results, query_matrix = self._query_collection(
+                queries, self._candidate_count(n_results, fetch_k), document_ids, document_types, query_embeddings
+            )
             
-            results = self.collection.query(**search_kwargs)
+            # Similarity filtering happens here, per query row
+            return [
+                list(self._iter_search_results(
+                    results, row, similarity_threshold, query_matrix[row], n_results
+                ))
+                for row in range(len(queries))
+            ]
             
-            # Process results
-            search_results = []
-            
-            if results["ids"] and results["ids"][0]:
-                for i, chunk_id in enumerate(results["ids"][0]):
-                    distance = results["distances"][0][i]
-                    similarity = 1 - distance  # Convert distance to similarity
-                    
-                    if similarity >= similarity_threshold:
-                        metadata = results["metadatas"][0][i]
-                        content = results["documents"][0][i]
-                        
-                        result = SearchResult(
-                            chunk_id=chunk_id,
-                            document_id=metadata["document_id"],
-                            document_title=metadata["document_title"],
-                            content=content,
-                            similarity_score=similarity,
-                            page_number=metadata.get("page_number"),
-                            chapter_id=metadata.get("chapter_id") or None,
-                            chunk_type=metadata["chunk_type"],
-                            metadata=metadata
-                        )
-                        
-                        search_results.append(result)
+        except Exception as e:
+            logger.error(f"Search failed: {e}")
+            return [[] for _ in queries]
+    
+    def iter_search_documents(
+        self,
+        query: str,
+        n_results: int = 10,
+        document_ids: Optional[List[str]] = None,
+        document_types: Optional[List[str]] = None,
+        similarity_threshold: float = 0.0,
+        query_embedding: Optional[np.ndarray] = None,
+        fetch_k: Optional[int] = None
+    ) -> Iterator[SearchResult]:
+        """
+        Search for relevant document chunks, yielding results as they are built.
+        
+        Args:
+            query: Search query
+            n_results: Maximum number of results
+            document_ids: Filter by specific document IDs
+            document_types: Filter by document types
+            similarity_threshold: Minimum similarity score
+            query_embedding: Precomputed embedding of ``query``
+            fetch_k: Candidates to fetch before thresholding (defaults to
+                ``n_results``)
             
-            logger.info(
-                f"Search for '{query}' returned {len(search_results)} results "
-                f"(threshold: {similarity_threshold})"
+        Yields:
+            Search results, best first
+        """
+        try:
+            results, query_matrix = self._query_collection(
+                [query],
+                self._candidate_count(n_results, fetch_k),
+                document_ids,
+                document_types,
+                None if query_embedding is None else [query_embedding]
             )
-            
-            return search_results
-            
         except Exception as e:
             logger.error(f"Search failed: {e}")
-            return []
+            return
+        
+        yield from self._iter_search_results(
+            results, 0, similarity_threshold, query_matrix[0], n_results
+        )
+    
+    def _candidate_count(self, n_results: int, fetch_k: Optional[int]) -> int:
+        """Number of candidates to fetch from ChromaDB for one query."""
+        multiplier = self.rerank_multiplier or (
+            INT8_RERANK_OVERSAMPLE if self.quantize_embeddings else 1
+        )
+        return max(fetch_k or 0, n_results * multiplier)
+    
+    def _query_collection(
+        self,
+        queries: List[str],
+        n_results: int,
+        document_ids: Optional[List[str]],
+        document_types: Optional[List[str]],
+        query_embeddings: Optional[Sequence[np.ndarray]]
+    ) -> Tuple[Dict[str, Any], np.ndarray]:
+        """
+        Run one ChromaDB query for a batch of search queries.
+        
+        Returns:
+            Raw ChromaDB result and the query embedding matrix
+        """
+        if query_embeddings is None:
+            if len(queries) == 1:
+                # Repeated single queries with different filters skip the model
+                query_embeddings = [self.embed_query(queries[0])]
+            else:
+                query_embeddings = self.embed_queries(queries)
+        
+        # Build where clause for filtering
+        where_clause = {}
+        
+        if document_ids:
+            where_clause["document_id"] = {"$in": document_ids}
+        
+        if document_types:
+            where_clause["file_type"] = {"$in": document_types}
+        
+        # Search ChromaDB
+        query_matrix = np.asarray(query_embeddings, dtype=np.float32)
+        search_kwargs = {
+            "query_embeddings": query_matrix.tolist(),
+            "n_results": n_results,
+            "include": ["documents", "metadatas", "distances", "embeddings"]
+        }
+        
+        if where_clause:
+            search_kwargs["where"] = where_clause
+        
+        return self.collection.query(**search_kwargs), query_matrix
+    
+    def _iter_search_results(
+        self,
+        results: Dict[str, Any],
+        row: int,
+        similarity_threshold: float,
+        query_embedding: Optional[np.ndarray] = None,
+        n_results: Optional[int] = None
+    ) -> Iterator[SearchResult]:
+        """
+        Convert one query row of a ChromaDB result into search results.
+        
+        Candidates are scored by their dot product with ``query_embedding``
+        when ChromaDB returned their embeddings, and by ``1 - distance``
+        otherwise; with normalized embeddings both are cosine similarity.
+        With int8 embeddings the dot product is taken over the int8 codes.
+        
+        Args:
+            results: ChromaDB query result
+            row: Index of the query within the batch
+            similarity_threshold: Minimum similarity score
+            query_embedding: Embedding of the query for this row
+            n_results: Maximum number of results (all candidates when omitted)
+            
+        Yields:
+            Search results above the threshold, best first
+        """
+        if not results["ids"] or row >= len(results["ids"]):
+            return
+        
+        chunk_ids = results["ids"][row]
+        embeddings = results.get("embeddings")
+        metadatas = results["metadatas"][row]
+        k = len(chunk_ids) if n_results is None else n_results
+        
+        if query_embedding is not None and embeddings is not None and len(embeddings[row]):
+            candidate_scales = None
+            if self.quantize_embeddings:
+                candidate_scales = embedding_scales(metadatas)
+            
+            if candidate_scales is not None:
+                scores = score_int8(query_embedding, embeddings[row], candidate_scales)
+                order, scores = _topk_scores(scores, k, similarity_threshold)
+            else:
+                order, scores = _topk_dot(query_embedding, embeddings[row], k, similarity_threshold)
+        else:
+            # ChromaDB returns candidates nearest first
+            scores = 1 - np.asarray(results["distances"][row], dtype=np.float32)
+            order = np.flatnonzero(scores >= similarity_threshold)[:k]
+            scores = scores[order]
+        
+        yield from _build_search_results(
+            chunk_ids, metadatas, results["documents"][row], order, scores
+        )
     
     def search_similar_chunks(
         self,
@@ -286,20 +898,47 @@ class VectorDatabaseService:
         Returns:
             List of similar chunks
         """
+        cache_key = ("similar", chunk_id, n_results, same_document_only)
+        cached = self.query_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        similar_results = self._search_similar_chunks_uncached(
+            chunk_id, n_results, same_document_only
+        )
+        if similar_results:
+            self.query_cache.put(cache_key, similar_results)
+        
+        return similar_results
+    
+    def _search_similar_chunks_uncached(
+        self,
+        chunk_id: str,
+        n_results: int,
+        same_document_only: bool
+    ) -> List[SearchResult]:
+        """Body of search_similar_chunks, without the query cache."""
         try:
-            # Get the reference chunk
-            ref_result = self.collection.get(ids=[chunk_id])
+            # Get the reference chunk, from memory when it was seen recently
+            reference = self._recall_chunk_vector(chunk_id)
             
-            if not ref_result["embeddings"] or not ref_result["embeddings"][0]:
-                logger.warning(f"Chunk {chunk_id} not found")
-                return []
+            if reference is None:
+                ref_result = self.collection.get(ids=[chunk_id], include=["embeddings", "metadatas"])
+                
+                if ref_result["embeddings"] is None or not len(ref_result["embeddings"]):
+                    logger.warning(f"Chunk {chunk_id} not found")
+                    return []
+                
+                self._remember_chunk_vectors(
+                    [chunk_id], ref_result["embeddings"], ref_result["metadatas"]
+                )
+                reference = self._recall_chunk_vector(chunk_id)
             
-            ref_embedding = ref_result["embeddings"][0]
-            ref_metadata = ref_result["metadatas"][0]
+            ref_embedding, ref_metadata = reference
             
             # Build search criteria
             search_kwargs = {
-                "query_embeddings": [ref_embedding],
+                "query_embeddings": [ref_embedding.tolist()],
                 "n_results": n_results + 1  # +1 to exclude self
             }
             
@@ -311,41 +950,105 @@ class VectorDatabaseService:
             # Search
             results = self.collection.query(**search_kwargs)
             
-            # Process results (excluding the reference chunk itself)
-            similar_results = []
-            
-            if results["ids"] and results["ids"][0]:
-                for i, found_id in enumerate(results["ids"][0]):
-                    if found_id != chunk_id:  # Exclude self
-                        distance = results["distances"][0][i]
-                        similarity = 1 - distance
-                        
-                        metadata = results["metadatas"][0][i]
-                        content = results["documents"][0][i]
-                        
-                        result = SearchResult(
-                            chunk_id=found_id,
-                            document_id=metadata["document_id"],
-                            document_title=metadata["document_title"],
-                            content=content,
-                            similarity_score=similarity,
-                            page_number=metadata.get("page_number"),
-                            chapter_id=metadata.get("chapter_id") or None,
-                            chunk_type=metadata["chunk_type"],
-                            metadata=metadata
-                        )
-                        
-                        similar_results.append(result)
-                        
-                        if len(similar_results) >= n_results:
-                            break
-            
-            return similar_results
+            if not results["ids"] or not results["ids"][0]:
+                return []
+            
+            # Score all candidates at once, excluding the reference chunk itself
+            found_ids = results["ids"][0]
+            scores = 1 - np.asarray(results["distances"][0], dtype=np.float32)
+            order = np.flatnonzero(np.asarray(found_ids, dtype=object) != chunk_id)[:n_results]
+            
+            return list(_build_search_results(
+                found_ids, results["metadatas"][0], results["documents"][0], order, scores[order]
+            ))
             
         except Exception as e:
             logger.error(f"Similar chunk search failed: {e}")
             return []
     
+    def export_binary_index(self) -> int:
+        """
+        Export a binary-quantized copy of the collection for search_documents_binary.
+        
+        Each stored embedding is reduced to one sign bit per dimension and
+        written to a memory-mapped file under ``db_path``, 32x smaller than
+        float32. The index is removed whenever the collection changes and
+        must be exported again.
+        
+        Returns:
+            Number of chunks in the exported index
+        """
+        index_dir = os.path.join(self.db_path, BINARY_INDEX_DIRNAME)
+        self._binary_index = None
+        count = write_binary_index(self.collection, index_dir, self.embedding_dimension)
+        
+        logger.info(f"Exported binary index of {count} chunks to {index_dir}")
+        return count
+    
+    def _get_binary_index(self) -> Optional[Tuple[List[str], np.ndarray]]:
+        """Memory-map the exported binary index, if there is a current one."""
+        if self._binary_index is None:
+            self._binary_index = load_binary_index(
+                os.path.join(self.db_path, BINARY_INDEX_DIRNAME), self.embedding_dimension
+            )
+        
+        return self._binary_index
+    
+    def search_documents_binary(
+        self,
+        query: str,
+        n_results: int = 10,
+        similarity_threshold: float = 0.0,
+        candidate_multiplier: int = BINARY_RERANK_MULTIPLIER
+    ) -> List[SearchResult]:
+        """
+        Search with the exported binary index, re-ranking candidates exactly.
+        
+        Candidates are the chunks nearest to the query by Hamming distance
+        between sign bits; their stored embeddings are then fetched from
+        ChromaDB and ranked by cosine similarity. Falls back to
+        search_documents when no current binary index has been exported.
+        
+        Args:
+            query: Search query
+            n_results: Maximum number of results
+            similarity_threshold: Minimum similarity score
+            candidate_multiplier: Candidates re-ranked per requested result
+            
+        Returns:
+            List of search results
+        """
+        index = self._get_binary_index()
+        if index is None:
+            return self.search_documents(
+                query, n_results=n_results, similarity_threshold=similarity_threshold
+            )
+        
+        try:
+            chunk_ids, codes = index
+            query_embedding = self.embed_query(query)
+            
+            k = min(n_results * candidate_multiplier, len(chunk_ids))
+            if k <= 0:
+                return []
+            candidates = hamming_candidates(codes, query_embedding, k)
+            
+            results = self.collection.get(
+                ids=[chunk_ids[i] for i in candidates.tolist()],
+                include=["embeddings", "metadatas", "documents"]
+            )
+            if not len(results["ids"]):
+                return []
+            
+            order, scores = _topk_dot(query_embedding, results["embeddings"], n_results, similarity_threshold)
+            return list(_build_search_results(
+                results["ids"], results["metadatas"], results["documents"], order, scores
+            ))
+            
+        except Exception as e:
+            logger.error(f"Binary index search failed: {e}")
+            return []
+    
     def get_document_stats(self, document_id: str) -> Dict[str, Any]:
         """
         Get statistics for a document in the vector database.
@@ -357,31 +1060,34 @@ class VectorDatabaseService:
             Document statistics
         """
         try:
-            # Get all chunks for the document
+            # Get the metadata of all chunks for the document (not their text)
             results = self.collection.get(
-                where={"document_id": document_id}
+                where={"document_id": document_id},
+                include=["metadatas"]
             )
             
             if not results["ids"]:
                 return {"chunk_count": 0, "document_id": document_id}
             
             chunk_count = len(results["ids"])
-            metadatas = results["metadatas"]
             
-            # Extract statistics
-            page_numbers = [m.get("page_number") for m in metadatas if m.get("page_number")]
-            chapters = list(set(m.get("chapter_id") for m in metadatas if m.get("chapter_id")))
-            chunk_types = list(set(m["chunk_type"] for m in metadatas))
+            # Extract statistics, reading each metadata dict once
+            page_numbers, chapters, chunk_types = zip(*(
+                (m.get("page_number") or 0, m.get("chapter_id") or "", m["chunk_type"])
+                for m in results["metadatas"]
+            ))
+            pages = np.asarray(page_numbers, dtype=np.int64)
+            pages = pages[pages != 0]
             
             stats = {
                 "document_id": document_id,
                 "chunk_count": chunk_count,
                 "page_range": {
-                    "min": min(page_numbers) if page_numbers else None,
-                    "max": max(page_numbers) if page_numbers else None
+                    "min": int(pages.min()) if pages.size else None,
+                    "max": int(pages.max()) if pages.size else None
                 },
-                "chapter_count": len(chapters),
-                "chunk_types": chunk_types,
+                "chapter_count": len(set(chapters) - {""}),
+                "chunk_types": list(set(chunk_types)),
                 "embedding_dimension": self.embedding_dimension
             }
             
@@ -409,6 +1115,8 @@ class VectorDatabaseService:
             
             if results["ids"]:
                 self.collection.delete(ids=results["ids"])
+                self._invalidate_caches()
+                self._forget_chunk_vectors(results["ids"])
                 logger.info(f"Deleted {len(results['ids'])} chunks for document {document_id}")
             else:
                 logger.info(f"No chunks found for document {document_id}")
@@ -419,6 +1127,71 @@ class VectorDatabaseService:
             logger.error(f"Failed to delete document chunks: {e}")
             return False
     
+    def _remember_chunk_vectors(
+        self,
+        chunk_ids: List[str],
+        embeddings: Any,
+        metadatas: List[Dict[str, Any]]
+    ) -> None:
+        """Keep chunk embeddings and metadata in process, evicting the least recently used."""
+        # Copied (as float16) so cached rows do not keep the caller's whole
+        # array alive
+        vectors = np.array(embeddings, dtype=np.float16)
+        with self._chunk_vectors_lock:
+            for chunk_id, vector, metadata in zip(chunk_ids, vectors, metadatas):
+                self._chunk_vectors[chunk_id] = (vector, metadata)
+                self._chunk_vectors.move_to_end(chunk_id)
+            while len(self._chunk_vectors) > CHUNK_VECTOR_CACHE_SIZE:
+                self._chunk_vectors.popitem(last=False)
+    
+    def _recall_chunk_vector(self, chunk_id: str) -> Optional[Tuple[np.ndarray, Dict[str, Any]]]:
+        """Look up a chunk's embedding and metadata kept in process."""
+        with self._chunk_vectors_lock:
+            entry = self._chunk_vectors.get(chunk_id)
+            if entry is not None:
+                self._chunk_vectors.move_to_end(chunk_id)
+            return entry
+    
+    def _forget_chunk_vectors(self, chunk_ids: Optional[List[str]] = None) -> None:
+        """Drop in-process chunk embeddings (all of them when no IDs are given)."""
+        with self._chunk_vectors_lock:
+            if chunk_ids is None:
+                self._chunk_vectors.clear()
+            else:
+                for chunk_id in chunk_ids:
+                    self._chunk_vectors.pop(chunk_id, None)
+    
+    def add_invalidation_callback(self, callback: Callable[[], None]) -> None:
+        """
+        Register a callback to run after chunks are added or deleted, or the
+        collection is reset.
+        
+        Args:
+            callback: Function called with no arguments
+        """
+        self._invalidation_callbacks.append(callback)
+    
+    def _invalidate_caches(self) -> None:
+        """Drop cached results and the binary index after the collection changes."""
+        self.query_cache.clear()
+        self._binary_index = None
+        remove_binary_index(os.path.join(self.db_path, BINARY_INDEX_DIRNAME))
+        
+        for callback in self._invalidation_callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.warning(f"Cache invalidation callback failed: {e}")
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """
+        Get query cache statistics.
+        
+        Returns:
+            Cache size, hits, misses and hit rate
+        """
+        return self.query_cache.stats()
+    
     def get_collection_stats(self) -> Dict[str, Any]:
         """
         Get overall collection statistics.
@@ -430,24 +1203,22 @@ class VectorDatabaseService:
             # Get collection info
             collection_info = self.collection.count()
             
-            # Get sample of documents
-            sample_results = self.collection.get(limit=1000)
+            # Get metadata of a sample of chunks (not their text)
+            sample_results = self.collection.get(limit=1000, include=["metadatas"])
             
             if sample_results["metadatas"]:
-                metadatas = sample_results["metadatas"]
-                
-                # Extract statistics
-                document_ids = list(set(m["document_id"] for m in metadatas))
-                file_types = list(set(m["file_type"] for m in metadatas))
-                authors = list(set(m.get("author", "") for m in metadatas if m.get("author")))
-                subjects = list(set(m.get("subject", "") for m in metadatas if m.get("subject")))
+                # Extract statistics, reading each metadata dict once
+                document_ids, file_types, authors, subjects = zip(*(
+                    (m["document_id"], m["file_type"], m.get("author") or "", m.get("subject") or "")
+                    for m in sample_results["metadatas"]
+                ))
                 
                 stats = {
                     "total_chunks": collection_info,
-                    "unique_documents": len(document_ids),
-                    "file_types": file_types,
-                    "unique_authors": len(authors),
-                    "unique_subjects": len(subjects),
+                    "unique_documents": len(set(document_ids)),
+                    "file_types": list(set(file_types)),
+                    "unique_authors": len(set(authors) - {""}),
+                    "unique_subjects": len(set(subjects) - {""}),
                     "embedding_model": self.embedding_model_name,
                     "embedding_dimension": self.embedding_dimension,
                     "db_path": self.db_path
@@ -481,8 +1252,10 @@ class VectorDatabaseService:
             # Recreate collection
             self.collection = self.client.create_collection(
                 name=self.collection_name,
-                metadata={"description": "Student Assistant Document Chunks"}
+                metadata=COLLECTION_METADATA
             )
+            self._invalidate_caches()
+            self._forget_chunk_vectors()
             
             logger.info(f"Collection {self.collection_name} reset successfully")
             return True
@@ -492,12 +1265,159 @@ class VectorDatabaseService:
             return False
 
 
+def _random_uuids(batch_size: int) -> Iterator[str]:
+    """
+    Generate random (version 4) UUID strings, drawing random bytes in batches.
+    
+    Equivalent to repeated ``str(uuid.uuid4())`` but with one os.urandom
+    call per ``batch_size`` IDs instead of one per ID.
+    
+    Args:
+        batch_size: IDs generated per os.urandom call
+        
+    Yields:
+        UUID strings
+    """
+    while True:
+        random_bytes = os.urandom(16 * batch_size)
+        for offset in range(0, len(random_bytes), 16):
+            yield str(uuid.UUID(bytes=random_bytes[offset:offset + 16], version=4))
+
+
+def _search_cache_key(
+    query: str,
+    n_results: int,
+    document_ids: Optional[List[str]],
+    document_types: Optional[List[str]],
+    similarity_threshold: float,
+    fetch_k: Optional[int]
+) -> Tuple:
+    """Build the query cache key for a search; filter order does not matter."""
+    return (
+        "search",
+        query,
+        n_results,
+        tuple(sorted(document_ids or ())),
+        tuple(sorted(document_types or ())),
+        similarity_threshold,
+        fetch_k
+    )
+
+
+def _select_device() -> str:
+    """
+    Pick the fastest available device for the embedding model.
+    
+    Returns:
+        "cuda", "mps" or "cpu"
+    """
+    try:
+        import torch
+    except ImportError:
+        return "cpu"
+    
+    if torch.cuda.is_available():
+        return "cuda"
+    mps = getattr(torch.backends, "mps", None)
+    if mps is not None and mps.is_available():
+        return "mps"
+    return "cpu"
+
+
+def _build_search_results(
+    chunk_ids: List[str],
+    metadatas: List[Dict[str, Any]],
+    documents: List[str],
+    order: np.ndarray,
+    scores: np.ndarray
+) -> Iterator[SearchResult]:
+    """
+    Materialize search results for the selected rows of a ChromaDB result.
+    
+    Args:
+        chunk_ids: Candidate chunk IDs
+        metadatas: Candidate metadata
+        documents: Candidate chunk texts
+        order: Indices of the candidates to return, in result order
+        scores: Similarity score of each selected candidate
+        
+    Yields:
+        Search results in ``order``
+    """
+    for i, similarity in zip(order.tolist(), scores.tolist()):
+        metadata = metadatas[i]
+        
+        yield SearchResult(
+            chunk_id=chunk_ids[i],
+            document_id=metadata["document_id"],
+            document_title=metadata["document_title"],
+            content=documents[i],
+            similarity_score=similarity,
+            page_number=metadata.get("page_number"),
+            chapter_id=metadata.get("chapter_id") or None,
+            chunk_type=metadata["chunk_type"],
+            metadata=metadata
+        )
+
+
+def _topk_scores(
+    scores: np.ndarray,
+    k: int,
+    threshold: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Keep the best ``k`` scores above a threshold.
+    
+    Args:
+        scores: Candidate scores, shape (n,)
+        k: Maximum number of candidates to keep
+        threshold: Minimum score
+        
+    Returns:
+        Indices into ``scores`` and their scores, best first
+    """
+    keep = np.flatnonzero(scores >= threshold)
+    if keep.size > k:
+        # Select the top k in linear time, then sort only those
+        keep = keep[np.argpartition(-scores[keep], k - 1)[:k]] if k > 0 else keep[:0]
+    order = keep[np.argsort(-scores[keep], kind="stable")]
+    return order, scores[order]
+
+
+def _topk_dot(
+    query: np.ndarray,
+    candidates: np.ndarray,
+    k: int,
+    threshold: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Score candidates by dot product and keep the best ``k`` above a threshold.
+    
+    Both sides are stored normalized, so the dot product is the cosine
+    similarity.
+    
+    Args:
+        query: Normalized query embedding, shape (d,)
+        candidates: Normalized candidate embeddings, shape (n, d)
+        k: Maximum number of candidates to keep
+        threshold: Minimum similarity
+        
+    Returns:
+        Indices into ``candidates`` and their scores, best first
+    """
+    scores = np.asarray(candidates, dtype=np.float32) @ np.asarray(query, dtype=np.float32).ravel()
+    return _topk_scores(scores, k, threshold)
+
+
 # Text chunking utilities
 class DocumentChunker:
     """
     Utility class for chunking documents into manageable pieces.
     """
     
+    # Sentence endings considered as chunk break points
+    _SENTENCE_END = re.compile(r"[.!?]")
+    
     def __init__(
         self,
         chunk_size: int = 1000,
@@ -556,28 +1476,25 @@ class DocumentChunker:
         # Split into overlapping chunks
         start = 0
         chunk_index = 0
+        chunk_ids = _random_uuids(len(text) // max(self.chunk_size - self.chunk_overlap, 1) + 2)
         
         while start < len(text):
             end = min(start + self.chunk_size, len(text))
             
-            # Try to find a good break point (sentence or paragraph end)
+            # Try to find a good break point: the first sentence end
+            # within 50 characters either side of the target end. The
+            # compiled pattern only scans that window, in C, and needs no
+            # copy of the text
             if end < len(text):
-                # Look for sentence endings
-                sentence_ends = ['.', '!', '?', '\n\n']
-                best_end = end
-                
-                for i in range(end - 50, end + 50):
-                    if i < len(text) and text[i] in sentence_ends:
-                        best_end = i + 1
-                        break
-                
-                end = best_end
+                match = self._SENTENCE_END.search(text, max(end - 50, 0), end + 50)
+                if match:
+                    end = match.end()
             
             chunk_text = text[start:end].strip()
             
             if len(chunk_text) >= self.min_chunk_size:
                 chunk = DocumentChunk(
-                    id=str(uuid.uuid4()),
+                    id=next(chunk_ids),
                     document_id=document.id,
                     content=chunk_text,
                     chunk_index=chunk_index,
@@ -8,24 +8,37 @@ This middleware provides:
 - In-memory cost tracking for recent requests
 """
 
+import asyncio
+import contextvars
 import json
 import logging
+import os
 import time
-import uuid
 from collections import deque
-from typing import Callable, Dict, Any, Optional, Deque
+from typing import Dict, Any, Optional, Deque
 from dataclasses import dataclass, asdict
 from datetime import datetime
 
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from starlette.responses import Response
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from src.infra.pricing import calculate_cost
+from src.logging_config import trace_id_var
 
 # Global middleware instance for singleton access
 _middleware_instance: Optional['CostTrackingMiddleware'] = None
 
+# Probe endpoints hit at high frequency by orchestrators; they bypass request
+# tracking (no IDs, metrics, logs or extra headers)
+UNTRACKED_PATHS = frozenset({"/health"})
+
+# Request logs waiting for the background log worker; when full, the oldest
+# entry is dropped rather than blocking requests
+LOG_QUEUE_SIZE = 10000
+
+# Maximum request logs the worker takes off the queue per wake-up
+LOG_BATCH_SIZE = 256
+
 
 @dataclass
 class RequestMetrics:
@@ -40,6 +53,7 @@ class RequestMetrics:
     tokens_out: int = 0
     cost_usd: float = 0.0
     timestamp: datetime = None
+    trace_id: Optional[str] = None
     
     def __post_init__(self):
         """Set timestamp if not provided."""
@@ -47,10 +61,15 @@ class RequestMetrics:
             self.timestamp = datetime.utcnow()
 
 
-class CostTrackingMiddleware(BaseHTTPMiddleware):
+class CostTrackingMiddleware:
     """
     ASGI middleware that tracks request metrics and LLM costs.
     
+    Implemented as a plain ASGI callable rather than a BaseHTTPMiddleware,
+    so tracking a request adds no extra task groups or streams; response
+    headers are added by wrapping ``send``. Request logs are serialized
+    and emitted by a background task, off the request path.
+    
     Features:
     - Generates unique request/trace IDs
     - Captures LLM usage metrics from request state
@@ -59,7 +78,7 @@ class CostTrackingMiddleware(BaseHTTPMiddleware):
     - Maintains in-memory buffer of recent requests
     """
     
-    def __init__(self, app: Callable, buffer_size: int = 1000):
+    def __init__(self, app: ASGIApp, buffer_size: int = 1000):
         """
         Initialize the middleware.
         
@@ -68,76 +87,63 @@ class CostTrackingMiddleware(BaseHTTPMiddleware):
             buffer_size: Maximum number of requests to keep in memory
         """
         global _middleware_instance
-        super().__init__(app)
+        self.app = app
         self.buffer_size = buffer_size
         self.recent_requests: Deque[RequestMetrics] = deque(maxlen=buffer_size)
         self.logger = logging.getLogger(__name__)
+        
+        # Started on the first request: there is no running event loop yet
+        # when the app is constructed
+        self._log_queue: Optional[asyncio.Queue] = None
+        self._log_worker_task: Optional[asyncio.Task] = None
         _middleware_instance = self
     
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """
         Process request and capture metrics.
         
         Args:
-            request: Incoming HTTP request
-            call_next: Next middleware/handler in chain
-            
-        Returns:
-            HTTP response with added headers
+            scope: ASGI connection scope
+            receive: ASGI receive channel
+            send: ASGI send channel
         """
-        # Generate request ID
-        request_id = str(uuid.uuid4())
+        if scope["type"] != "http" or scope["path"] in UNTRACKED_PATHS:
+            await self.app(scope, receive, send)
+            return
+        
+        # Generate request ID: 128 random bits as 32 hex chars, without
+        # building a uuid.UUID per request
+        request_id = os.urandom(16).hex()
         
         # Store request ID in request state for use by handlers
-        request.state.request_id = request_id
-        request.state.llm_metrics = {}
+        # (request.state reads and writes scope["state"])
+        state = scope.setdefault("state", {})
+        state["request_id"] = request_id
+        state["llm_metrics"] = {}
+        
+        status_code = 500
+        cost_usd = 0.0
+        
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, cost_usd
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                # Handlers have recorded their LLM usage by the time
+                # the response starts
+                cost_usd = self._calculate_cost(state.get("llm_metrics") or {})
+                
+                # Add request ID to response headers
+                headers = MutableHeaders(scope=message)
+                headers["X-Request-ID"] = request_id
+                headers["X-Cost-USD"] = str(cost_usd)
+            await send(message)
         
         # Record start time
         start_time = time.time()
         
         try:
             # Process request
-            response = await call_next(request)
-            
-            # Calculate latency
-            latency_ms = (time.time() - start_time) * 1000
-            
-            # Extract LLM metrics from request state
-            llm_metrics = getattr(request.state, 'llm_metrics', {})
-            
-            # Calculate cost if we have LLM metrics
-            cost_usd = 0.0
-            if llm_metrics.get('model') and (llm_metrics.get('tokens_in') or llm_metrics.get('tokens_out')):
-                cost_usd = calculate_cost(
-                    model=llm_metrics.get('model', ''),
-                    tokens_in=llm_metrics.get('tokens_in', 0),
-                    tokens_out=llm_metrics.get('tokens_out', 0)
-                )
-            
-            # Create metrics record
-            metrics = RequestMetrics(
-                request_id=request_id,
-                path=str(request.url.path),
-                method=request.method,
-                status_code=response.status_code,
-                latency_ms=round(latency_ms, 2),
-                model=llm_metrics.get('model'),
-                tokens_in=llm_metrics.get('tokens_in', 0),
-                tokens_out=llm_metrics.get('tokens_out', 0),
-                cost_usd=cost_usd
-            )
-            
-            # Store in buffer
-            self.recent_requests.append(metrics)
-            
-            # Log structured JSON
-            self._log_request_metrics(metrics)
-            
-            # Add request ID to response headers
-            response.headers["X-Request-ID"] = request_id
-            response.headers["X-Cost-USD"] = str(cost_usd)
-            
-            return response
+            await self.app(scope, receive, send_wrapper)
             
         except Exception as e:
             # Calculate latency even for errors
@@ -146,10 +152,11 @@ class CostTrackingMiddleware(BaseHTTPMiddleware):
             # Create error metrics record
             metrics = RequestMetrics(
                 request_id=request_id,
-                path=str(request.url.path),
-                method=request.method,
+                path=scope["path"],
+                method=scope["method"],
                 status_code=500,
-                latency_ms=round(latency_ms, 2)
+                latency_ms=round(latency_ms, 2),
+                trace_id=trace_id_var.get()
             )
             
             # Store in buffer
@@ -160,14 +167,132 @@ class CostTrackingMiddleware(BaseHTTPMiddleware):
             
             # Re-raise the exception
             raise
+        
+        # Calculate latency
+        latency_ms = (time.time() - start_time) * 1000
+        
+        # Extract LLM metrics from request state
+        llm_metrics = state.get("llm_metrics") or {}
+        
+        # Create metrics record
+        metrics = RequestMetrics(
+            request_id=request_id,
+            path=scope["path"],
+            method=scope["method"],
+            status_code=status_code,
+            latency_ms=round(latency_ms, 2),
+            model=llm_metrics.get('model'),
+            tokens_in=llm_metrics.get('tokens_in', 0),
+            tokens_out=llm_metrics.get('tokens_out', 0),
+            cost_usd=cost_usd,
+            trace_id=trace_id_var.get()
+        )
+        
+        # Store in buffer
+        self.recent_requests.append(metrics)
+        
+        # Hand off to the background log worker
+        self._log_request_metrics(metrics)
+    
+    @staticmethod
+    def _calculate_cost(llm_metrics: Dict[str, Any]) -> float:
+        """
+        Calculate the cost of the LLM usage recorded for a request.
+        
+        Args:
+            llm_metrics: Model and token counts from request state
+            
+        Returns:
+            Cost in USD (0.0 without LLM usage)
+        """
+        if llm_metrics.get('model') and (llm_metrics.get('tokens_in') or llm_metrics.get('tokens_out')):
+            return calculate_cost(
+                model=llm_metrics.get('model', ''),
+                tokens_in=llm_metrics.get('tokens_in', 0),
+                tokens_out=llm_metrics.get('tokens_out', 0)
+            )
+        return 0.0
     
     def _log_request_metrics(self, metrics: RequestMetrics) -> None:
         """
-        Log request metrics as structured JSON.
+        Queue request metrics for structured JSON logging.
         
         Args:
             metrics: Request metrics to log
         """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop to run the worker on; log inline
+            self._emit_request_logs([metrics])
+            return
+        
+        # (Re)start the worker if it is not running on this loop, e.g. after
+        # the previous loop was shut down. It runs in an empty context rather
+        # than a copy of this request's, so it never inherits its trace ID
+        task = self._log_worker_task
+        if task is None or task.done() or task.get_loop() is not loop:
+            self._log_queue = asyncio.Queue(maxsize=LOG_QUEUE_SIZE)
+            self._log_worker_task = loop.create_task(
+                self._log_worker(self._log_queue), context=contextvars.Context()
+            )
+        
+        try:
+            self._log_queue.put_nowait(metrics)
+        except asyncio.QueueFull:
+            # Drop the oldest entry to make room
+            self._log_queue.get_nowait()
+            self._log_queue.put_nowait(metrics)
+    
+    async def _log_worker(self, queue: asyncio.Queue) -> None:
+        """
+        Emit queued request logs in batches until cancelled.
+        
+        Args:
+            queue: Queue of RequestMetrics to log
+        """
+        batch: list[RequestMetrics] = []
+        try:
+            while True:
+                batch.append(await queue.get())
+                while len(batch) < LOG_BATCH_SIZE and not queue.empty():
+                    batch.append(queue.get_nowait())
+                self._emit_request_logs(batch)
+                batch = []
+        finally:
+            # Flush what is left when the event loop shuts down
+            while not queue.empty():
+                batch.append(queue.get_nowait())
+            if batch:
+                self._emit_request_logs(batch)
+    
+    def _emit_request_logs(self, batch: list[RequestMetrics]) -> None:
+        """
+        Log request metrics as structured JSON, one record per request.
+        
+        Each record is stamped with the trace ID of its own request.
+        
+        Args:
+            batch: Request metrics to log
+        """
+        for metrics in batch:
+            token = trace_id_var.set(metrics.trace_id or trace_id_var.get())
+            try:
+                self.logger.info(self._format_request_metrics(metrics))
+            finally:
+                trace_id_var.reset(token)
+    
+    @staticmethod
+    def _format_request_metrics(metrics: RequestMetrics) -> str:
+        """
+        Serialize request metrics as a JSON log line.
+        
+        Args:
+            metrics: Request metrics to serialize
+            
+        Returns:
+            JSON string
+        """
         log_data = {
             "event": "request_completed",
             "request_id": metrics.request_id,
@@ -187,7 +312,7 @@ class CostTrackingMiddleware(BaseHTTPMiddleware):
                 "cost_usd": metrics.cost_usd
             })
         
-        self.logger.info(json.dumps(log_data))
+        return json.dumps(log_data)
     
     def _log_request_error(self, metrics: RequestMetrics, error: Exception) -> None:
         """
@@ -6,18 +6,37 @@ This module sets up enterprise-grade logging with:
 - Structured logging (JSON format for log aggregation tools)
 - Multiple log levels (DEBUG, INFO, WARNING, ERROR, CRITICAL)
 - Separate handlers for console and file output
-- Context information (timestamp, module, function, line number)
+- Context information (timestamp, module, function, line number, trace ID)
 """
 
 import logging
 import logging.handlers
 import json
+from contextvars import ContextVar
 from pathlib import Path
 from datetime import datetime
 from typing import Any, Dict
 import sys
 
 
+# Trace ID of the request being handled; set by the request middleware so
+# nested logger calls pick it up without threading it through every call
+trace_id_var: ContextVar[str] = ContextVar("trace_id", default="-")
+
+# Logger namespaces configured by setup_logging: get_logger() names and the
+# application's own modules, which log through logging.getLogger(__name__)
+APP_LOGGER_NAMESPACES = ("websearch", "src")
+
+
+class TraceIdFilter(logging.Filter):
+    """Inject the current request's trace ID into every log record."""
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        """Attach ``trace_id`` to the record; never drops it."""
+        record.trace_id = trace_id_var.get()
+        return True
+
+
 class JSONFormatter(logging.Formatter):
     """
     Custom formatter that outputs logs in JSON format.
@@ -38,6 +57,7 @@ class JSONFormatter(logging.Formatter):
             "function": record.funcName,
             "line": record.lineno,
             "message": record.getMessage(),
+            "trace_id": getattr(record, "trace_id", trace_id_var.get()),
         }
         
         # Add exception info if present
@@ -65,6 +85,9 @@ def setup_logging(
     """
     Configure application-wide logging.
     
+    The same handlers are installed on every logger in
+    APP_LOGGER_NAMESPACES, and stamp each record with the current trace ID.
+    
     Args:
         log_level: Minimum log level (DEBUG, INFO, WARNING, ERROR, CRITICAL)
         log_dir: Directory for log files (created if doesn't exist)
@@ -80,12 +103,10 @@ def setup_logging(
         >>> logger.info("Application started")
         >>> logger.error("Something went wrong", exc_info=True)
     """
-    # Create logger
-    logger = logging.getLogger("websearch")
-    logger.setLevel(getattr(logging, log_level.upper()))
+    handlers = []
     
-    # Remove existing handlers (prevent duplicate logs)
-    logger.handlers.clear()
+    # Every handler stamps records with the current request's trace ID
+    trace_filter = TraceIdFilter()
     
     # Create log directory if it doesn't exist
     if enable_file:
@@ -99,11 +120,12 @@ def setup_logging(
         
         # Human-readable format for console
         console_format = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+            '%(asctime)s - %(name)s - %(levelname)s - [%(trace_id)s] %(message)s',
             datefmt='%Y-%m-%d %H:%M:%S'
         )
         console_handler.setFormatter(console_format)
-        logger.addHandler(console_handler)
+        console_handler.addFilter(trace_filter)
+        handlers.append(console_handler)
     
     # File Handler with rotation (prevents disk space issues)
     if enable_file:
@@ -122,15 +144,16 @@ def setup_logging(
         else:
             format_str = (
                 '%(asctime)s - %(name)s - %(levelname)s - '
-                '%(module)s:%(funcName)s:%(lineno)d - %(message)s'
+                '%(module)s:%(funcName)s:%(lineno)d - [%(trace_id)s] %(message)s'
             )
             file_format = logging.Formatter(
                 format_str,
                 datefmt='%Y-%m-%d %H:%M:%S'
             )
             file_handler.setFormatter(file_format)
+        file_handler.addFilter(trace_filter)
         
-        logger.addHandler(file_handler)
+        handlers.append(file_handler)
         
         # Error log (only errors and critical issues)
         error_handler = logging.handlers.RotatingFileHandler(
@@ -145,8 +168,20 @@ def setup_logging(
             error_handler.setFormatter(JSONFormatter())
         else:
             error_handler.setFormatter(file_format)
+        error_handler.addFilter(trace_filter)
+        
+        handlers.append(error_handler)
+    
+    for namespace in APP_LOGGER_NAMESPACES:
+        namespace_logger = logging.getLogger(namespace)
+        namespace_logger.setLevel(getattr(logging, log_level.upper()))
         
-        logger.addHandler(error_handler)
+        # Remove existing handlers (prevent duplicate logs)
+        namespace_logger.handlers.clear()
+        for handler in handlers:
+            namespace_logger.addHandler(handler)
+    
+    logger = logging.getLogger("websearch")
     
     # Log the initialization
     logger.info(
@@ -6,16 +6,25 @@ Provides note storage, retrieval, and management for students.
 Supports markdown formatting, tags, and linking to documents/podcasts.
 """
 
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Set
+from collections import defaultdict
 from dataclasses import dataclass, asdict
 from datetime import datetime
 import json
 import os
+import re
 from pathlib import Path
 import logging
 
 logger = logging.getLogger(__name__)
 
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def _tokenize(text: str) -> Set[str]:
+    """Split lowercased text into its set of word tokens."""
+    return set(_TOKEN_RE.findall(text.lower()))
+
 
 @dataclass
 class Note:
@@ -59,6 +68,12 @@ class NoteManager:
         self.storage_path = Path(storage_path)
         self.storage_path.mkdir(parents=True, exist_ok=True)
         self.notes_file = self.storage_path / "notes.json"
+        
+        # Inverted index for search_notes: token -> note IDs, plus the
+        # tokens indexed for each note so it can be removed again
+        self._index: Dict[str, Set[str]] = defaultdict(set)
+        self._note_tokens: Dict[str, Set[str]] = {}
+        
         self._load_notes()
     
     def _load_notes(self):
@@ -77,6 +92,25 @@ class NoteManager:
                 self.notes = {}
         else:
             self.notes = {}
+        
+        for note in self.notes.values():
+            self._index_note(note)
+    
+    def _index_note(self, note: Note):
+        """Add (or refresh) a note's title and content tokens in the search index."""
+        self._unindex_note(note.note_id)
+        tokens = _tokenize(note.title) | _tokenize(note.content)
+        self._note_tokens[note.note_id] = tokens
+        for token in tokens:
+            self._index[token].add(note.note_id)
+    
+    def _unindex_note(self, note_id: str):
+        """Remove a note from the search index."""
+        for token in self._note_tokens.pop(note_id, ()):
+            postings = self._index[token]
+            postings.discard(note_id)
+            if not postings:
+                del self._index[token]
     
     def _save_notes(self):
         """Save notes to storage."""
@@ -134,6 +168,7 @@ class NoteManager:
         )
         
         self.notes[note_id] = note
+        self._index_note(note)
         self._save_notes()
         
         logger.info(f"Created note: {note_id}")
@@ -226,6 +261,9 @@ class NoteManager:
         
         note.updated_at = datetime.now().isoformat()
         
+        if title is not None or content is not None:
+            self._index_note(note)
+        
         self._save_notes()
         logger.info(f"Updated note: {note_id}")
         
@@ -243,6 +281,7 @@ class NoteManager:
         """
         if note_id in self.notes:
             del self.notes[note_id]
+            self._unindex_note(note_id)
             self._save_notes()
             logger.info(f"Deleted note: {note_id}")
             return True
@@ -261,7 +300,7 @@ class NoteManager:
         query_lower = query.lower()
         
         matching_notes = [
-            note for note in self.notes.values()
+            note for note in self._search_candidates(query_lower)
             if query_lower in note.title.lower() or query_lower in note.content.lower()
         ]
         
@@ -270,6 +309,39 @@ class NoteManager:
         
         return matching_notes
     
+    def _search_candidates(self, query_lower: str) -> List[Note]:
+        """
+        Narrow search_notes to notes that can contain the query.
+        
+        Every word of a substring match lies inside some word of the note,
+        so a note is a candidate only if each query token is a substring of
+        one of its indexed tokens. Matching against the index vocabulary
+        instead of whole note bodies keeps partial words ("photo" finds
+        "photosynthesis") working.
+        
+        Args:
+            query_lower: Lowercased search query
+            
+        Returns:
+            Notes that may match; all notes if the query has no word tokens
+        """
+        query_tokens = sorted(_tokenize(query_lower), key=len, reverse=True)
+        if not query_tokens:
+            return list(self.notes.values())
+        
+        candidates: Optional[Set[str]] = None
+        for query_token in query_tokens:
+            matched: Set[str] = set()
+            for token, note_ids in self._index.items():
+                if query_token in token:
+                    matched |= note_ids
+            
+            candidates = matched if candidates is None else candidates & matched
+            if not candidates:
+                return []
+        
+        return [self.notes[note_id] for note_id in candidates]
+    
     def get_all_tags(self) -> List[str]:
         """Get all unique tags across all notes."""
         tags = set()
@@ -308,6 +380,7 @@ class NoteManager:
         for note_id, note_data in data.items():
             if note_id not in self.notes:
                 self.notes[note_id] = Note(**note_data)
+                self._index_note(self.notes[note_id])
                 imported_count += 1
         
         self._save_notes()
@@ -10,6 +10,7 @@ from typing import List, Optional, Dict, Any
 from dataclasses import dataclass, asdict, field
 from datetime import datetime, timedelta
 import json
+from operator import attrgetter
 from pathlib import Path
 import logging
 
@@ -131,7 +132,11 @@ class ProgressTracker:
                     if 'study_sessions' in data:
                         data['study_sessions'] = [StudySession(**s) for s in data['study_sessions']]
                     if 'achievements' in data:
-                        data['achievements'] = [Achievement(**a) for a in data['achievements']]
+                        # Kept in earned order; new achievements are appended
+                        data['achievements'] = sorted(
+                            (Achievement(**a) for a in data['achievements']),
+                            key=attrgetter('earned_at')
+                        )
                     
                     self.progress = StudentProgress(**data)
                 logger.info("Loaded progress data")
@@ -351,6 +356,24 @@ class ProgressTracker:
                 self.progress.achievements.append(achievement)
                 logger.info(f"Achievement earned: {title}")
     
+    def get_recent_achievements(self, limit: Optional[int] = None) -> List[Achievement]:
+        """
+        Get earned achievements, most recent first.
+        
+        Achievements are stored in the order they were earned, so this is a
+        reversed slice rather than a sort.
+        
+        Args:
+            limit: Maximum number of achievements to return (all if None)
+            
+        Returns:
+            List of achievements, newest first
+        """
+        achievements = self.progress.achievements
+        if limit is not None:
+            achievements = achievements[-limit:] if limit > 0 else []
+        return achievements[::-1]
+    
     def get_progress_summary(self) -> Dict[str, Any]:
         """Get a summary of student progress."""
         avg_quiz_score = (
@@ -388,7 +411,7 @@ class ProgressTracker:
             },
             "achievements": {
                 "earned": len(self.progress.achievements),
-                "recent": [a.title for a in sorted(self.progress.achievements, key=lambda x: x.earned_at, reverse=True)[:3]]
+                "recent": [a.title for a in self.get_recent_achievements(3)]
             }
         }
 
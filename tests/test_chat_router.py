@@ -321,12 +321,30 @@ class TestChatRouter:
             assert call_args[1]["temperature"] == 0.7  # Default
             assert call_args[1]["max_tokens"] == 1000  # Default
 
+    
+    def test_trace_id_fallback_is_unique(self):
+        """Test that generated fallback trace IDs are unique per call."""
+        from src.api.chat_router import _gen_trace_id
+        
+        trace_ids = {_gen_trace_id() for _ in range(1000)}
+        assert len(trace_ids) == 1000
+
 
 class TestWebSearchAugmentation:
     """Test the web search augmentation functionality."""
     
+    @pytest.fixture(autouse=True)
+    def clear_search_cache(self):
+        """Start each test with an empty search cache and no shared service."""
+        from src.api.chat_router import _search_cache, _get_search_service
+        _search_cache.clear()
+        _get_search_service.cache_clear()
+        yield
+        _search_cache.clear()
+        _get_search_service.cache_clear()
+    
     @pytest.mark.asyncio
-    @patch.dict("os.environ", {"OPENAI_API_KEY": "test-key"})
+    @patch("src.api.chat_router._OPENAI_API_KEY", "test-key")
     @patch("src.api.chat_router.SearchService")
     async def test_search_augmentation_success(self, mock_search_service_class):
         """Test successful web search augmentation."""
@@ -385,7 +403,7 @@ class TestWebSearchAugmentation:
         assert messages[1].content == "What is the weather?"
     
     @pytest.mark.asyncio
-    @patch.dict("os.environ", {}, clear=True)
+    @patch("src.api.chat_router._OPENAI_API_KEY", None)
     async def test_search_augmentation_missing_api_key(self):
         """Test search augmentation with missing API key."""
         from src.api.chat_router import _perform_web_search_augmentation
@@ -403,7 +421,7 @@ class TestWebSearchAugmentation:
         assert exc_info.value.code == "MISSING_API_KEY"
     
     @pytest.mark.asyncio
-    @patch.dict("os.environ", {"OPENAI_API_KEY": "test-key"})
+    @patch("src.api.chat_router._OPENAI_API_KEY", "test-key")
     @patch("src.api.chat_router.SearchService")
     async def test_search_augmentation_no_user_messages(self, mock_search_service_class):
         """Test search augmentation with no user messages."""
@@ -423,7 +441,7 @@ class TestWebSearchAugmentation:
         mock_search_service_class.assert_not_called()
     
     @pytest.mark.asyncio
-    @patch.dict("os.environ", {"OPENAI_API_KEY": "test-key"})
+    @patch("src.api.chat_router._OPENAI_API_KEY", "test-key")
     @patch("src.api.chat_router.SearchService")
     async def test_search_augmentation_with_domains(self, mock_search_service_class):
         """Test search augmentation with domain filtering."""
@@ -462,7 +480,7 @@ class TestWebSearchAugmentation:
         assert search_options.allowed_domains == ["example.com", "test.org"]
     
     @pytest.mark.asyncio
-    @patch.dict("os.environ", {"OPENAI_API_KEY": "test-key"})
+    @patch("src.api.chat_router._OPENAI_API_KEY", "test-key")
     @patch("src.api.chat_router.SearchService")
     async def test_search_augmentation_system_message_placement(self, mock_search_service_class):
         """Test that system messages are placed correctly."""
@@ -513,6 +531,155 @@ class TestWebSearchAugmentation:
         assert messages[2].content == "What is Python?"
 
 
+    @pytest.mark.asyncio
+    @patch("src.api.chat_router._OPENAI_API_KEY", "test-key")
+    @patch("src.api.chat_router.SearchService")
+    async def test_search_augmentation_skips_trivial_queries(self, mock_search_service_class):
+        """Test that conversational filler does not trigger a search."""
+        from src.api.chat_router import _perform_web_search_augmentation
+        from src.providers.base import LLMMessage
+        from src.api.chat_router import ChatOptions
+        
+        for content in ["Thanks", "  ok  ", "   "]:
+            messages = [LLMMessage(role="user", content=content)]
+            citations = await _perform_web_search_augmentation(
+                messages, ChatOptions(use_search=True), "trace-123"
+            )
+            assert citations == []
+            assert len(messages) == 1
+        
+        mock_search_service_class.assert_not_called()
+    
+    @pytest.mark.asyncio
+    @patch("src.api.chat_router._OPENAI_API_KEY", "test-key")
+    @patch("src.api.chat_router.SearchService")
+    async def test_search_augmentation_reuses_cached_results(self, mock_search_service_class):
+        """Test that a repeated query is answered from the search cache."""
+        from src.api.chat_router import _perform_web_search_augmentation
+        from src.providers.base import LLMMessage
+        from src.api.chat_router import ChatOptions
+        from datetime import datetime
+        
+        mock_search_service = Mock()
+        mock_search_service.search.return_value = SearchResult(
+            query="What is Python?",
+            text="Search results",
+            citations=[
+                ModelCitation(
+                    url="https://example.com",
+                    title="Example",
+                    start_index=0,
+                    end_index=5
+                )
+            ],
+            sources=[],
+            search_id="test-cache",
+            timestamp=datetime.now()
+        )
+        mock_search_service_class.return_value = mock_search_service
+        
+        options = ChatOptions(use_search=True, domains=["b.com", "a.com"])
+        first = [LLMMessage(role="user", content="What is Python?")]
+        second = [LLMMessage(role="user", content="  what is python?")]
+        
+        await _perform_web_search_augmentation(first, options, "trace-1")
+        citations = await _perform_web_search_augmentation(
+            second, ChatOptions(use_search=True, domains=["a.com", "b.com"]), "trace-2"
+        )
+        
+        assert mock_search_service.search.call_count == 1
+        assert len(citations) == 1
+        assert second[0].role == "system"
+        assert "Search results" in second[0].content
+    
+    @pytest.mark.asyncio
+    @patch("src.api.chat_router._OPENAI_API_KEY", "test-key")
+    @patch("src.api.chat_router.SearchService")
+    async def test_search_augmentation_cache_entries_expire(self, mock_search_service_class):
+        """Test that cached search results are not served after their TTL."""
+        from src.api.chat_router import _perform_web_search_augmentation, SEARCH_CACHE_TTL_SECONDS
+        from src.providers.base import LLMMessage
+        from src.api.chat_router import ChatOptions
+        from datetime import datetime
+        
+        mock_search_service = Mock()
+        mock_search_service.search.return_value = SearchResult(
+            query="What is Python?",
+            text="Search results",
+            citations=[
+                ModelCitation(
+                    url="https://example.com",
+                    title="Example",
+                    start_index=0,
+                    end_index=5
+                )
+            ],
+            sources=[],
+            search_id="test-ttl",
+            timestamp=datetime.now()
+        )
+        mock_search_service_class.return_value = mock_search_service
+        
+        with patch("src.api.chat_router.time.monotonic", return_value=1000.0):
+            await _perform_web_search_augmentation(
+                [LLMMessage(role="user", content="What is Python?")],
+                ChatOptions(use_search=True), "trace-1"
+            )
+        with patch("src.api.chat_router.time.monotonic", return_value=1000.0 + SEARCH_CACHE_TTL_SECONDS):
+            citations = await _perform_web_search_augmentation(
+                [LLMMessage(role="user", content="What is Python?")],
+                ChatOptions(use_search=True), "trace-2"
+            )
+        
+        assert mock_search_service.search.call_count == 2
+        assert len(citations) == 1
+
+    
+    @pytest.mark.asyncio
+    @patch("src.api.chat_router._OPENAI_API_KEY", "test-key")
+    @patch("src.api.chat_router.SearchService")
+    async def test_search_augmentation_coalesces_concurrent_requests(self, mock_search_service_class):
+        """Test that concurrent identical queries share one search call."""
+        import asyncio
+        from src.api.chat_router import _perform_web_search_augmentation, _inflight_searches
+        from src.providers.base import LLMMessage
+        from src.api.chat_router import ChatOptions
+        from datetime import datetime
+        
+        mock_search_service = Mock()
+        mock_search_service.search.return_value = SearchResult(
+            query="Latest AI research",
+            text="Search results",
+            citations=[
+                ModelCitation(
+                    url="https://example.com",
+                    title="Example",
+                    start_index=0,
+                    end_index=5
+                )
+            ],
+            sources=[],
+            search_id="test-inflight",
+            timestamp=datetime.now()
+        )
+        mock_search_service_class.return_value = mock_search_service
+        
+        conversations = [
+            [LLMMessage(role="user", content="Latest AI research")]
+            for _ in range(5)
+        ]
+        results = await asyncio.gather(*[
+            _perform_web_search_augmentation(messages, ChatOptions(use_search=True), f"trace-{i}")
+            for i, messages in enumerate(conversations)
+        ])
+        
+        assert mock_search_service.search.call_count == 1
+        assert all(len(citations) == 1 for citations in results)
+        assert all(messages[0].role == "system" for messages in conversations)
+        await asyncio.sleep(0)
+        assert _inflight_searches == {}
+
+
 class TestChatModels:
     """Test the Pydantic models for chat API."""
     
@@ -0,0 +1,260 @@
+"""
+Unit tests for document text extraction.
+
+Tests chapter detection and plain-text extraction in the document processor.
+"""
+
+import hashlib
+import io
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+from fastapi import HTTPException, UploadFile
+from starlette.datastructures import Headers
+from unittest.mock import Mock, patch
+
+from src.documents.models import DocumentParsingError
+from src.documents.processor import (
+    EXTRACTION_ATTEMPTS,
+    DocumentProcessor,
+    TextExtractor,
+    get_extractor_pool,
+)
+
+
+def _upload(data: bytes, content_type: str = "text/plain") -> UploadFile:
+    """Build an UploadFile around in-memory bytes."""
+    return UploadFile(
+        io.BytesIO(data),
+        filename="notes.txt",
+        headers=Headers({"content-type": content_type}),
+    )
+
+
+@pytest.mark.unit
+class TestDocumentUpload:
+    """Test DocumentProcessor.upload_document."""
+
+    @pytest.mark.asyncio
+    async def test_upload_streams_file_to_disk(self, tmp_path):
+        """Test that the upload is written under the document ID with its size."""
+        processor = DocumentProcessor(upload_dir=str(tmp_path))
+        data = b"line of text\n" * 1000
+
+        with patch("src.documents.processor.UPLOAD_CHUNK_SIZE", 4096):
+            document = await processor.upload_document(_upload(data), "user")
+
+        assert document.file_size == len(data)
+        assert document.title == "notes"
+        with open(document.file_path, "rb") as f:
+            assert f.read() == data
+
+    @pytest.mark.asyncio
+    async def test_integrity_check_detects_modified_bytes(self, tmp_path):
+        """Test that a same-size change to the file fails the integrity check."""
+        processor = DocumentProcessor(upload_dir=str(tmp_path))
+        document = await processor.upload_document(_upload(b"original text"), "user")
+
+        assert document.content_hash == hashlib.blake2b(b"original text").hexdigest()
+        assert processor.validate_document_integrity(document)
+
+        with open(document.file_path, "wb") as f:
+            f.write(b"modified text")
+
+        assert not processor.validate_document_integrity(document)
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("size, status", [(0, 400), (2048, 413)])
+    async def test_rejected_upload_leaves_no_file(self, tmp_path, size, status):
+        """Test that empty and oversized uploads are rejected and cleaned up."""
+        processor = DocumentProcessor(upload_dir=str(tmp_path))
+        processor.max_file_size = 1024
+
+        with pytest.raises(HTTPException) as exc_info:
+            await processor.upload_document(_upload(b"x" * size), "user")
+
+        assert exc_info.value.status_code == status
+        assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.unit
+class TestChapterDetection:
+    """Test TextExtractor._detect_chapters_in_text."""
+
+    def setup_method(self):
+        """Create a fresh extractor."""
+        self.extractor = TextExtractor()
+
+    def test_detects_common_heading_styles(self):
+        """Test that each supported heading style starts a chapter."""
+        text = (
+            "Preface text that belongs to no chapter.\n"
+            "Chapter 1: The Beginning\n"
+            "It was a dark night.\n"
+            "\n"
+            "  The wind howled.  \n"
+            "2. Second Part\n"
+            "More text here.\n"
+            "   INTRODUCTION TO PHYSICS   \n"
+            "Forces, mass and motion.\n"
+        )
+
+        chapters = self.extractor._detect_chapters_in_text(text)
+
+        assert [c.title for c in chapters] == [
+            "Chapter 1: The Beginning",
+            "Second Part",
+            "INTRODUCTION TO PHYSICS",
+        ]
+        assert chapters[0].content_preview == "It was a dark night. The wind howled."
+        assert chapters[2].content_preview == "Forces, mass and motion."
+
+    def test_skips_headings_without_content(self):
+        """Test that a heading followed directly by another heading is dropped."""
+        text = "Chapter 1: Empty\n\nChapter 2: Full\nBody text.\n"
+
+        chapters = self.extractor._detect_chapters_in_text(text)
+
+        assert [c.title for c in chapters] == ["Chapter 2: Full"]
+
+    def test_preview_is_capped(self):
+        """Test that previews are truncated to 200 characters."""
+        text = "Chapter 1: Long\n" + ("word, " * 30 + "\n") * 20
+
+        chapters = self.extractor._detect_chapters_in_text(text)
+
+        assert len(chapters[0].content_preview) == 200
+        assert chapters[0].content_preview.startswith("word, word,")
+
+    def test_no_headings(self):
+        """Test that text without headings yields no chapters."""
+        assert self.extractor._detect_chapters_in_text("just, some prose.\n") == []
+
+
+@pytest.mark.unit
+class TestPdfExtraction:
+    """Test TextExtractor._extract_pdf."""
+
+    @patch("src.documents.processor.PyPDF2")
+    def test_pages_are_labelled_and_blank_pages_skipped(self, mock_pypdf2, tmp_path):
+        """Test that text pages are labelled and blank or broken pages are skipped."""
+        broken = Mock()
+        broken.extract_text.side_effect = ValueError("bad page")
+        pages = [Mock(), Mock(), broken, Mock()]
+        pages[0].extract_text.return_value = "First page"
+        pages[1].extract_text.return_value = "   "
+        pages[3].extract_text.return_value = "Fourth page"
+        mock_pypdf2.PdfReader.return_value = Mock(pages=pages, metadata=None)
+
+        pdf_path = tmp_path / "book.pdf"
+        pdf_path.write_bytes(b"%PDF-1.4")
+
+        result = TextExtractor()._extract_pdf(str(pdf_path))
+
+        assert result["text"] == "[Page 1]\nFirst page\n\n[Page 4]\nFourth page\n"
+        assert result["page_count"] == 4
+        assert result["metadata"] == {}
+
+
+@pytest.mark.unit
+class TestEpubExtraction:
+    """Test TextExtractor._extract_epub."""
+
+    def test_chapter_text_is_stripped_of_markup(self, tmp_path):
+        """Test that chapter text drops tags, scripts and styles and decodes entities."""
+        epub = pytest.importorskip("ebooklib.epub")
+
+        book = epub.EpubBook()
+        book.set_identifier("test-book")
+        book.set_title("Test Book")
+        book.set_language("en")
+        chapter = epub.EpubHtml(title="One", file_name="one.xhtml", lang="en")
+        chapter.content = (
+            "<html><head><style>p { color: red; }</style></head><body>"
+            "<h1>Salt &amp; Pepper</h1>"
+            "<p>Caf\u00e9   au <b>lait</b></p>"
+            "<script>var x = 1;</script>"
+            "</body></html>"
+        )
+        book.add_item(chapter)
+        book.spine = [chapter]
+        book.add_item(epub.EpubNcx())
+        book.add_item(epub.EpubNav())
+        epub_path = tmp_path / "book.epub"
+        epub.write_epub(str(epub_path), book)
+
+        result = TextExtractor()._extract_epub(str(epub_path))
+
+        assert "[one.xhtml]\nSalt & Pepper Caf\u00e9 au lait\n" in result["text"]
+        assert "var x" not in result["text"]
+        assert "color" not in result["text"]
+        assert result["metadata"]["title"] == "Test Book"
+
+
+@pytest.mark.unit
+class TestAsyncExtraction:
+    """Test TextExtractor.extract_text_async."""
+
+    @pytest.mark.asyncio
+    async def test_matches_inline_extraction(self, tmp_path):
+        """Test that extraction in the process pool matches extract_text."""
+        processor = DocumentProcessor(upload_dir=str(tmp_path))
+        data = b"Chapter 1: Start\nFirst, words.\nChapter 2: End\nLast, words.\n"
+        document = await processor.upload_document(_upload(data), "user")
+        extractor = TextExtractor()
+
+        result = await extractor.extract_text_async(document)
+        expected = extractor.extract_text(document)
+
+        assert result["text"] == expected["text"]
+        assert [c.title for c in result["chapters"]] == ["Chapter 1: Start", "Chapter 2: End"]
+        assert [c.content_preview for c in result["chapters"]] == [
+            c.content_preview for c in expected["chapters"]
+        ]
+
+    @pytest.mark.asyncio
+    async def test_pool_is_replaced_after_a_worker_dies(self, tmp_path):
+        """Test that a worker dying does not break later extractions."""
+        processor = DocumentProcessor(upload_dir=str(tmp_path))
+        document = await processor.upload_document(_upload(b"still works"), "user")
+
+        broken_pool = get_extractor_pool()
+        with pytest.raises(BrokenProcessPool):
+            broken_pool.submit(os._exit, 1).result()
+
+        result = await TextExtractor().extract_text_async(document)
+
+        assert result["text"] == "still works"
+        assert get_extractor_pool() is not broken_pool
+
+    @pytest.mark.asyncio
+    async def test_document_that_keeps_breaking_the_pool_fails(self, tmp_path):
+        """Test that extraction gives up once each fresh pool breaks too."""
+        processor = DocumentProcessor(upload_dir=str(tmp_path))
+        document = await processor.upload_document(_upload(b"text"), "user")
+        pools = []
+
+        def broken_pool():
+            pool = Mock()
+            pool.submit.side_effect = BrokenProcessPool("worker died")
+            pools.append(pool)
+            return pool
+
+        with patch("src.documents.processor.get_extractor_pool", side_effect=broken_pool):
+            with pytest.raises(DocumentParsingError, match="worker died"):
+                await TextExtractor().extract_text_async(document)
+
+        assert len(pools) == EXTRACTION_ATTEMPTS
+        for pool in pools:
+            pool.shutdown.assert_called_once_with(wait=False, cancel_futures=True)
+
+    @pytest.mark.asyncio
+    async def test_worker_errors_become_parsing_errors(self, tmp_path):
+        """Test that a failure inside the worker surfaces as DocumentParsingError."""
+        processor = DocumentProcessor(upload_dir=str(tmp_path))
+        document = await processor.upload_document(_upload(b"text"), "user")
+        os.remove(document.file_path)
+
+        with pytest.raises(DocumentParsingError):
+            await TextExtractor().extract_text_async(document)
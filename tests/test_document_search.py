@@ -0,0 +1,469 @@
+"""
+Unit tests for document search.
+
+Tests DocumentSearchService and its semantic query cache against a mocked
+vector database service.
+"""
+
+import json
+import threading
+import time
+
+import numpy as np
+import pytest
+from unittest.mock import Mock, patch
+
+from src.documents.query_cache import QUANTIZE_ABOVE_ENTRIES, QueryCache, SemanticQueryCache
+from src.documents import search_service
+from src.documents.search_service import DocumentSearchService
+
+
+# Fixed query embeddings: "b" is a near-duplicate of "a", "c" is unrelated
+EMBEDDINGS = {
+    "a": np.array([1.0, 0.0, 0.0], dtype=np.float32),
+    "b": np.array([0.98, 0.2, 0.0], dtype=np.float32),
+    "c": np.array([0.0, 0.0, 1.0], dtype=np.float32),
+}
+
+
+def _vector_service():
+    """Build a mocked VectorDatabaseService with deterministic embeddings."""
+    service = Mock()
+    service.get_collection_stats.return_value = {"total_chunks": 3, "unique_documents": 1}
+    service.embed_query.side_effect = lambda query: EMBEDDINGS[query]
+    service.embed_queries.side_effect = lambda queries: np.stack([EMBEDDINGS[q] for q in queries])
+    service.search_documents_batch.side_effect = lambda queries, **kwargs: [
+        [Mock(content=query)] for query in queries
+    ]
+    service.iter_search_documents.side_effect = lambda query, **kwargs: iter([Mock(content=query)])
+    return service
+
+
+@pytest.mark.unit
+class TestQueryCache:
+    """Test the exact-key QueryCache class."""
+
+    def test_least_recently_used_entry_is_evicted(self):
+        """Test that a full cache drops the entry used longest ago."""
+        cache = QueryCache(max_size=2)
+        cache.put("a", [1])
+        cache.put("b", [2])
+        cache.get("a")
+        cache.put("c", [3])
+
+        assert cache.get("a") == [1]
+        assert cache.get("b") is None
+        assert cache.get("c") == [3]
+
+    def test_expired_entries_miss(self):
+        """Test that entries older than the TTL are not returned."""
+        cache = QueryCache(ttl_seconds=0.05)
+        cache.put("a", [1])
+        time.sleep(0.06)
+
+        assert cache.get("a") is None
+        assert cache.stats()["misses"] == 1
+        assert len(cache) == 0
+
+
+@pytest.mark.unit
+class TestSemanticQueryCache:
+    """Test the SemanticQueryCache class."""
+
+    def test_similar_query_hits(self):
+        """Test that a near-duplicate embedding with the same key is a hit."""
+        cache = SemanticQueryCache()
+        cache.put(EMBEDDINGS["a"], "key", ["result"])
+
+        assert cache.get(EMBEDDINGS["b"], "key") == ["result"]
+        assert cache.get(EMBEDDINGS["c"], "key") is None
+        assert cache.get(EMBEDDINGS["a"], "other-key") is None
+        assert (cache.hits, cache.misses) == (1, 2)
+
+    def test_entries_expire(self):
+        """Test that entries are not served past their TTL."""
+        cache = SemanticQueryCache(ttl_seconds=10)
+        with patch("src.documents.query_cache.time.monotonic", return_value=100.0):
+            cache.put(EMBEDDINGS["a"], "key", ["result"])
+        with patch("src.documents.query_cache.time.monotonic", return_value=111.0):
+            assert cache.get(EMBEDDINGS["a"], "key") is None
+            assert len(cache) == 0
+
+    def test_least_recently_used_is_evicted(self):
+        """Test that a full cache evicts the entry used longest ago."""
+        cache = SemanticQueryCache(max_entries=2)
+        clock = iter([1.0, 2.0, 3.0, 4.0, 5.0, 6.0])
+        with patch("src.documents.query_cache.time.monotonic", side_effect=lambda: next(clock)):
+            cache.put(EMBEDDINGS["a"], "key", ["a"])
+            cache.put(EMBEDDINGS["c"], "key", ["c"])
+            assert cache.get(EMBEDDINGS["a"], "key") == ["a"]
+            cache.put(np.array([0.0, 1.0, 0.0]), "key", ["new"])
+            assert cache.get(EMBEDDINGS["c"], "key") is None
+            assert cache.get(EMBEDDINGS["a"], "key") == ["a"]
+
+    def test_quantized_cache_matches_like_float(self):
+        """Test that an int8 cache gives the same hits and misses as float32."""
+        cache = SemanticQueryCache(quantize=True)
+        cache.put(EMBEDDINGS["a"], "key", ["result"])
+
+        assert cache._vectors.dtype == np.int8
+        assert cache.get(EMBEDDINGS["b"], "key") == ["result"]
+        assert cache.get(EMBEDDINGS["c"], "key") is None
+
+    def test_large_caches_quantize_by_default(self):
+        """Test that quantization switches on above QUANTIZE_ABOVE_ENTRIES."""
+        assert not SemanticQueryCache(max_entries=QUANTIZE_ABOVE_ENTRIES).quantize
+        assert SemanticQueryCache(max_entries=QUANTIZE_ABOVE_ENTRIES + 1).quantize
+
+    def test_entries_survive_restart(self, tmp_path):
+        """Test that a persisted cache reloads its unexpired entries."""
+        path = str(tmp_path / "cache" / "queries.sqlite")
+        cache = SemanticQueryCache(persist_path=path)
+        cache.put(EMBEDDINGS["a"], ("key", 5), ["result"])
+
+        reloaded = SemanticQueryCache(persist_path=path)
+
+        assert reloaded.get(EMBEDDINGS["b"], ("key", 5)) == ["result"]
+
+        reloaded.clear()
+        assert len(SemanticQueryCache(persist_path=path)) == 0
+
+    def test_entries_are_persisted_as_json(self, tmp_path):
+        """Test that keys and results are stored as JSON and decoded on reload."""
+        path = str(tmp_path / "queries.sqlite")
+        cache = SemanticQueryCache(persist_path=path, result_encoder=lambda r: {"content": r.content})
+        cache.put(EMBEDDINGS["a"], (5, 0.5, ("doc-1",)), [Mock(content="alpha")])
+
+        reloaded = SemanticQueryCache(
+            persist_path=path, result_decoder=lambda data: data["content"].upper()
+        )
+
+        assert reloaded.get(EMBEDDINGS["a"], (5, 0.5, ("doc-1",))) == ["ALPHA"]
+        key, results = reloaded._db.execute("SELECT cache_key, results FROM entries").fetchone()
+        assert json.loads(key) == [5, 0.5, ["doc-1"]]
+        assert json.loads(results) == [{"content": "alpha"}]
+
+    def test_expired_entries_are_not_reloaded(self, tmp_path):
+        """Test that entries past their TTL on disk are dropped on reload."""
+        path = str(tmp_path / "queries.sqlite")
+        cache = SemanticQueryCache(max_entries=2, persist_path=path)
+        with patch("src.documents.query_cache.time.time", return_value=1000.0):
+            cache.put(EMBEDDINGS["a"], "key", ["a"])
+        cache.put(EMBEDDINGS["c"], "key", ["c"])
+
+        reloaded = SemanticQueryCache(max_entries=4, persist_path=path)
+
+        assert len(reloaded) == 1
+        assert reloaded.get(EMBEDDINGS["c"], "key") == ["c"]
+
+
+@pytest.mark.unit
+class TestDocumentSearchService:
+    """Test the DocumentSearchService class."""
+
+    def test_unavailable_service_returns_empty(self):
+        """Test that searching without a vector service returns no results."""
+        service = DocumentSearchService(vector_service=_vector_service())
+        service.vector_service = None
+
+        assert service.search("a") == []
+
+    def test_empty_library_skips_embedding(self):
+        """Test that searching an empty library returns early without embedding."""
+        vector_service = _vector_service()
+        vector_service.get_collection_stats.return_value = {"total_chunks": 0}
+        service = DocumentSearchService(vector_service=vector_service)
+
+        assert service.search("a") == []
+        vector_service.embed_query.assert_not_called()
+        vector_service.search_documents_batch.assert_not_called()
+
+    @patch("src.documents.search_service.VectorDatabaseService")
+    def test_vector_service_is_created_on_first_use(self, mock_vector_service_class):
+        """Test that ChromaDB and the embedding model load on first use, once."""
+        mock_vector_service_class.return_value = _vector_service()
+        service = DocumentSearchService(db_path="/tmp/chroma", collection_name="books")
+
+        mock_vector_service_class.assert_not_called()
+
+        service.search("a")
+        service.has_documents()
+
+        mock_vector_service_class.assert_called_once_with(db_path="/tmp/chroma", collection_name="books")
+
+    @patch("src.documents.search_service.VectorDatabaseService", side_effect=RuntimeError("no model"))
+    def test_failed_initialization_is_not_retried(self, mock_vector_service_class):
+        """Test that a vector service that fails to load leaves search unavailable."""
+        service = DocumentSearchService()
+
+        assert service.search("a") == []
+        assert not service.is_available()
+        mock_vector_service_class.assert_called_once()
+
+    def test_near_duplicate_query_uses_cache(self):
+        """Test that a near-duplicate query is answered without a database call."""
+        vector_service = _vector_service()
+        service = DocumentSearchService(vector_service=vector_service)
+
+        first = service.search("a")
+        second = service.search("b")
+
+        assert [r.content for r in first] == ["a"]
+        assert [r.content for r in second] == ["a"]
+        vector_service.search_documents_batch.assert_called_once()
+        # The embedding computed for the cache lookup is reused for the query
+        assert vector_service.embed_query.call_count == 2
+        np.testing.assert_array_equal(
+            vector_service.search_documents_batch.call_args.kwargs["query_embeddings"][0], EMBEDDINGS["a"]
+        )
+        assert service.cache_stats()["hits"] == 1
+
+    def test_repeated_query_skips_embedding(self):
+        """Test that a byte-identical query is answered before embedding."""
+        vector_service = _vector_service()
+        service = DocumentSearchService(vector_service=vector_service)
+
+        service.search("a", document_ids=["doc-2", "doc-1"])
+        results = service.search("a", document_ids=["doc-1", "doc-2"])
+
+        assert [r.content for r in results] == ["a"]
+        vector_service.embed_query.assert_called_once()
+        assert service.cache_stats()["exact_hits"] == 1
+
+        service.clear_cache()
+        service.search("a", document_ids=["doc-1", "doc-2"])
+        assert vector_service.search_documents_batch.call_count == 2
+
+    def test_document_filter_order_shares_semantic_cache(self):
+        """Test that a reordered document filter hits the semantic cache too."""
+        vector_service = _vector_service()
+        service = DocumentSearchService(vector_service=vector_service)
+
+        service.search("a", document_ids=["doc-2", "doc-1"])
+        results = service.search("b", document_ids=["doc-1", "doc-2"])
+
+        assert [r.content for r in results] == ["a"]
+        vector_service.search_documents_batch.assert_called_once()
+        assert service.cache_stats()["hits"] == 1
+
+    def test_collection_changes_clear_cached_results(self):
+        """Test that the vector service's invalidation callback drops cached results and stats."""
+        vector_service = _vector_service()
+        service = DocumentSearchService(vector_service=vector_service)
+        service.search("a")
+
+        on_collection_changed = vector_service.add_invalidation_callback.call_args.args[0]
+        on_collection_changed()
+        service.search("a")
+
+        # Neither the exact nor the semantic cache answers after the change
+        assert vector_service.search_documents_batch.call_count == 2
+        assert vector_service.get_collection_stats.call_count == 2
+
+    def test_vector_service_cache_is_bypassed(self):
+        """Test that results are cached once, by the search service, not the vector service."""
+        vector_service = _vector_service()
+        service = DocumentSearchService(vector_service=vector_service)
+
+        service.search("a")
+
+        assert vector_service.search_documents_batch.call_args.kwargs["use_cache"] is False
+
+    def test_candidates_are_oversampled(self):
+        """Test that more candidates than results are fetched for thresholding."""
+        vector_service = _vector_service()
+        service = DocumentSearchService(vector_service=vector_service, oversample_factor=3)
+
+        service.search("a", max_results=5)
+
+        kwargs = vector_service.search_documents_batch.call_args.kwargs
+        assert (kwargs["n_results"], kwargs["fetch_k"]) == (5, 15)
+
+    def test_filters_are_part_of_cache_key(self):
+        """Test that different filters do not share cached results."""
+        vector_service = _vector_service()
+        service = DocumentSearchService(vector_service=vector_service)
+
+        service.search("a", document_ids=["doc-1"])
+        service.search("a", document_ids=["doc-2"])
+        service.search("a", max_results=3, document_ids=["doc-1"])
+
+        assert vector_service.search_documents_batch.call_count == 3
+
+    def test_clear_cache(self):
+        """Test that clearing the cache forces a fresh search."""
+        vector_service = _vector_service()
+        service = DocumentSearchService(vector_service=vector_service)
+
+        service.search("a")
+        service.clear_cache()
+        service.search("a")
+
+        assert vector_service.search_documents_batch.call_count == 2
+
+    def test_lone_search_skips_batch_window(self):
+        """Test that a search with nothing else in flight does not wait for a batch."""
+        vector_service = _vector_service()
+        service = DocumentSearchService(vector_service=vector_service, batch_window_seconds=10)
+
+        started = time.monotonic()
+        results = service.search("a")
+
+        assert [r.content for r in results] == ["a"]
+        assert time.monotonic() - started < 5
+
+    def test_searches_arriving_during_a_query_share_one_batch(self):
+        """Test that searches arriving while another is in flight are sent as one batch."""
+        vector_service = _vector_service()
+        search_batch = vector_service.search_documents_batch.side_effect
+        first_started, release_first = threading.Event(), threading.Event()
+
+        def slow_first_batch(queries, **kwargs):
+            if queries == ["a"]:
+                first_started.set()
+                release_first.wait(5)
+            return search_batch(queries, **kwargs)
+
+        vector_service.search_documents_batch.side_effect = slow_first_batch
+        service = DocumentSearchService(vector_service=vector_service, batch_window_seconds=5)
+        service._batcher.max_size = 2
+        results = {}
+
+        def run(query):
+            results[query] = service.search(query)
+
+        first = threading.Thread(target=run, args=("a",))
+        first.start()
+        assert first_started.wait(5)
+
+        threads = [threading.Thread(target=run, args=(q,)) for q in ("b", "c")]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        release_first.set()
+        first.join()
+
+        assert {q: [r.content for r in res] for q, res in results.items()} == {
+            "a": ["a"], "b": ["b"], "c": ["c"]
+        }
+        calls = vector_service.search_documents_batch.call_args_list
+        assert [sorted(call.kwargs["queries"]) for call in calls] == [["a"], ["b", "c"]]
+
+    def test_batch_failure_returns_empty(self):
+        """Test that a failed batched query yields no results instead of raising."""
+        vector_service = _vector_service()
+        vector_service.search_documents_batch.side_effect = RuntimeError("db down")
+        service = DocumentSearchService(vector_service=vector_service)
+
+        assert service.search("a") == []
+
+    @pytest.mark.asyncio
+    async def test_search_batch_skips_cached_queries(self):
+        """Test that search_batch embeds once and only queries cache misses."""
+        vector_service = _vector_service()
+        service = DocumentSearchService(vector_service=vector_service, batch_window_seconds=0)
+        service.search("a")
+
+        results = await service.search_batch(["b", "c"])
+
+        assert [[r.content for r in res] for res in results] == [["a"], ["c"]]
+        vector_service.embed_queries.assert_called_once_with(["b", "c"])
+        assert vector_service.search_documents_batch.call_args.kwargs["queries"] == ["c"]
+
+    def test_collection_stats_are_reused(self):
+        """Test that stats are fetched once per TTL window and on invalidation."""
+        vector_service = _vector_service()
+        service = DocumentSearchService(vector_service=vector_service)
+
+        with patch("src.documents.search_service.time.monotonic", return_value=100.0):
+            assert service.has_documents()
+            assert service.list_available_documents()[0]["total_documents"] == 1
+        assert vector_service.get_collection_stats.call_count == 1
+
+        with patch("src.documents.search_service.time.monotonic", return_value=103.0):
+            service.has_documents()
+        assert vector_service.get_collection_stats.call_count == 2
+
+        service.invalidate_stats()
+        with patch("src.documents.search_service.time.monotonic", return_value=103.5):
+            service.has_documents()
+        assert vector_service.get_collection_stats.call_count == 3
+
+    def test_iter_search_streams_uncached_results(self):
+        """Test that iter_search streams from the vector service and reuses cached results."""
+        vector_service = _vector_service()
+        service = DocumentSearchService(vector_service=vector_service)
+
+        assert [r.content for r in service.iter_search("c")] == ["c"]
+        vector_service.iter_search_documents.assert_called_once()
+        vector_service.search_documents_batch.assert_not_called()
+
+        service.search("a")
+        assert [r.content for r in service.iter_search("a")] == ["a"]
+        vector_service.iter_search_documents.assert_called_once()
+
+    def test_format_accepts_an_iterator(self):
+        """Test that the formatter counts results from a one-shot iterator."""
+        service = DocumentSearchService(vector_service=_vector_service())
+        results = iter([Mock(document_title="Notes", page_number=None, content="Energy")])
+
+        assert service.format_search_results_for_agent(results) == (
+            "Found 1 relevant passages from uploaded documents:\n"
+            "\n\n[Source 1: Notes]\n\nEnergy\n"
+        )
+        assert service.format_search_results_for_agent(iter([])) == (
+            "No relevant information found in uploaded documents."
+        )
+
+    def test_format_results_for_agent(self):
+        """Test the text block handed to agents for a list of results."""
+        service = DocumentSearchService(vector_service=_vector_service())
+        results = [
+            Mock(document_title="Physics", page_number=4, content="F = ma",
+                 similarity_score=0.912, chapter_id="ch-2"),
+            Mock(document_title="Notes", page_number=None, content="Energy",
+                 similarity_score=0.5, chapter_id=None),
+        ]
+
+        assert service.format_search_results_for_agent(results) == (
+            "Found 2 relevant passages from uploaded documents:\n"
+            "\n\n[Source 1: Physics]\n(Page 4)\n\nF = ma\n"
+            "\n\n[Source 2: Notes]\n\nEnergy\n"
+        )
+        assert service.format_search_results_for_agent(results[:1], include_metadata=True).endswith(
+            "F = ma\n\nRelevance Score: 0.91\nChapter ID: ch-2"
+        )
+        assert service.format_search_results_for_agent([]) == (
+            "No relevant information found in uploaded documents."
+        )
+
+
+@pytest.mark.unit
+class TestGlobalSearchService:
+    """Test get_document_search_service."""
+
+    def test_concurrent_first_calls_build_one_service(self):
+        """Test that racing first calls share a single service instance."""
+        barrier = threading.Barrier(8)
+        services = []
+
+        def build(**kwargs):
+            time.sleep(0.01)  # widen the window for a racing second build
+            return DocumentSearchService(vector_service=_vector_service())
+
+        def run():
+            barrier.wait()
+            services.append(search_service.get_document_search_service())
+
+        with patch.object(search_service, "_global_search_service", None), \
+                patch.object(search_service, "SemanticQueryCache"), \
+                patch.object(search_service, "DocumentSearchService", side_effect=build) as factory:
+            threads = [threading.Thread(target=run) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        factory.assert_called_once()
+        assert len({id(service) for service in services}) == 1
@@ -323,7 +323,66 @@ class TestQuizzes:
         
         assert result["correct"] == 2
         assert result["total"] == 4
-        
+
+    def test_submit_quiz_grading_is_case_insensitive(self):
+        """Test grading ignores case and surrounding whitespace"""
+        quiz = {
+            "id": "quiz_grading",
+            "topic": "Grading",
+            "questions": [
+                {"id": 1, "type": "multiple_choice", "question": "Q1", "correct_answer": "B"},
+                {"id": 2, "type": "true_false", "question": "Q2", "correct_answer": "True"},
+                {"id": 3, "type": "short_answer", "question": "Q3", "correct_answer": "Photosynthesis"},
+                {"id": 4, "type": "multiple_choice", "question": "Q4", "correct_answer": "C"}
+            ]
+        }
+        answers = [
+            {"question_id": 1, "answer": "b"},
+            {"question_id": 2, "answer": " TRUE "},
+            {"question_id": 3, "answer": "photo"},
+            {"question_id": 4, "answer": "A"}
+        ]
+
+        response = client.post(
+            "/v1/learning/quizzes/submit",
+            json={"quiz": quiz, "answers": answers, "time_taken": 10}
+        )
+
+        assert response.status_code == 200
+        result = response.json()
+        assert result["correct"] == 3
+        assert [d["is_correct"] for d in result["details"]] == [True, True, True, False]
+        assert result["details"][1]["user_answer"] == " TRUE "
+
+    def test_submit_quiz_matches_ids_of_either_type(self):
+        """Test answers match by id whether ids are ints or strings"""
+        int_quiz = {"questions": [
+            {"id": 1, "type": "multiple_choice", "correct_answer": "A"},
+            {"id": 2, "type": "multiple_choice", "correct_answer": "B"}
+        ]}
+        str_quiz = {"questions": [
+            {"id": "q1", "type": "multiple_choice", "correct_answer": "A"},
+            {"question_id": "q2", "type": "multiple_choice", "correct_answer": "B"}
+        ]}
+
+        int_result = client.post(
+            "/v1/learning/quizzes/submit",
+            json={"quiz": int_quiz, "answers": [
+                {"question_id": "1", "answer": "A"}, {"question_id": 2, "answer": "B"}
+            ], "time_taken": 5}
+        ).json()
+        str_result = client.post(
+            "/v1/learning/quizzes/submit",
+            json={"quiz": str_quiz, "answers": [
+                {"question_id": "q1", "answer": "A"}, {"question_id": "q2", "answer": "B"}
+            ], "time_taken": 5}
+        ).json()
+
+        assert int_result["correct"] == 2
+        assert [d["question_id"] for d in int_result["details"]] == ["1", "2"]
+        assert str_result["correct"] == 2
+        assert [d["question_id"] for d in str_result["details"]] == ["q1", "q2"]
+
     def test_quiz_performance(self):
         """Test quiz generation performance"""
         start_time = time.time()
@@ -375,7 +434,17 @@ class TestNotes:
         assert "created_at" in data
         
         return data["note_id"]
-        
+
+    def test_create_note_invalid_color(self):
+        """Test that colors must be #rrggbb hex strings"""
+        for color in ["#abc", "667eea", "#66zzea", "#667eea\n"]:
+            response = client.post(
+                "/v1/learning/notes",
+                json={"title": "Bad Color", "content": "content", "color": color}
+            )
+
+            assert response.status_code == 422
+
     def test_list_notes(self):
         """Test listing all notes"""
         # Create a note first
@@ -505,7 +574,34 @@ class TestNotes:
         assert response.status_code == 200
         data = response.json()
         assert len(data) >= 1
-        
+
+    def test_search_index_matches_substrings(self, tmp_path):
+        """Test indexed search keeps substring semantics and tracks edits"""
+        from src.notes import NoteManager
+
+        manager = NoteManager(storage_path=str(tmp_path))
+        plants = manager.create_note("Plants", "Photosynthesis makes sugar.")
+        cells = manager.create_note("Cells", "The mitochondria is the powerhouse.")
+
+        def search(query):
+            return {n.note_id for n in manager.search_notes(query)}
+
+        assert search("photo") == {plants.note_id}
+        assert search("SIS MAKES su") == {plants.note_id}
+        assert search("makes the") == set()
+        assert search(".") == {plants.note_id, cells.note_id}
+
+        manager.update_note(cells.note_id, content="Chloroplasts do photosynthesis.")
+        assert search("photo") == {plants.note_id, cells.note_id}
+        assert search("mitochondria") == set()
+
+        manager.delete_note(plants.note_id)
+        assert search("photo") == {cells.note_id}
+        assert search("sugar") == set()
+
+        reloaded = NoteManager(storage_path=str(tmp_path))
+        assert {n.note_id for n in reloaded.search_notes("chloro")} == {cells.note_id}
+
     def test_pin_note(self):
         """Test pinning a note"""
         # Create note
@@ -558,7 +654,31 @@ class TestProgress:
         data = response.json()
         
         assert isinstance(data, list)
-        
+
+    def test_recent_achievements_newest_first(self, tmp_path):
+        """Test achievements loaded out of order come back newest first"""
+        from src.progress import ProgressTracker
+
+        def achievement(achievement_id, earned_at):
+            return {
+                "achievement_id": achievement_id, "title": achievement_id,
+                "description": "", "icon": "", "earned_at": earned_at, "category": "notes"
+            }
+
+        (tmp_path / "progress.json").write_text(json.dumps({
+            "student_id": "default",
+            "achievements": [
+                achievement("b", "2025-01-02T00:00:00"),
+                achievement("c", "2025-01-03T00:00:00"),
+                achievement("a", "2025-01-01T00:00:00")
+            ]
+        }))
+        tracker = ProgressTracker(storage_path=str(tmp_path))
+
+        assert [a.achievement_id for a in tracker.get_recent_achievements()] == ["c", "b", "a"]
+        assert [a.achievement_id for a in tracker.get_recent_achievements(2)] == ["c", "b"]
+        assert tracker.get_progress_summary()["achievements"]["recent"] == ["c", "b", "a"]
+
     def test_quiz_records_progress(self):
         """Test that completing quiz updates progress"""
         # Get initial progress
@@ -4,6 +4,7 @@ Tests for middleware and cost accounting functionality.
 Tests structured logging, cost calculations, and cost API endpoints.
 """
 
+import asyncio
 import json
 import pytest
 from unittest.mock import Mock, patch, MagicMock
@@ -224,6 +225,144 @@ class TestCostTrackingMiddleware:
         assert summary["models_used"]["gpt-4o"] == 1
         assert summary["cost_by_model"]["gpt-4o-mini"] == pytest.approx(0.004725, abs=1e-6)
         assert summary["cost_by_model"]["gpt-4o"] == pytest.approx(0.015, abs=1e-6)
+    
+    @pytest.fixture
+    def keep_app_instance(self, monkeypatch):
+        """Restore the app's middleware as the global instance afterwards."""
+        import src.infra.middleware as middleware_module
+        monkeypatch.setattr(middleware_module, "_middleware_instance",
+                            middleware_module._middleware_instance)
+    
+    @pytest.mark.asyncio
+    async def test_non_http_scope_passes_through(self, keep_app_instance):
+        """Test that lifespan/websocket scopes are handed to the app untouched."""
+        calls = []
+        
+        async def inner_app(scope, receive, send):
+            calls.append(scope)
+        
+        middleware = CostTrackingMiddleware(inner_app)
+        scope = {"type": "lifespan"}
+        await middleware(scope, None, None)
+        
+        assert calls == [{"type": "lifespan"}]
+        assert len(middleware.recent_requests) == 0
+    
+    @pytest.mark.asyncio
+    async def test_asgi_send_wrapper_injects_headers(self, keep_app_instance):
+        """Test headers and cost are added on http.response.start."""
+        async def inner_app(scope, receive, send):
+            # Handlers record usage through request.state (scope["state"])
+            scope["state"]["llm_metrics"] = {
+                "model": "gpt-4o-mini", "tokens_in": 1000, "tokens_out": 500
+            }
+            await send({"type": "http.response.start", "status": 201,
+                        "headers": [(b"content-type", b"text/plain")]})
+            await send({"type": "http.response.body", "body": b"ok"})
+        
+        sent = []
+        
+        async def send(message):
+            sent.append(message)
+        
+        middleware = CostTrackingMiddleware(inner_app)
+        scope = {"type": "http", "path": "/v1/chat", "method": "POST", "headers": []}
+        await middleware(scope, None, send)
+        
+        headers = dict(sent[0]["headers"])
+        request_id = scope["state"]["request_id"]
+        assert headers[b"content-type"] == b"text/plain"
+        assert headers[b"x-request-id"] == request_id.encode()
+        assert float(headers[b"x-cost-usd"]) == calculate_cost("gpt-4o-mini", 1000, 500)
+        
+        metrics = middleware.recent_requests[-1]
+        assert metrics.request_id == request_id
+        assert metrics.status_code == 201
+        assert metrics.model == "gpt-4o-mini"
+        
+        await self._stop_log_worker(middleware)
+    
+    @pytest.mark.asyncio
+    async def test_request_logs_emitted_in_background_batches(self, keep_app_instance):
+        """Test request logs are queued and emitted in the background, one record each."""
+        middleware = CostTrackingMiddleware(Mock())
+        
+        with patch.object(middleware.logger, "info") as mock_info:
+            for i in range(3):
+                middleware._log_request_metrics(RequestMetrics(
+                    request_id=f"test-{i}", path="/test", method="GET",
+                    status_code=200, latency_ms=1.0
+                ))
+            
+            # Nothing is serialized or logged on the request path
+            mock_info.assert_not_called()
+            
+            await asyncio.sleep(0)
+            await self._stop_log_worker(middleware)
+        
+        records = [json.loads(call.args[0]) for call in mock_info.call_args_list]
+        assert [record["request_id"] for record in records] == ["test-0", "test-1", "test-2"]
+    
+    @pytest.mark.asyncio
+    async def test_full_log_queue_drops_oldest(self, keep_app_instance):
+        """Test a full log queue drops its oldest entry instead of blocking."""
+        middleware = CostTrackingMiddleware(Mock())
+        
+        with patch("src.infra.middleware.LOG_QUEUE_SIZE", 2), \
+                patch.object(middleware.logger, "info") as mock_info:
+            for i in range(3):
+                middleware._log_request_metrics(RequestMetrics(
+                    request_id=f"test-{i}", path="/test", method="GET",
+                    status_code=200, latency_ms=1.0
+                ))
+            await asyncio.sleep(0)
+            await self._stop_log_worker(middleware)
+        
+        records = [json.loads(call.args[0]) for call in mock_info.call_args_list]
+        assert [record["request_id"] for record in records] == ["test-1", "test-2"]
+    
+    @pytest.mark.asyncio
+    async def test_request_logs_carry_their_own_trace_id(self, keep_app_instance):
+        """Test background request logs are stamped with their request's trace ID."""
+        from src.logging_config import TraceIdFilter, trace_id_var
+        
+        async def inner_app(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+        
+        async def send(message):
+            pass
+        
+        middleware = CostTrackingMiddleware(inner_app)
+        stream = StringIO()
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(logging.Formatter("%(trace_id)s %(message)s"))
+        handler.addFilter(TraceIdFilter())
+        previous_level = middleware.logger.level
+        middleware.logger.addHandler(handler)
+        middleware.logger.setLevel(logging.INFO)
+        try:
+            # The worker is started by the first request
+            for trace_id in ["trace-1", "trace-2"]:
+                token = trace_id_var.set(trace_id)
+                try:
+                    await middleware({"type": "http", "path": "/test", "method": "GET", "headers": []}, None, send)
+                finally:
+                    trace_id_var.reset(token)
+            await asyncio.sleep(0)
+            await self._stop_log_worker(middleware)
+        finally:
+            middleware.logger.removeHandler(handler)
+            middleware.logger.setLevel(previous_level)
+        
+        lines = stream.getvalue().splitlines()
+        assert [line.split(" ", 1)[0] for line in lines] == ["trace-1", "trace-2"]
+        assert all(json.loads(line.split(" ", 1)[1])["event"] == "request_completed" for line in lines)
+    
+    @staticmethod
+    async def _stop_log_worker(middleware):
+        """Cancel the background log worker, letting it flush its queue."""
+        middleware._log_worker_task.cancel()
+        await asyncio.gather(middleware._log_worker_task, return_exceptions=True)
 
 
 class TestMiddlewareIntegration:
@@ -235,20 +374,85 @@ class TestMiddlewareIntegration:
     
     def test_middleware_adds_headers(self):
         """Test that middleware adds request ID and cost headers."""
-        response = self.client.get("/health")
+        response = self.client.get("/v1/costs/health")
         
         assert response.status_code == 200
         assert "X-Request-ID" in response.headers
         assert "X-Cost-USD" in response.headers
         
-        # Health endpoint should have zero cost
+        # Non-LLM endpoint should have zero cost
         assert response.headers["X-Cost-USD"] == "0.0"
         
-        # Request ID should be a valid UUID format
+        # Request ID should be 128 random bits as hex
         request_id = response.headers["X-Request-ID"]
-        assert len(request_id) == 36  # UUID format
-        assert request_id.count("-") == 4
-    
+        assert len(request_id) == 32
+        int(request_id, 16)
+
+    def test_health_probe_bypasses_tracking(self):
+        """Test that /health skips request tracking middleware."""
+        from src.infra.middleware import get_middleware_instance
+
+        before = len(get_middleware_instance().recent_requests)
+        response = self.client.get("/health")
+
+        assert response.status_code == 200
+        assert "X-Request-ID" not in response.headers
+        assert "X-Trace-ID" not in response.headers
+        assert len(get_middleware_instance().recent_requests) == before
+
+    def test_trace_ids_are_unique_hex(self):
+        """Test that each request gets its own 32-hex-char trace ID."""
+        trace_ids = [self.client.get("/v1/costs/health").headers["X-Trace-ID"] for _ in range(5)]
+
+        assert len(set(trace_ids)) == 5
+        for trace_id in trace_ids:
+            assert len(trace_id) == 32
+            int(trace_id, 16)
+
+    def test_request_logs_carry_trace_id(self):
+        """Test that records logged during a request are stamped with its trace ID."""
+        from src.logging_config import TraceIdFilter, trace_id_var
+
+        app_logger = logging.getLogger("src.app.app")
+        stream = StringIO()
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(logging.Formatter("%(trace_id)s %(message)s"))
+        handler.addFilter(TraceIdFilter())
+        previous_level = app_logger.level
+        app_logger.addHandler(handler)
+        app_logger.setLevel(logging.INFO)
+        try:
+            response = self.client.get("/v1/costs/health")
+        finally:
+            app_logger.removeHandler(handler)
+            app_logger.setLevel(previous_level)
+
+        trace_id = response.headers["X-Trace-ID"]
+        lines = stream.getvalue().splitlines()
+        assert len(lines) == 2
+        assert all(line.startswith(trace_id + " ") for line in lines)
+
+        # The request log lines themselves are JSON objects
+        start, end = (json.loads(line.split(" ", 1)[1]) for line in lines)
+        assert start["evt"] == "req_start"
+        assert end["evt"] == "req_end"
+        assert end["path"] == "/v1/costs/health"
+        assert end["status"] == 200
+        assert end["trace_id"] == trace_id
+        # The context var is reset once the request is done
+        assert trace_id_var.get() == "-"
+
+    def test_ui_page_revalidates_with_etag(self):
+        """Test that the UI page sends an ETag and answers 304 when it matches."""
+        first = self.client.get("/")
+        assert first.status_code == 200
+        etag = first.headers["ETag"]
+
+        second = self.client.get("/", headers={"If-None-Match": etag})
+        assert second.status_code == 304
+        assert second.headers["ETag"] == etag
+        assert second.content == b""
+
     @patch("src.api.chat_router.create_provider")
     def test_middleware_captures_llm_metrics(self, mock_create_provider):
         """Test that middleware captures LLM metrics from chat endpoint."""
@@ -286,7 +490,7 @@ class TestMiddlewareIntegration:
     @patch("src.infra.middleware.CostTrackingMiddleware._log_request_metrics")
     def test_structured_logging(self, mock_log_metrics):
         """Test that structured logging is called."""
-        response = self.client.get("/health")
+        response = self.client.get("/v1/costs/health")
         assert response.status_code == 200
         
         # Verify logging was called
@@ -297,7 +501,7 @@ class TestMiddlewareIntegration:
         metrics = call_args[0]
         
         assert isinstance(metrics, RequestMetrics)
-        assert metrics.path == "/health"
+        assert metrics.path == "/v1/costs/health"
         assert metrics.method == "GET"
         assert metrics.status_code == 200
         assert metrics.latency_ms > 0
@@ -305,7 +509,7 @@ class TestMiddlewareIntegration:
     def test_json_log_structure(self, caplog):
         """Test the structure of JSON logs."""
         with caplog.at_level(logging.INFO):
-            response = self.client.get("/health")
+            response = self.client.get("/v1/costs/health")
             assert response.status_code == 200
         
         # Find the request completion log
@@ -325,7 +529,7 @@ class TestMiddlewareIntegration:
             assert field in log_data
         
         assert log_data["event"] == "request_completed"
-        assert log_data["path"] == "/health"
+        assert log_data["path"] == "/v1/costs/health"
         assert log_data["method"] == "GET"
         assert log_data["status"] == 200
         assert log_data["latency_ms"] >= 0
@@ -371,6 +575,61 @@ class TestMiddlewareIntegration:
         assert log_data["cost_usd"] > 0
 
 
+class TestLoggingSetup:
+    """Test that setup_logging stamps application records with the trace ID."""
+    
+    @pytest.fixture
+    def restore_app_loggers(self):
+        """Restore the handlers and levels setup_logging replaces."""
+        from src.logging_config import APP_LOGGER_NAMESPACES
+        
+        loggers = [logging.getLogger(namespace) for namespace in APP_LOGGER_NAMESPACES]
+        saved = [(list(logger.handlers), logger.level) for logger in loggers]
+        yield
+        for logger, (handlers, level) in zip(loggers, saved):
+            for handler in logger.handlers:
+                if handler not in handlers:
+                    handler.close()
+            logger.handlers[:] = handlers
+            logger.setLevel(level)
+    
+    def test_app_module_records_carry_trace_id(self, tmp_path, restore_app_loggers):
+        """Test records from src.* module loggers reach the handlers with their trace ID."""
+        from src.logging_config import setup_logging, trace_id_var
+        
+        setup_logging(log_dir=str(tmp_path), enable_console=False)
+        token = trace_id_var.set("abc123")
+        try:
+            logging.getLogger("src.app.app").error("Request failed - GET /x Error: boom")
+            logging.getLogger("src.infra.middleware").warning("request_completed")
+        finally:
+            trace_id_var.reset(token)
+        
+        lines = (tmp_path / "app.log").read_text().splitlines()
+        assert len(lines) == 3  # Including setup_logging's own record
+        assert all(line.endswith(f"- [abc123] {message}") for line, message in zip(
+            lines[1:], ["Request failed - GET /x Error: boom", "request_completed"]
+        ))
+        assert (tmp_path / "error.log").read_text().count("[abc123]") == 1
+    
+    def test_json_records_carry_trace_id(self, tmp_path, restore_app_loggers):
+        """Test JSON log records from src.* module loggers include the trace ID."""
+        from src.logging_config import setup_logging, trace_id_var
+        
+        setup_logging(log_dir=str(tmp_path), enable_console=False, json_format=True)
+        token = trace_id_var.set("abc123")
+        try:
+            logging.getLogger("src.app.app").info("request")
+        finally:
+            trace_id_var.reset(token)
+        logging.getLogger("src.app.app").info("outside a request")
+        
+        records = [json.loads(line) for line in (tmp_path / "app.log").read_text().splitlines()]
+        assert [(r["logger"], r["trace_id"]) for r in records[1:]] == [
+            ("src.app.app", "abc123"), ("src.app.app", "-")
+        ]
+
+
 class TestCostAPI:
     """Test the cost tracking API endpoints."""
     
@@ -0,0 +1,175 @@
+"""
+Tests for the podcast agent.
+
+Tests streaming TTS audio generation and script chunking.
+"""
+
+import asyncio
+from datetime import datetime
+from unittest.mock import Mock, patch
+
+import pytest
+
+from src.agents.podcast_agent import PodcastAgent, split_script
+
+
+class _FakeStreamingResponse:
+    """Stand-in for an AsyncOpenAI streamed speech response."""
+
+    def __init__(self, pieces, error=None, delay=0.0):
+        self.pieces = pieces
+        self.error = error
+        self.delay = delay
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def iter_bytes(self, chunk_size):
+        for piece in self.pieces:
+            # Yield to the event loop so concurrent chunks interleave
+            await asyncio.sleep(self.delay)
+            yield piece
+        if self.error:
+            raise self.error
+
+
+class _FakeSpeech:
+    """
+    Stand-in for ``client.audio.speech.with_streaming_response``.
+
+    Each input text is streamed back as its encoded bytes, two pieces at
+    a time; inputs listed in ``failing`` raise after their first piece,
+    and inputs listed in ``slow`` arrive after all the others.
+    """
+
+    def __init__(self, failing=(), slow=()):
+        self.failing = set(failing)
+        self.slow = set(slow)
+        self.inputs = []
+
+    def create(self, model, voice, input, response_format):
+        self.inputs.append(input)
+        data = input.encode()
+        pieces = [data[:len(data) // 2], data[len(data) // 2:]]
+        if input in self.failing:
+            return _FakeStreamingResponse(pieces[:1], error=RuntimeError("TTS failed"))
+        return _FakeStreamingResponse(pieces, delay=0.05 if input in self.slow else 0.0)
+
+
+def _agent(speech: _FakeSpeech) -> PodcastAgent:
+    """Build a PodcastAgent whose async client streams from ``speech``."""
+    agent = PodcastAgent.__new__(PodcastAgent)
+    agent.async_openai_client = Mock()
+    agent.async_openai_client.audio.speech.with_streaming_response = speech
+    return agent
+
+
+@pytest.mark.unit
+class TestStreamingAudio:
+    """Test PodcastAgent._agenerate_audio."""
+
+    @pytest.mark.asyncio
+    async def test_generations_in_the_same_second_get_their_own_files(self, tmp_path, monkeypatch):
+        """Test concurrent generations never share an output or partial file."""
+        monkeypatch.chdir(tmp_path)
+        agent = _agent(_FakeSpeech())
+
+        with patch("src.agents.podcast_agent.datetime") as mock_datetime:
+            mock_datetime.now.return_value = datetime(2025, 1, 13, 14, 20, 30)
+            paths = await asyncio.gather(
+                agent._agenerate_audio("first script", "nova", "mp3"),
+                agent._agenerate_audio("second script", "nova", "mp3"),
+            )
+
+        assert None not in paths
+        assert len(set(paths)) == 2
+        assert [open(path, "rb").read() for path in paths] == [b"first script", b"second script"]
+        assert not list((tmp_path / "podcasts").glob("*.part"))
+
+    @pytest.mark.asyncio
+    async def test_chunks_are_written_in_script_order(self, tmp_path, monkeypatch):
+        """Test chunk audio is joined in script order, not arrival order."""
+        monkeypatch.chdir(tmp_path)
+        chunks = ["alpha " * 5, "bravo " * 5, "charlie " * 5]
+        # The first chunk's audio arrives last
+        speech = _FakeSpeech(slow={chunks[0]})
+        agent = _agent(speech)
+
+        with patch("src.agents.podcast_agent.split_script", lambda text: chunks):
+            path = await agent._agenerate_audio("\n\n".join(chunks), "nova", "mp3")
+
+        assert speech.inputs == chunks
+        assert open(path, "rb").read() == "".join(chunks).encode()
+        assert not list((tmp_path / "podcasts").glob("*.part"))
+
+    @pytest.mark.asyncio
+    async def test_failing_chunk_leaves_no_files(self, tmp_path, monkeypatch):
+        """Test a chunk failing part-way leaves neither a partial nor a final file."""
+        monkeypatch.chdir(tmp_path)
+        first, second = "a" * 30, "b" * 30
+        agent = _agent(_FakeSpeech(failing={second}))
+
+        with patch("src.agents.podcast_agent.split_script", lambda text: [first, second]):
+            path = await agent._agenerate_audio(f"{first}\n\n{second}", "nova", "mp3")
+
+        assert path is None
+        assert list((tmp_path / "podcasts").iterdir()) == []
+
+    @pytest.mark.asyncio
+    async def test_unconcatenable_format_is_one_request(self, tmp_path, monkeypatch):
+        """Test formats that cannot be joined by bytes are never split."""
+        monkeypatch.chdir(tmp_path)
+        speech = _FakeSpeech()
+        agent = _agent(speech)
+        script = "\n\n".join(["x" * 3000, "y" * 3000])
+
+        path = await agent._agenerate_audio(script, "nova", "flac")
+
+        assert speech.inputs == [script]
+        assert path.endswith(".flac")
+
+    @pytest.mark.asyncio
+    async def test_without_client_returns_none(self):
+        """Test audio generation is skipped without an async client."""
+        agent = PodcastAgent.__new__(PodcastAgent)
+        agent.async_openai_client = None
+
+        assert await agent._agenerate_audio("script", "nova", "mp3") is None
+
+
+@pytest.mark.unit
+class TestSplitScript:
+    """Test split_script."""
+
+    def test_short_script_is_one_chunk(self):
+        """Test a script under the limit is returned whole."""
+        assert split_script("Hello there.\n\nGoodbye.") == ["Hello there.\n\nGoodbye."]
+
+    def test_paragraphs_are_packed_up_to_the_limit(self):
+        """Test paragraphs are packed greedily and never exceed max_chars."""
+        paragraphs = ["a" * 10, "b" * 10, "c" * 10]
+
+        chunks = split_script("\n\n".join(paragraphs), max_chars=25)
+
+        assert chunks == ["a" * 10 + "\n\n" + "b" * 10, "c" * 10]
+
+    def test_long_paragraph_is_cut_at_spaces(self):
+        """Test an oversized paragraph is cut at the last space before the limit."""
+        chunks = split_script("one two three four five", max_chars=10)
+
+        assert chunks == ["one two", "three", "four five"]
+        assert all(len(chunk) <= 10 for chunk in chunks)
+
+    def test_long_word_is_cut_at_the_limit(self):
+        """Test a word longer than max_chars is cut mid-word."""
+        chunks = split_script("x" * 25, max_chars=10)
+
+        assert chunks == ["x" * 10, "x" * 10, "x" * 5]
+
+    def test_empty_script(self):
+        """Test empty and blank scripts still yield one chunk."""
+        assert split_script("") == [""]
+        assert split_script("\n\n  \n\n") == ["\n\n  \n\n"]
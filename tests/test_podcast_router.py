@@ -0,0 +1,138 @@
+"""
+Tests for the podcast API router.
+
+Tests podcast download revalidation, listing and deletion against a
+temporary podcasts directory.
+"""
+
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.app.app import app
+from src.api import podcast_router
+
+
+# Test client
+client = TestClient(app)
+
+
+@pytest.fixture
+def podcast_dir(tmp_path, monkeypatch):
+    """Point the router at an empty podcasts directory with a cold list cache."""
+    monkeypatch.setattr(podcast_router, "_PODCAST_DIR", tmp_path)
+    monkeypatch.setattr(podcast_router, "_podcast_list_cache", {"mtime": -1, "payload": []})
+    return tmp_path
+
+
+def _bump_mtime(path) -> None:
+    """Advance a directory's mtime; filesystem timestamps can be coarser than the test."""
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+class TestPodcastDownload:
+    """Test GET /v1/podcasts/download/{filename}."""
+
+    def test_download_sends_etag_and_revalidates(self, podcast_dir):
+        """Test that a download carries an ETag and a matching one gets 304."""
+        (podcast_dir / "podcast_1.mp3").write_bytes(b"audio")
+
+        first = client.get("/v1/podcasts/download/podcast_1.mp3")
+        assert first.status_code == 200
+        assert first.content == b"audio"
+        assert first.headers["Cache-Control"] == podcast_router.PODCAST_CACHE_CONTROL
+        etag = first.headers["ETag"]
+
+        second = client.get("/v1/podcasts/download/podcast_1.mp3", headers={"If-None-Match": etag})
+        assert second.status_code == 304
+        assert second.content == b""
+        assert second.headers["ETag"] == etag
+
+    @pytest.mark.parametrize("if_none_match", ['"stale", W/{etag}', "*", " {etag} "])
+    def test_if_none_match_lists_weak_tags_and_wildcard(self, podcast_dir, if_none_match):
+        """Test that lists, W/ prefixes and * in If-None-Match all match."""
+        (podcast_dir / "podcast_1.mp3").write_bytes(b"audio")
+        etag = client.get("/v1/podcasts/download/podcast_1.mp3").headers["ETag"]
+
+        response = client.get(
+            "/v1/podcasts/download/podcast_1.mp3",
+            headers={"If-None-Match": if_none_match.format(etag=etag)}
+        )
+
+        assert response.status_code == 304
+
+    def test_non_matching_etag_sends_the_file(self, podcast_dir):
+        """Test that a stale ETag gets the full file again."""
+        (podcast_dir / "podcast_1.mp3").write_bytes(b"audio")
+
+        response = client.get("/v1/podcasts/download/podcast_1.mp3", headers={"If-None-Match": '"stale"'})
+
+        assert response.status_code == 200
+        assert response.content == b"audio"
+
+    def test_missing_file_is_404(self, podcast_dir):
+        """Test that downloading an unknown podcast is a 404."""
+        response = client.get("/v1/podcasts/download/missing.mp3")
+
+        assert response.status_code == 404
+
+
+class TestPodcastList:
+    """Test GET /v1/podcasts/list."""
+
+    def test_list_refreshes_after_a_file_is_added(self, podcast_dir):
+        """Test that the cached list is rebuilt once the directory changes."""
+        (podcast_dir / "podcast_1.mp3").write_bytes(b"audio")
+        (podcast_dir / "notes.txt").write_text("not audio")
+
+        first = client.get("/v1/podcasts/list")
+        assert [p["podcast_id"] for p in first.json()] == ["podcast_1"]
+
+        (podcast_dir / "podcast_2.opus").write_bytes(b"audio")
+        _bump_mtime(podcast_dir)
+
+        second = client.get("/v1/podcasts/list")
+        assert sorted(p["podcast_id"] for p in second.json()) == ["podcast_1", "podcast_2"]
+
+    def test_unchanged_directory_is_not_rescanned(self, podcast_dir, monkeypatch):
+        """Test that the list is served from cache while the mtime is unchanged."""
+        (podcast_dir / "podcast_1.mp3").write_bytes(b"audio")
+        client.get("/v1/podcasts/list")
+
+        def fail_scan(path):
+            raise AssertionError("directory rescanned")
+
+        monkeypatch.setattr(podcast_router, "_scan_podcasts", fail_scan)
+        response = client.get("/v1/podcasts/list")
+
+        assert [p["podcast_id"] for p in response.json()] == ["podcast_1"]
+
+    def test_missing_directory_is_empty(self, podcast_dir, monkeypatch):
+        """Test that a missing podcasts directory lists nothing."""
+        monkeypatch.setattr(podcast_router, "_PODCAST_DIR", podcast_dir / "missing")
+
+        assert client.get("/v1/podcasts/list").json() == []
+
+
+class TestPodcastDelete:
+    """Test DELETE /v1/podcasts/{podcast_id}."""
+
+    def test_delete_removes_the_file(self, podcast_dir):
+        """Test that deleting a podcast removes its audio file."""
+        (podcast_dir / "podcast_1.aac").write_bytes(b"audio")
+
+        response = client.delete("/v1/podcasts/podcast_1")
+
+        assert response.status_code == 200
+        assert not (podcast_dir / "podcast_1.aac").exists()
+
+    def test_delete_unknown_podcast_is_404(self, podcast_dir):
+        """Test that deleting a podcast with no audio file is a 404."""
+        (podcast_dir / "podcast_1.txt").write_text("not audio")
+
+        response = client.delete("/v1/podcasts/podcast_1")
+
+        assert response.status_code == 404
+        assert (podcast_dir / "podcast_1.txt").exists()
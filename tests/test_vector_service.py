@@ -0,0 +1,901 @@
+"""
+Unit tests for the vector database service.
+
+Tests VectorDatabaseService search against a mocked ChromaDB collection and
+embedding model.
+"""
+
+import functools
+import itertools
+import threading
+import uuid
+from collections import OrderedDict
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from unittest.mock import Mock, patch
+
+from src.documents.embedding_cache import EmbeddingCache
+from src.documents.quantization import dequantize_int8, dot_int8, quantize_int8, score_int8
+from src.documents.query_cache import QueryCache
+from src.documents.vector_service import (
+    GPU_ENCODE_BATCH_SIZE,
+    ONNX_QUANTIZED_FILE,
+    QUERY_ENCODE_BATCH_SIZE,
+    DocumentChunker,
+    VectorDatabaseService,
+    _random_uuids,
+    _topk_dot,
+)
+
+
+def _encode(texts, normalize_embeddings=False, **kwargs) -> np.ndarray:
+    """Stand-in for SentenceTransformer.encode with length-based embeddings."""
+    embeddings = np.array([[float(len(text)), 1.0, 0.0] for text in texts])
+    if normalize_embeddings:
+        embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings
+
+
+def _service(query_result=None) -> VectorDatabaseService:
+    """Build a VectorDatabaseService around a mocked collection and model."""
+    service = VectorDatabaseService.__new__(VectorDatabaseService)
+    service.embedding_model_name = "test-model"
+    service.embedding_model = Mock()
+    service.embedding_model.encode.side_effect = _encode
+    service.embedding_dimension = 3
+    service.quantize_embeddings = False
+    service.encode_batch_size = 32
+    service.encode_workers = 1
+    service.embedding_device = "cpu"
+    service._encode_pool = None
+    service._static_encoder = None
+    service.rerank_multiplier = None
+    service.db_path = "unused-db-path"
+    service._binary_index = None
+    service._chunk_vectors = OrderedDict()
+    service._chunk_vectors_lock = threading.Lock()
+    service._embed_query_cached = functools.lru_cache(maxsize=16)(service._embed_query_uncached)
+    service.query_cache = QueryCache()
+    service._invalidation_callbacks = []
+    service.embedding_cache = EmbeddingCache(":memory:", "test-model")
+    service.collection = Mock()
+    service.collection.query.return_value = query_result
+    return service
+
+
+def _metadata(document_id: str) -> dict:
+    """Chunk metadata as stored by add_document_chunks."""
+    return {
+        "document_id": document_id,
+        "document_title": f"Title {document_id}",
+        "chunk_type": "text",
+        "page_number": 1,
+        "chapter_id": "",
+    }
+
+
+@pytest.mark.unit
+class TestEmbeddingModelInit:
+    """Test VectorDatabaseService._init_embedding_model."""
+
+    def _uninitialized(self, backend: str, tmp_path) -> VectorDatabaseService:
+        """Build a service with only the attributes the model loader reads."""
+        service = VectorDatabaseService.__new__(VectorDatabaseService)
+        service.db_path = str(tmp_path)
+        service.embedding_model_name = "org/test-model"
+        service.embedding_backend = backend
+        service.compile_encoder = False
+        return service
+
+    @patch("src.documents.vector_service.SentenceTransformer")
+    def test_onnx_backend_loads_cached_export(self, mock_model_class, tmp_path):
+        """Test that an existing quantized export is loaded without re-exporting."""
+        mock_model_class.return_value.encode.return_value = np.zeros((1, 3))
+        cache_dir = tmp_path / "onnx_cache" / "org--test-model"
+        (cache_dir / "onnx").mkdir(parents=True)
+        (cache_dir / ONNX_QUANTIZED_FILE).write_bytes(b"")
+        service = self._uninitialized("onnx", tmp_path)
+
+        with patch.dict("sys.modules", {"sentence_transformers": Mock()}):
+            service._init_embedding_model()
+
+        mock_model_class.assert_called_once_with(
+            str(cache_dir), backend="onnx", model_kwargs={"file_name": ONNX_QUANTIZED_FILE}
+        )
+        assert service.embedding_dimension == 3
+
+    @patch("src.documents.vector_service._select_device", return_value="cpu")
+    @patch("src.documents.vector_service.SentenceTransformer")
+    def test_onnx_failure_falls_back_to_torch(self, mock_model_class, _, tmp_path):
+        """Test that a failing ONNX load falls back to the PyTorch model."""
+        mock_model_class.return_value.encode.return_value = np.zeros((1, 3))
+        service = self._uninitialized("onnx", tmp_path)
+
+        with patch.object(VectorDatabaseService, "_load_onnx_model", side_effect=ImportError("no optimum")):
+            service._init_embedding_model()
+
+        mock_model_class.assert_called_once_with("org/test-model", device="cpu")
+
+    @patch("src.documents.vector_service._select_device", return_value="cuda")
+    @patch("src.documents.vector_service.SentenceTransformer")
+    def test_accelerator_uses_half_precision_and_larger_batches(self, mock_model_class, _, tmp_path):
+        """Test that a GPU model is loaded on the device in FP16 with larger batches."""
+        mock_model_class.return_value.encode.return_value = np.zeros((1, 3))
+        service = self._uninitialized("torch", tmp_path)
+
+        service._init_embedding_model()
+
+        mock_model_class.assert_called_once_with("org/test-model", device="cuda")
+        mock_model_class.return_value.half.assert_called_once()
+        assert service.encode_batch_size == GPU_ENCODE_BATCH_SIZE
+
+
+@pytest.mark.unit
+class TestChromaClientInit:
+    """Test VectorDatabaseService._init_chroma_client."""
+
+    @patch("src.documents.vector_service.chromadb")
+    def test_server_host_uses_http_client(self, mock_chromadb, tmp_path, monkeypatch):
+        """Test that CHROMA_SERVER_HOST connects to a server instead of storing in-process."""
+        monkeypatch.setenv("CHROMA_SERVER_HOST", "chroma.internal")
+        monkeypatch.setenv("CHROMA_SERVER_PORT", "9000")
+        service = VectorDatabaseService.__new__(VectorDatabaseService)
+        service.db_path = str(tmp_path)
+
+        service._init_chroma_client()
+
+        assert mock_chromadb.HttpClient.call_args.kwargs["host"] == "chroma.internal"
+        assert mock_chromadb.HttpClient.call_args.kwargs["port"] == 9000
+        mock_chromadb.PersistentClient.assert_not_called()
+
+    @patch("src.documents.vector_service.chromadb")
+    def test_persistent_client_by_default(self, mock_chromadb, tmp_path, monkeypatch):
+        """Test that without a server host the collection is stored under db_path."""
+        monkeypatch.delenv("CHROMA_SERVER_HOST", raising=False)
+        service = VectorDatabaseService.__new__(VectorDatabaseService)
+        service.db_path = str(tmp_path)
+
+        service._init_chroma_client()
+
+        assert mock_chromadb.PersistentClient.call_args.kwargs["path"] == str(tmp_path)
+        mock_chromadb.HttpClient.assert_not_called()
+
+
+@pytest.mark.unit
+class TestSearchDocumentsBatch:
+    """Test VectorDatabaseService.search_documents_batch."""
+
+    @patch("src.documents.vector_service.SearchResult", SimpleNamespace)
+    def test_one_query_for_all_queries(self):
+        """Test that queries are embedded and searched together and split per row."""
+        service = _service({
+            "ids": [["c1", "c2"], ["c3"]],
+            "distances": [[0.1, 0.7], [0.2]],
+            "metadatas": [[_metadata("d1"), _metadata("d2")], [_metadata("d3")]],
+            "documents": [["one", "two"], ["three"]],
+        })
+
+        results = service.search_documents_batch(
+            ["first", "second"], n_results=2, document_ids=["d1"], similarity_threshold=0.5
+        )
+
+        assert [[r.chunk_id for r in row] for row in results] == [["c1"], ["c3"]]
+        assert results[0][0].similarity_score == pytest.approx(0.9)
+        assert results[0][0].chapter_id is None
+        service.embedding_model.encode.assert_called_once_with(
+            ["first", "second"], batch_size=QUERY_ENCODE_BATCH_SIZE, normalize_embeddings=True
+        )
+        kwargs = service.collection.query.call_args.kwargs
+        np.testing.assert_allclose(
+            kwargs["query_embeddings"],
+            [[5.0 / np.sqrt(26.0), 1.0 / np.sqrt(26.0), 0.0], [6.0 / np.sqrt(37.0), 1.0 / np.sqrt(37.0), 0.0]],
+            rtol=1e-6
+        )
+        assert kwargs["where"] == {"document_id": {"$in": ["d1"]}}
+
+    @patch("src.documents.vector_service.SearchResult", SimpleNamespace)
+    def test_returned_embeddings_are_rescored_by_dot_product(self):
+        """Test that candidate embeddings are scored by dot product, thresholded and sorted."""
+        service = _service({
+            "ids": [["c1", "c2", "c3"]],
+            "distances": [[0.0, 0.0, 0.0]],
+            "metadatas": [[_metadata("d1"), _metadata("d2"), _metadata("d3")]],
+            "documents": [["one", "two", "three"]],
+            "embeddings": [np.array([[0.0, 1.0], [1.0, 0.0], [0.6, 0.8]])],
+        })
+
+        results = service.search_documents_batch(
+            ["q"], query_embeddings=[np.array([1.0, 0.0])], similarity_threshold=0.5
+        )
+
+        assert [r.chunk_id for r in results[0]] == ["c2", "c3"]
+        assert [r.similarity_score for r in results[0]] == pytest.approx([1.0, 0.6])
+        assert "embeddings" in service.collection.query.call_args.kwargs["include"]
+
+    @patch("src.documents.vector_service.SearchResult", SimpleNamespace)
+    def test_oversampled_candidates_are_cut_to_n_results(self):
+        """Test that fetch_k widens the query and results are cut back to n_results."""
+        service = _service({
+            "ids": [["c1", "c2", "c3", "c4"]],
+            "distances": [[0.1, 0.6, 0.2, 0.3]],
+            "metadatas": [[_metadata(d) for d in ("d1", "d2", "d3", "d4")]],
+            "documents": [["one", "two", "three", "four"]],
+        })
+
+        results = service.search_documents_batch(
+            ["q"], n_results=2, similarity_threshold=0.5, fetch_k=8
+        )
+
+        assert [r.chunk_id for r in results[0]] == ["c1", "c3"]
+        assert service.collection.query.call_args.kwargs["n_results"] == 8
+
+    def test_failure_returns_empty_rows(self):
+        """Test that a failed query yields an empty result list per query."""
+        service = _service()
+        service.collection.query.side_effect = RuntimeError("db down")
+
+        assert service.search_documents_batch(["a", "b"]) == [[], []]
+
+    def test_query_embeddings_are_normalized(self):
+        """Test that query embeddings come back with unit length."""
+        service = _service()
+
+        embeddings = service.embed_queries(["abc", "de"])
+
+        assert embeddings.dtype == np.float32
+        np.testing.assert_allclose(np.linalg.norm(embeddings, axis=1), [1.0, 1.0], rtol=1e-6)
+
+    def test_search_documents_uses_given_embedding(self):
+        """Test that a precomputed embedding skips the embedding model."""
+        service = _service({"ids": [[]], "distances": [[]], "metadatas": [[]], "documents": [[]]})
+
+        assert service.search_documents("query", query_embedding=np.zeros(3)) == []
+        service.embedding_model.encode.assert_not_called()
+        assert service.collection.query.call_args.kwargs["query_embeddings"] == [[0.0, 0.0, 0.0]]
+
+    @patch("src.documents.vector_service.SearchResult", SimpleNamespace)
+    def test_iter_search_documents_yields_results(self):
+        """Test that the streaming search yields the same results as the list API."""
+        service = _service({
+            "ids": [["c1", "c2"]],
+            "distances": [[0.1, 0.2]],
+            "metadatas": [[_metadata("d1"), _metadata("d2")]],
+            "documents": [["one", "two"]],
+        })
+
+        results = service.iter_search_documents("query")
+
+        assert next(results).chunk_id == "c1"
+        assert [r.chunk_id for r in results] == ["c2"]
+
+
+@pytest.mark.unit
+class TestRerankMultiplier:
+    """Test candidate oversampling for exact re-ranking."""
+
+    @patch("src.documents.vector_service.SearchResult", SimpleNamespace)
+    def test_multiplier_oversamples_and_truncates(self):
+        """Test that extra candidates are fetched, re-ranked and cut to n_results."""
+        service = _service({
+            "ids": [["c1", "c2", "c3"]],
+            "distances": [[0.1, 0.2, 0.3]],
+            "metadatas": [[_metadata("d1"), _metadata("d2"), _metadata("d3")]],
+            "documents": [["one", "two", "three"]],
+            "embeddings": [[[0.0, 1.0, 0.0], [1.0, 0.0, 0.0], [0.6, 0.8, 0.0]]],
+        })
+        service.rerank_multiplier = 3
+
+        results = service.search_documents("abcdefghij", n_results=1, similarity_threshold=0.0)
+
+        assert service.collection.query.call_args.kwargs["n_results"] == 3
+        assert [r.chunk_id for r in results] == ["c2"]
+
+    def test_new_collections_get_hnsw_parameters(self):
+        """Test that a newly created collection is built with the tuned HNSW parameters."""
+        service = _service()
+        service.collection_name = "documents"
+        service.client = Mock()
+        service.client.get_collection.side_effect = ValueError("missing")
+
+        service._get_or_create_collection()
+
+        metadata = service.client.create_collection.call_args.kwargs["metadata"]
+        assert metadata["hnsw:space"] == "ip"
+        assert metadata["hnsw:search_ef"] >= 100
+
+
+@pytest.mark.unit
+@patch("src.documents.quantization.BINARY_EXPORT_BATCH_SIZE", 2)
+@patch("src.documents.vector_service.SearchResult", SimpleNamespace)
+class TestBinaryIndex:
+    """Test export_binary_index and search_documents_binary."""
+
+    STORED = {
+        "c1": [0.0, 1.0, 0.0],
+        "c2": [0.995, 0.0995, 0.0],
+        "c3": [-1.0, 0.0, 0.0],
+    }
+
+    def _indexed_service(self, tmp_path) -> VectorDatabaseService:
+        """Build a service whose collection holds three stored chunks."""
+        service = _service()
+        service.db_path = str(tmp_path)
+        service.collection.count.return_value = len(self.STORED)
+
+        def get(ids=None, include=None, limit=None, offset=0, **kwargs):
+            end = None if limit is None else offset + limit
+            selected = ids if ids is not None else list(self.STORED)[offset:end]
+            return {
+                "ids": selected,
+                "embeddings": [self.STORED[chunk_id] for chunk_id in selected],
+                "metadatas": [_metadata(f"d-{chunk_id}") for chunk_id in selected],
+                "documents": [f"text {chunk_id}" for chunk_id in selected],
+            }
+
+        service.collection.get.side_effect = get
+        return service
+
+    def test_binary_search_reranks_hamming_candidates(self, tmp_path):
+        """Test that Hamming candidates are re-ranked by exact similarity."""
+        service = self._indexed_service(tmp_path)
+
+        assert service.export_binary_index() == 3
+
+        results = service.search_documents_binary("abcdefghij", n_results=1, candidate_multiplier=2)
+
+        assert [r.chunk_id for r in results] == ["c2"]
+        assert results[0].similarity_score == pytest.approx(1.0, abs=1e-3)
+        service.collection.query.assert_not_called()
+
+    def test_collection_changes_drop_the_index(self, tmp_path):
+        """Test that deleting chunks removes the index and search falls back."""
+        service = self._indexed_service(tmp_path)
+        service.collection.query.return_value = {"ids": [[]], "distances": [[]], "metadatas": [[]], "documents": [[]]}
+        service.export_binary_index()
+
+        assert service.delete_document("d1")
+        service.search_documents_binary("abc")
+
+        assert not (tmp_path / "binary_index" / "ids.json").exists()
+        service.collection.query.assert_called_once()
+
+
+@pytest.mark.unit
+class TestSearchSimilarChunks:
+    """Test VectorDatabaseService.search_similar_chunks."""
+
+    @patch("src.documents.vector_service.SearchResult", SimpleNamespace)
+    def test_reference_chunk_is_excluded(self):
+        """Test that the reference chunk is dropped and at most n_results are returned."""
+        service = _service({
+            "ids": [["c2", "c1", "c3", "c4"]],
+            "distances": [[0.0, 0.1, 0.3, 0.4]],
+            "metadatas": [[_metadata("d1")] * 4],
+            "documents": [["two", "one", "three", "four"]],
+        })
+        service.collection.get.return_value = {
+            "embeddings": [[1.0, 0.0, 0.0]],
+            "metadatas": [_metadata("d1")],
+        }
+
+        results = service.search_similar_chunks("c2", n_results=2)
+
+        assert [r.chunk_id for r in results] == ["c1", "c3"]
+        assert [r.similarity_score for r in results] == pytest.approx([0.9, 0.7])
+        assert service.collection.query.call_args.kwargs["where"] == {"document_id": "d1"}
+
+    def test_added_chunks_are_served_from_memory(self):
+        """Test that a chunk added in this process needs no ChromaDB lookup."""
+        service = _service({"ids": [["c1"]], "distances": [[0.0]], "metadatas": [[_metadata("d1")]], "documents": [["abc"]]})
+        document = Mock(id="d1", title="Book", author=None, subject=None)
+        chunk = Mock(id="c1", content="abc", chunk_index=0, page_number=1, chapter_id=None, chunk_type="text")
+        service.add_document_chunks(document, [chunk])
+
+        service.search_similar_chunks("c1")
+
+        service.collection.get.assert_not_called()
+        reference = service.collection.query.call_args.kwargs["query_embeddings"][0]
+        np.testing.assert_allclose(reference, service.collection.add.call_args.kwargs["embeddings"][0])
+
+    def test_deleted_chunks_are_forgotten(self):
+        """Test that deleting a document drops its chunks from memory."""
+        service = _service()
+        service._remember_chunk_vectors(["c1"], np.ones((1, 3)), [_metadata("d1")])
+        service.collection.get.return_value = {"ids": ["c1"], "embeddings": None, "metadatas": []}
+
+        service.delete_document("d1")
+
+        assert service.search_similar_chunks("c1") == []
+        assert service.collection.get.call_args.kwargs["include"] == ["embeddings", "metadatas"]
+
+
+@pytest.mark.unit
+class TestStats:
+    """Test VectorDatabaseService.get_document_stats and get_collection_stats."""
+
+    def test_document_stats(self):
+        """Test page range, chapter count and chunk types over a document's chunks."""
+        service = _service()
+        service.collection.get.return_value = {
+            "ids": ["c1", "c2", "c3"],
+            "metadatas": [
+                dict(_metadata("d1"), page_number=4, chapter_id="ch1"),
+                dict(_metadata("d1"), page_number=None, chapter_id=""),
+                dict(_metadata("d1"), page_number=2, chapter_id="ch1", chunk_type="table"),
+            ],
+        }
+
+        stats = service.get_document_stats("d1")
+
+        assert service.collection.get.call_args.kwargs["include"] == ["metadatas"]
+        assert stats["chunk_count"] == 3
+        assert stats["page_range"] == {"min": 2, "max": 4}
+        assert stats["chapter_count"] == 1
+        assert sorted(stats["chunk_types"]) == ["table", "text"]
+
+    def test_document_stats_without_pages(self):
+        """Test that a document without page numbers has an empty page range."""
+        service = _service()
+        service.collection.get.return_value = {
+            "ids": ["c1"],
+            "metadatas": [dict(_metadata("d1"), page_number=None)],
+        }
+
+        assert service.get_document_stats("d1")["page_range"] == {"min": None, "max": None}
+
+    def test_collection_stats(self):
+        """Test unique counts over the sampled chunk metadata."""
+        service = _service()
+        service.db_path = "/tmp/chroma"
+        service.collection.count.return_value = 3
+        service.collection.get.return_value = {
+            "ids": ["c1", "c2", "c3"],
+            "metadatas": [
+                dict(_metadata("d1"), file_type="pdf", author="Ada", subject=""),
+                dict(_metadata("d1"), file_type="pdf", author="Ada", subject="Math"),
+                dict(_metadata("d2"), file_type="txt", author="", subject="Math"),
+            ],
+        }
+
+        stats = service.get_collection_stats()
+
+        assert stats["total_chunks"] == 3
+        assert stats["unique_documents"] == 2
+        assert sorted(stats["file_types"]) == ["pdf", "txt"]
+        assert stats["unique_authors"] == 1
+        assert stats["unique_subjects"] == 1
+
+
+@pytest.mark.unit
+class TestQueryCaching:
+    """Test the query cache in front of VectorDatabaseService searches."""
+
+    def _cached_service(self) -> VectorDatabaseService:
+        """Build a service whose collection returns one matching chunk."""
+        return _service({
+            "ids": [["c1"]],
+            "distances": [[0.1]],
+            "metadatas": [[_metadata("d1")]],
+            "documents": [["alpha"]],
+            "embeddings": [[[3.0, 1.0, 0.0]]],
+        })
+
+    @patch("src.documents.vector_service.SearchResult", SimpleNamespace)
+    def test_repeated_search_is_served_from_cache(self):
+        """Test that an identical search skips embedding and the collection."""
+        service = self._cached_service()
+
+        first = service.search_documents("cat", similarity_threshold=0.0)
+        second = service.search_documents("cat", similarity_threshold=0.0)
+
+        assert second == first
+        assert service.collection.query.call_count == 1
+        assert service.get_cache_stats()["hits"] == 1
+
+    @patch("src.documents.vector_service.SearchResult", SimpleNamespace)
+    def test_collection_changes_clear_cache(self):
+        """Test that adding or deleting chunks drops cached results."""
+        service = self._cached_service()
+        service.search_documents("cat", similarity_threshold=0.0)
+        service.collection.get.return_value = {"ids": ["c1"]}
+
+        assert service.delete_document("d1")
+        service.search_documents("cat", similarity_threshold=0.0)
+
+        assert service.collection.query.call_count == 2
+
+    def test_collection_changes_run_invalidation_callbacks(self):
+        """Test that registered callbacks run on delete and reset, even if one fails."""
+        service = _service()
+        service.client = Mock()
+        service.collection_name = "documents"
+        service.collection.get.return_value = {"ids": ["c1"]}
+        failing, callback = Mock(side_effect=RuntimeError("boom")), Mock()
+        service.add_invalidation_callback(failing)
+        service.add_invalidation_callback(callback)
+
+        assert service.delete_document("d1")
+        assert service.reset_collection()
+
+        assert callback.call_count == 2
+
+    @patch("src.documents.vector_service.SearchResult", SimpleNamespace)
+    def test_batch_only_embeds_cache_misses(self):
+        """Test that cached queries are dropped from the batch before encoding."""
+        service = self._cached_service()
+        cached = service.search_documents("cat", similarity_threshold=0.0)
+        service.embedding_model.encode.reset_mock()
+
+        batch = service.search_documents_batch(["cat", "horse"], similarity_threshold=0.0)
+
+        assert batch[0] == cached
+        assert service.embedding_model.encode.call_args.args[0] == ["horse"]
+        assert len(service.collection.query.call_args.kwargs["query_embeddings"]) == 1
+
+    @patch("src.documents.vector_service.SearchResult", SimpleNamespace)
+    def test_uncached_batch_bypasses_cache(self):
+        """Test that use_cache=False neither reads nor fills the query cache."""
+        service = self._cached_service()
+        service.search_documents("cat", similarity_threshold=0.0)
+
+        service.search_documents_batch(["cat", "horse"], similarity_threshold=0.0, use_cache=False)
+
+        assert service.collection.query.call_count == 2
+        assert len(service.query_cache) == 1
+
+    def test_query_embedding_reused_across_filters(self):
+        """Test that the same query with different filters is encoded once."""
+        service = _service({"ids": [[]], "distances": [[]], "metadatas": [[]], "documents": [[]]})
+
+        service.search_documents("cat", document_ids=["d1"])
+        service.search_documents("cat", document_ids=["d2"])
+
+        assert service.embedding_model.encode.call_count == 1
+        assert service.collection.query.call_count == 2
+
+    def test_failed_search_is_not_cached(self):
+        """Test that an empty result from a failing search is not cached."""
+        service = _service()
+        service.collection.query.side_effect = RuntimeError("down")
+
+        assert service.search_documents("cat") == []
+        assert len(service.query_cache) == 0
+
+
+@pytest.mark.unit
+class TestTopkDot:
+    """Test the _topk_dot scoring helper."""
+
+    def test_keeps_best_k_above_threshold_in_order(self):
+        """Test that only the k best candidates above the threshold are kept, best first."""
+        candidates = np.array([[0.2], [0.9], [-0.5], [0.7], [0.4], [0.8]], dtype=np.float32)
+
+        order, scores = _topk_dot(np.array([1.0]), candidates, k=3, threshold=0.3)
+
+        assert order.tolist() == [1, 5, 3]
+        assert scores.tolist() == pytest.approx([0.9, 0.8, 0.7])
+
+    def test_zero_k_keeps_nothing(self):
+        """Test that k=0 returns no candidates."""
+        order, scores = _topk_dot(np.array([1.0]), np.array([[0.5]]), k=0, threshold=0.0)
+
+        assert order.size == 0 and scores.size == 0
+
+
+@pytest.mark.unit
+class TestInt8Quantization:
+    """Test int8 quantization and scoring."""
+
+    def test_round_trip_preserves_normalized_rows(self):
+        """Test that dequantized rows stay close to the normalized input."""
+        embeddings = np.random.default_rng(0).normal(size=(16, 384))
+
+        quantized, scales = quantize_int8(embeddings)
+        restored = dequantize_int8(quantized, scales)
+
+        assert quantized.dtype == np.int8
+        assert np.abs(quantized).max(axis=1).tolist() == [127] * 16
+        normalized = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+        cosine = np.sum(restored * normalized, axis=1) / np.linalg.norm(restored, axis=1)
+        assert cosine.min() > 0.999
+
+    def test_zero_rows_stay_zero(self):
+        """Test that an all-zero embedding does not divide by zero."""
+        quantized, scales = quantize_int8(np.zeros((1, 4)))
+
+        assert quantized.tolist() == [[0, 0, 0, 0]]
+        assert scales.tolist() == [1.0]
+
+
+    def test_int8_dot_does_not_overflow(self):
+        """Test that int8 products are accumulated in int32."""
+        query = np.full(384, 127, dtype=np.int8)
+        candidates = np.full((2, 384), -127, dtype=np.int8)
+
+        assert dot_int8(query, candidates).tolist() == [-127 * 127 * 384] * 2
+
+    def test_int8_scores_match_cosine(self):
+        """Test that int8 scoring of stored embeddings approximates cosine similarity."""
+        rng = np.random.default_rng(1)
+        embeddings = rng.normal(size=(32, 384))
+        query = rng.normal(size=384)
+        quantized, scales = quantize_int8(embeddings)
+
+        scores = score_int8(query, dequantize_int8(quantized, scales), scales)
+
+        normalized = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+        expected = normalized @ (query / np.linalg.norm(query))
+        assert scores.dtype == np.float32
+        np.testing.assert_allclose(scores, expected, atol=5e-3)
+
+    @patch("src.documents.vector_service.SearchResult", SimpleNamespace)
+    def test_quantized_search_oversamples_and_reranks(self):
+        """Test that int8 search fetches extra candidates and re-ranks them."""
+        quantized, scales = quantize_int8(np.array([[1.0, 1.0, 0.0], [1.0, 0.0, 0.0]]))
+        service = _service({
+            "ids": [["c1", "c2"]],
+            "distances": [[0.1, 0.2]],
+            "metadatas": [[
+                dict(_metadata("d1"), embedding_scale=float(scales[0])),
+                dict(_metadata("d2"), embedding_scale=float(scales[1])),
+            ]],
+            "documents": [["one", "two"]],
+            "embeddings": [dequantize_int8(quantized, scales).tolist()],
+        })
+        service.quantize_embeddings = True
+
+        results = service.search_documents("abcdefghij", n_results=1)
+
+        assert service.collection.query.call_args.kwargs["n_results"] == 4
+        assert [r.chunk_id for r in results] == ["c2"]
+
+
+@pytest.mark.unit
+class TestAddDocumentChunks:
+    """Test VectorDatabaseService.add_document_chunks."""
+
+    def test_stored_embeddings_are_normalized(self):
+        """Test that chunk embeddings are L2-normalized before they are stored."""
+        service = _service()
+        document = Mock(id="d1", title="Book", author=None, subject=None)
+        chunks = [
+            Mock(id="c1", content="abc", chunk_index=0, page_number=1, chapter_id=None, chunk_type="text"),
+            Mock(id="c2", content="abcd", chunk_index=1, page_number=1, chapter_id=None, chunk_type="text"),
+        ]
+
+        assert service.add_document_chunks(document, chunks)
+
+        stored = service.collection.add.call_args.kwargs["embeddings"]
+        np.testing.assert_allclose(np.linalg.norm(stored, axis=1), [1.0, 1.0], rtol=1e-3)
+
+    def test_chunk_metadata_combines_document_and_chunk_fields(self):
+        """Test that each chunk's metadata carries the document fields and its own."""
+        service = _service()
+        document = Mock(id="d1", title="Book", author=None, subject="Math")
+        document.file_type.value = "pdf"
+        document.upload_date.isoformat.return_value = "2024-01-01T00:00:00"
+        chunks = [
+            Mock(id="c1", content="abc", chunk_index=0, page_number=1, chapter_id="ch1", chunk_type="text"),
+            Mock(id="c2", content="abcd", chunk_index=1, page_number=2, chapter_id=None, chunk_type="table"),
+        ]
+
+        assert service.add_document_chunks(document, chunks)
+
+        metadatas = service.collection.add.call_args.kwargs["metadatas"]
+        assert metadatas[1] == {
+            "document_id": "d1",
+            "document_title": "Book",
+            "upload_date": "2024-01-01T00:00:00",
+            "file_type": "pdf",
+            "author": "",
+            "subject": "Math",
+            "chunk_index": 1,
+            "page_number": 2,
+            "chapter_id": "",
+            "chunk_type": "table",
+        }
+        assert metadatas[0]["chapter_id"] == "ch1"
+        assert metadatas[0] is not metadatas[1]
+
+    @patch("src.documents.vector_service.ADD_BATCH_SIZE", 2)
+    def test_large_documents_are_added_in_batches(self):
+        """Test that chunks are written to the collection in fixed-size batches."""
+        service = _service()
+        document = Mock(id="d1", title="Book", author=None, subject=None)
+        chunks = [
+            Mock(id=f"c{i}", content="a" * (i + 1), chunk_index=i, page_number=1, chapter_id=None, chunk_type="text")
+            for i in range(5)
+        ]
+
+        assert service.add_document_chunks(document, chunks)
+
+        batches = [call.kwargs["ids"] for call in service.collection.add.call_args_list]
+        assert batches == [["c0", "c1"], ["c2", "c3"], ["c4"]]
+        assert all(
+            len(call.kwargs["embeddings"]) == len(call.kwargs["ids"])
+            for call in service.collection.add.call_args_list
+        )
+
+    def test_quantized_embeddings_record_their_scale(self):
+        """Test that int8 mode stores dequantized vectors and their scale."""
+        service = _service()
+        service.quantize_embeddings = True
+        document = Mock(id="d1", title="Book", author=None, subject=None)
+        chunk = Mock(id="c1", content="abc", chunk_index=0, page_number=1, chapter_id=None, chunk_type="text")
+
+        assert service.add_document_chunks(document, [chunk])
+
+        kwargs = service.collection.add.call_args.kwargs
+        stored = np.array(kwargs["embeddings"][0])
+        scale = kwargs["metadatas"][0]["embedding_scale"]
+        np.testing.assert_allclose(stored / scale, np.round(stored / scale), atol=1e-3)
+
+
+    def test_identical_chunks_are_not_re_encoded(self):
+        """Test that chunk texts embedded before are served from the embedding cache."""
+        service = _service()
+        document = Mock(id="d1", title="Book", author=None, subject=None)
+        first = Mock(id="c1", content="abc", chunk_index=0, page_number=1, chapter_id=None, chunk_type="text")
+        second = Mock(id="c2", content="abcdef", chunk_index=1, page_number=1, chapter_id=None, chunk_type="text")
+
+        assert service.add_document_chunks(document, [first])
+        assert service.add_document_chunks(document, [first, second])
+
+        encoded = [call.args[0] for call in service.embedding_model.encode.call_args_list]
+        assert encoded == [["abc"], ["abcdef"]]
+        stored = service.collection.add.call_args.kwargs["embeddings"]
+        np.testing.assert_allclose(np.linalg.norm(stored, axis=1), [1.0, 1.0], rtol=1e-3)
+
+
+@pytest.mark.unit
+class TestEmbeddingCache:
+    """Test the EmbeddingCache class."""
+
+    def test_embeddings_persist_per_model(self, tmp_path):
+        """Test that embeddings survive reopening and are not shared across models."""
+        path = str(tmp_path / "embeddings.sqlite")
+        cache = EmbeddingCache(path, "model-a")
+        cache.put_many(["hello"], np.array([[0.5, -0.25, 1.0]]))
+        cache.close()
+
+        reopened = EmbeddingCache(path, "model-a")
+        other_model = EmbeddingCache(path, "model-b")
+
+        hit, miss = reopened.get_many(["hello", "world"])
+        assert hit.dtype == np.float16
+        assert hit.tolist() == [0.5, -0.25, 1.0]
+        assert miss is None
+        assert other_model.get_many(["hello"]) == [None]
+
+    def test_unwritable_path_disables_cache(self, tmp_path):
+        """Test that a cache whose file cannot be opened always misses."""
+        blocker = tmp_path / "file"
+        blocker.write_text("")
+        cache = EmbeddingCache(str(blocker / "embeddings.sqlite"), "model")
+
+        cache.put_many(["hello"], np.ones((1, 3)))
+
+        assert cache.get_many(["hello"]) == [None]
+
+
+@pytest.mark.unit
+class TestParallelEncoding:
+    """Test VectorDatabaseService._embed_texts_parallel."""
+
+    def test_small_documents_encode_in_process(self):
+        """Test that a small document does not start worker processes."""
+        service = _service()
+        service.encode_workers = 4
+
+        service._embed_texts_parallel(["a", "b"])
+
+        service.embedding_model.encode.assert_called_once()
+        service.embedding_model.start_multi_process_pool.assert_not_called()
+
+    @patch("src.documents.vector_service.PARALLEL_ENCODE_MIN_CHUNKS", 2)
+    def test_large_documents_use_one_pool(self):
+        """Test that large documents are sharded over a pool started once."""
+        service = _service()
+        service.encode_workers = 2
+        service.embedding_model.encode_multi_process.return_value = np.zeros((3, 3))
+
+        service._embed_texts_parallel(["a", "b", "c"])
+        service._embed_texts_parallel(["d", "e"])
+
+        service.embedding_model.start_multi_process_pool.assert_called_once_with(
+            target_devices=["cpu", "cpu"]
+        )
+        assert service.embedding_model.encode_multi_process.call_count == 2
+        assert service.embedding_model.encode_multi_process.call_args.kwargs["normalize_embeddings"]
+        service.embedding_model.encode.assert_not_called()
+
+        service.stop_encode_pool()
+        service.embedding_model.stop_multi_process_pool.assert_called_once()
+
+
+@pytest.mark.unit
+class TestRandomUuids:
+    """Test the _random_uuids ID generator."""
+
+    def test_ids_are_unique_version_4_uuids_across_batches(self):
+        """Test that IDs stay valid and unique when a batch is exhausted."""
+        ids = list(itertools.islice(_random_uuids(3), 10))
+
+        assert len(set(ids)) == 10
+        assert all(uuid.UUID(chunk_id).version == 4 for chunk_id in ids)
+
+
+@pytest.mark.unit
+class TestStaticEncoder:
+    """Test VectorDatabaseService._encode_static."""
+
+    @patch("src.documents.vector_service.STATIC_SEQ_LENGTH", 4)
+    def test_fixed_shape_batches_are_mean_pooled(self):
+        """Test that every batch has the same shape and pooling ignores padding."""
+        torch = pytest.importorskip("torch")
+        shapes = []
+
+        def tokenizer(texts, max_length, **kwargs):
+            lengths = [min(len(text), max_length) for text in texts]
+            return {
+                "input_ids": torch.tensor([[len(text)] * max_length for text in texts]),
+                "attention_mask": torch.tensor([[1] * n + [0] * (max_length - n) for n in lengths]),
+            }
+
+        def encoder(input_ids, attention_mask):
+            shapes.append(tuple(input_ids.shape))
+            # Each real token embeds as [text length, position]; padding as [100, 100]
+            positions = torch.arange(input_ids.shape[1]).expand_as(input_ids).float()
+            hidden = torch.stack([input_ids.float(), positions], dim=-1)
+            return SimpleNamespace(last_hidden_state=torch.where(attention_mask.bool()[..., None], hidden, 100.0))
+
+        service = _service()
+        service.encode_batch_size = 2
+        service.embedding_model.tokenizer = tokenizer
+        service._static_encoder = encoder
+
+        embeddings = service._encode_static(["abc", "a", "abcdefgh"])
+
+        assert shapes == [(2, 4), (2, 4)]
+        expected = np.array([[3.0, 1.0], [1.0, 0.0], [8.0, 1.5]])
+        expected /= np.linalg.norm(expected, axis=1, keepdims=True)
+        np.testing.assert_allclose(embeddings, expected, rtol=1e-6)
+
+    def test_failure_falls_back_to_encode(self):
+        """Test that a failing compiled encoder is disabled and encode() is used."""
+        service = _service()
+        service._static_encoder = Mock(side_effect=RuntimeError("no compiler"))
+        service.embedding_model.tokenizer = Mock(return_value={})
+
+        service._embed_texts_parallel(["abc"])
+
+        service.embedding_model.encode.assert_called_once()
+        assert service._static_encoder is None
+
+
+@pytest.mark.unit
+@patch("src.documents.vector_service.DocumentChunk", SimpleNamespace)
+class TestDocumentChunker:
+    """Test DocumentChunker.chunk_text."""
+
+    def test_chunks_end_at_first_nearby_sentence_end(self):
+        """Test that a chunk is cut after the first sentence end near the target size."""
+        text = "x" * 60 + ". " + "y" * 100 + "! " + "z" * 150
+        chunker = DocumentChunker(chunk_size=100, chunk_overlap=0, min_chunk_size=1)
+
+        chunks = chunker.chunk_text(text, Mock(id="d1"))
+
+        assert [c.end_char for c in chunks[:2]] == [61, 163]
+        assert chunks[0].content == "x" * 60 + "."
+
+    def test_offsets_are_characters_not_bytes(self):
+        """Test that break points in non-ASCII text are character offsets."""
+        text = "é" * 80 + "." + "ü" * 200
+        chunker = DocumentChunker(chunk_size=100, chunk_overlap=0, min_chunk_size=1)
+
+        chunks = chunker.chunk_text(text, Mock(id="d1"))
+
+        assert chunks[0].end_char == 81
+        assert chunks[0].content == "é" * 80 + "."